@@ -0,0 +1,87 @@
+import asyncio
+import logging
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+
+class MicroBatcher:
+    """짧은 시간 창 안에 들어온 요청을 모아 한 번에 처리
+
+    submit() 한 항목들은 window 초가 지나거나 max_size 개가 모이면
+    handler(list) 로 한꺼번에 넘어가고, 결과 목록이 각 호출자에게 순서대로 돌아간다.
+
+    producer() 안에서 일하는 작업자가 있으면, 그 작업자가 모두 submit 하고 기다리는
+    순간 창을 기다리지 않고 바로 처리한다 (작업자 수가 max_size 보다 적으면
+    묶음이 찰 수 없으므로).
+    """
+
+    def __init__(self, handler, window: float = 2.0, max_size: int = 8):
+        self.handler = handler
+        self.window = window
+        self.max_size = max_size
+        self.pending = []
+        self.timer = None
+        self.tasks = set()
+        self.producers = 0   # producer() 안에 있는 작업자 수
+        self.waiting = 0     # submit 결과를 기다리는 호출 수
+
+    @contextmanager
+    def producer(self):
+        """submit 할 수 있는 작업자 구간 (끝날 때 남은 작업자가 모두 기다리는 중이면 바로 처리)"""
+        self.producers += 1
+        try:
+            yield
+        finally:
+            self.producers -= 1
+            if self.pending and self._all_waiting():
+                self.flush()
+
+    def _all_waiting(self) -> bool:
+        return self.producers > 0 and self.waiting >= self.producers
+
+    async def submit(self, item):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.pending.append((item, future))
+        self.waiting += 1
+
+        if len(self.pending) >= self.max_size or self._all_waiting():
+            self.flush()
+        elif self.timer is None:
+            self.timer = loop.call_later(self.window, self.flush)
+
+        try:
+            return await future
+        finally:
+            self.waiting -= 1
+
+    def flush(self):
+        """대기 중인 항목을 즉시 처리"""
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+
+        batch, self.pending = self.pending, []
+        if not batch:
+            return
+
+        task = asyncio.create_task(self._run(batch))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    async def _run(self, batch):
+        items = [item for item, _ in batch]
+        logger.info(f"📦 묶음 처리: {len(items)}건")
+
+        try:
+            results = await self.handler(items)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
@@ -0,0 +1,712 @@
+import os
+import re
+import sys
+import json
+import time
+import uuid
+import random
+import asyncio
+import argparse
+import logging
+import resource
+import tempfile
+import threading
+import tracemalloc
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from rule_extractor import find_dates
+
+# 봇 처리량 / 중복 확인 성능 측정
+#
+#   python bench.py e2e     가짜 OpenAI/Notion/텔레그램 서버를 띄우고 메시지를 handle_message 로 흘려보냄
+#   python bench.py dedupe  저장소 행 수를 늘려 가며 check_duplicate 지연 측정
+#
+# 가짜 서버는 지연, 오류율, 429(Retry-After), 일정 시간 동안의 장애(503) 를 설정할 수 있다.
+
+TEMPLATES = [
+    """🎉 {project} 신년맞이 이벤트
+
+총 상금: {prize} USDT
+기간: {start} ~ {end}
+1등 {first} USDT, 2등 {second} USDT
+
+미션: 트위터 팔로우, 리트윗, 텔레그램 가입
+https://x.com/{project}/status/{n}""",
+    """🚀 {project} Airdrop Campaign is LIVE!
+
+Total prize pool: ${prize}
+Campaign period: {start_en} - {end_en}
+
+✅ Follow us on X
+✅ Join Telegram https://t.me/{project}
+✅ Invite friends for bonus points""",
+    """[{project}] 커뮤니티 퀴즈 이벤트 안내
+
+{days}일 동안 진행되는 퀴즈 이벤트에 참여하세요!
+추첨을 통해 {winners}명에게 상품을 드립니다.
+참여 방법은 공지 채널을 확인해주세요.""",
+    """📍 {project} Seoul Meetup
+
+장소: 서울 강남구 테헤란로 {n}
+일시: {start}
+선착순 {winners}명, 참가자 전원 굿즈 증정""",
+]
+
+
+# 일부 메시지에 붙는 홍보 꼬리말 (이모지 반복, 같은 링크/해시태그 반복)
+PROMO_FOOTER = """
+
+
+🔥🔥🔥🔥🔥  DON'T MISS OUT  🔥🔥🔥🔥🔥
+👉 https://t.me/{project}?utm_source=tg    👉 https://t.me/{project}
+👉 https://x.com/{project}     👉 https://x.com/{project}?ref=tg
+🚀🚀🚀🚀🚀🚀🚀🚀🚀🚀
+#{project} #airdrop #crypto #{project} #airdrop #giveaway #crypto
+💎💎💎💎💎💎💎💎💎💎💎💎"""
+
+
+def synthetic_corpus(count: int, dup_rate: float = 0.1, seed: int = 1) -> list:
+    """템플릿으로 만든 이벤트 메시지 [{text, channel, message_id}]
+
+    dup_rate 비율은 앞 메시지의 중복이다. 절반은 그대로 재전송(사전 중복 확인에서 걸림),
+    절반은 다른 채널이 다른 문구로 올린 같은 이벤트 (AI 가 프로젝트명을 뽑은 뒤에 걸림).
+    """
+    rng = random.Random(seed)
+    corpus = []
+    params = []
+    for n in range(count):
+        if corpus and rng.random() < dup_rate:
+            i = rng.randrange(len(corpus))
+            if rng.random() < 0.5 or params[i]['template'] not in (0, 3):
+                corpus.append(dict(corpus[i]))
+                params.append(params[i])
+                continue
+            values = dict(params[i], n=n)
+            template = 3 - values['template']
+        else:
+            month, day = rng.randint(1, 12), rng.randint(1, 20)
+            values = {
+                "project": f"Project{n}", "n": n, "prize": rng.randint(1, 500) * 100,
+                "start": f"2026-{month:02d}-{day:02d}", "end": f"2026-{month:02d}-{day + 7:02d}",
+                "start_en": f"Mar {day}, 2026", "end_en": f"Mar {day + 7}, 2026",
+                "first": rng.randint(5, 50) * 100, "second": rng.randint(1, 5) * 100,
+                "days": rng.randint(3, 30), "winners": rng.randint(10, 500),
+            }
+            template = n % len(TEMPLATES)
+
+        params.append(dict(values, template=template))
+        text = TEMPLATES[template].format(**values)
+        if n % 4 == 1:
+            text += PROMO_FOOTER.format(**values)
+        corpus.append({
+            "text": text,
+            "channel": f"channel{n % 50}" if n % 3 else None,
+            "message_id": n,
+        })
+    return corpus
+
+
+def load_corpus(path: str) -> list:
+    """녹화한 메시지 JSONL ({"text", "channel"?, "message_id"?}) 읽기"""
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+class FakeBackend(ABC):
+    """지연/오류/요청 제한을 흉내 내는 HTTP 서버"""
+
+    def __init__(self, name: str, latency: float = 0.0, error_rate: float = 0.0,
+                 rate_limit: float = None, retry_after: float = 1.0, outage: str = None,
+                 outage_latency: float = 0.0):
+        self.name = name
+        self.latency = latency
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self.retry_after = retry_after
+        # 장애 구간 "시작:길이" (초, 서버 시작 기준) 동안 outage_latency 초 뒤 503
+        self.outage = tuple(float(part) for part in outage.split(':')) if outage else None
+        self.outage_latency = outage_latency
+        self.started = time.monotonic()
+        self.lock = threading.Lock()
+        self.calls = defaultdict(int)
+        self.tokens = rate_limit or 0
+        self.updated = time.monotonic()
+        self.server = None
+
+    @abstractmethod
+    def route(self, method: str, path: str, body: dict):
+        """(상태 코드, 응답 dict) 반환, 하위 클래스에서 구현"""
+
+    def in_outage(self) -> bool:
+        if not self.outage:
+            return False
+        start, duration = self.outage
+        return start <= time.monotonic() - self.started < start + duration
+
+    def admit(self):
+        """오류 주입 / 요청 제한 판정 (정상이면 None, 아니면 (상태 코드, 헤더))"""
+        if self.in_outage():
+            # 응답이 늦게 오다 실패하는 장애 (타임아웃 흉내)
+            time.sleep(self.outage_latency)
+            with self.lock:
+                self.calls['503'] += 1
+            return 503, {}
+
+        with self.lock:
+            if self.rate_limit:
+                now = time.monotonic()
+                self.tokens = min(self.rate_limit, self.tokens + (now - self.updated) * self.rate_limit)
+                self.updated = now
+                if self.tokens < 1:
+                    self.calls['429'] += 1
+                    return 429, {"Retry-After": str(self.retry_after)}
+                self.tokens -= 1
+
+            if self.error_rate and random.random() < self.error_rate:
+                self.calls['500'] += 1
+                return 500, {}
+        return None
+
+    def serve(self) -> str:
+        backend = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                raw = self.rfile.read(length).decode() if length else ''
+                body = json.loads(raw) if raw.startswith('{') else {}
+                path = self.path.split('?')[0]
+
+                if backend.latency:
+                    time.sleep(backend.latency * random.uniform(0.5, 1.5))
+
+                rejected = backend.admit()
+                if rejected:
+                    status, headers = rejected
+                    payload = {"object": "error", "status": status, "code": "rate_limited" if status == 429 else "internal_server_error",
+                               "message": "fake error", "error": {"message": "fake error"}}
+                else:
+                    with backend.lock:
+                        backend.calls[f"{self.command} {re.sub(r'/[0-9a-f-]{32,36}', '/:id', path)}"] += 1
+                    status, payload = backend.route(self.command, path, body)
+                    headers = {}
+
+                    # 스트리밍 응답은 route 가 돌려준 함수가 직접 씀
+                    if callable(payload):
+                        payload(self)
+                        return
+
+                data = json.dumps(payload, ensure_ascii=False).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                for key, value in headers.items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            do_GET = do_POST
+            do_PATCH = do_POST
+
+            def log_message(self, *args):
+                pass
+
+        server_class = type('BenchServer', (ThreadingHTTPServer,), {'request_queue_size': 256, 'daemon_threads': True})
+        self.server = server_class(('127.0.0.1', 0), Handler)
+        self.started = time.monotonic()
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def api_calls(self) -> int:
+        return sum(count for key, count in self.calls.items() if key not in ('429', '500', '503'))
+
+
+class FakeOpenAI(FakeBackend):
+    """chat.completions 흉내: 프롬프트의 요청 필드와 메시지를 읽어 그럴듯한 JSON 응답"""
+
+    FIELDS_RE = re.compile(r'^응답 필드: (.+)$', re.MULTILINE)
+    CACHE_MIN_TOKENS = 1024   # 프롬프트 캐시가 붙는 최소 공통 앞부분
+    CHUNK_CHARS = 4   # 스트리밍 조각 하나 (토큰 하나 정도)
+    MESSAGE_RE = re.compile(r'<메시지(?: index="(\d+)")?>\n(.*?)\n</메시지>', re.DOTALL)
+    PROJECT_RE = re.compile(r'Project\d+')
+
+    def extract(self, text: str, fields: list) -> dict:
+        project = self.PROJECT_RE.search(text)
+        dates = find_dates(text)
+        start = dates[0].isoformat() if dates else None
+        end = dates[1].isoformat() if len(dates) > 1 else None
+        values = {
+            "event_title": text.strip().splitlines()[0][:60],
+            "project_name": project[0] if project else "미확인",
+            "total_prize": "총 상금 통일",
+            "prize_per_round": "N/A",
+            "start_date": start,
+            "end_date": end,
+            "duration_days": (dates[1] - dates[0]).days if len(dates) > 1 else None,
+            "mission_content": "트위터 팔로우, 텔레그램 가입",
+            "location": "온라인",
+        }
+        return {name: values.get(name) for name in fields}
+
+    def __init__(self, *args, token_delay: float = 0.0, invalid_rate: float = 0.0, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.token_delay = token_delay
+        self.invalid_rate = invalid_rate
+        self.systems = set()
+
+    def stream(self, content: str, model: str):
+        """SSE 스트리밍 응답 작성 함수 (클라이언트가 끊으면 거기까지 보낸 토큰만 집계)"""
+        backend = self
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+
+        def event(delta: dict, finish_reason=None, usage=None) -> bytes:
+            chunk = {
+                "id": completion_id, "object": "chat.completion.chunk", "created": int(time.time()), "model": model,
+                "choices": [] if usage else [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+                "usage": usage,
+            }
+            return f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode()
+
+        def write(handler):
+            handler.send_response(200)
+            handler.send_header('Content-Type', 'text/event-stream')
+            handler.send_header('Connection', 'close')
+            handler.end_headers()
+            handler.close_connection = True
+
+            sent = 0
+            try:
+                for i in range(0, len(content), backend.CHUNK_CHARS):
+                    piece = content[i:i + backend.CHUNK_CHARS]
+                    handler.wfile.write(event({"content": piece}))
+                    handler.wfile.flush()
+                    sent += len(piece)
+                    if backend.token_delay:
+                        time.sleep(backend.token_delay)
+                usage = {"prompt_tokens": 0, "completion_tokens": len(content) // 3, "total_tokens": len(content) // 3}
+                handler.wfile.write(event({}, "stop") + event({}, usage=usage) + b"data: [DONE]\n\n")
+                handler.wfile.flush()
+            except (BrokenPipeError, ConnectionResetError):
+                with backend.lock:
+                    backend.calls['stream_aborted'] += 1
+            finally:
+                with backend.lock:
+                    backend.calls['completion_tokens'] += sent // 3
+
+        return write
+
+    # 잘못된 형식 주입 (필드, 값): structured outputs 로도 막히지 않는 값 오류
+    INVALID = [("start_date", "1월 5일"), ("duration_days", "약 일주일"), ("location", "하이브리드")]
+
+    def corrupt(self, values: dict) -> dict:
+        if self.invalid_rate and random.random() < self.invalid_rate:
+            for name, bad in self.INVALID:
+                if name in values:
+                    values[name] = bad
+                    with self.lock:
+                        self.calls['invalid'] += 1
+                    break
+        return values
+
+    def route(self, method, path, body):
+        prompt = body['messages'][-1]['content']
+        messages = self.MESSAGE_RE.findall(prompt)
+
+        # 요청 필드는 JSON 스키마가 있으면 스키마에서, 없으면 프롬프트의 형식 예시에서
+        schema = (body.get('response_format') or {}).get('json_schema', {}).get('schema')
+        if schema:
+            wrapped = 'events' in schema['properties']
+            properties = schema['properties']['events']['items']['properties'] if wrapped else schema['properties']
+            fields = [name for name in properties if name != 'index']
+        else:
+            wrapped = False
+            match = self.FIELDS_RE.search(prompt)
+            fields = match[1].split(', ') if match else []
+
+        if len(messages) == 1 and not messages[0][0]:
+            content = json.dumps(self.corrupt(self.extract(messages[0][1], fields)), ensure_ascii=False)
+        else:
+            events = [{"index": int(i), **self.corrupt(self.extract(text, fields))} for i, text in messages]
+            content = json.dumps({"events": events} if wrapped else events, ensure_ascii=False)
+
+        prompt_tokens = sum(len(message['content']) // 3 for message in body['messages'])
+        completion_tokens = len(content) // 3
+
+        # 앞선 요청과 같은 system 메시지가 충분히 길면 캐시 적중 (128 토큰 단위)
+        system = body['messages'][0]['content'] if body['messages'][0]['role'] == 'system' else ""
+        cached = 0
+        if len(system) // 3 >= self.CACHE_MIN_TOKENS and system in self.systems:
+            cached = len(system) // 3 // 128 * 128
+        self.systems.add(system)
+
+        with self.lock:
+            self.calls['prompt_tokens'] += prompt_tokens
+            self.calls['cached_tokens'] += cached
+            if body.get('stream'):
+                return 200, self.stream(content, body.get('model', 'gpt-4o-mini'))
+            self.calls['completion_tokens'] += completion_tokens
+
+        # 스트리밍이 아니어도 생성 시간은 같음
+        if self.token_delay:
+            time.sleep(len(content) / self.CHUNK_CHARS * self.token_delay)
+
+        return 200, {
+            "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get('model', 'gpt-4o-mini'),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                      "total_tokens": prompt_tokens + completion_tokens,
+                      "prompt_tokens_details": {"cached_tokens": cached}},
+        }
+
+    def api_calls(self) -> int:
+        return sum(count for key, count in self.calls.items() if key.startswith('POST'))
+
+
+class FakeNotion(FakeBackend):
+    """pages.create / pages.update / databases.query 흉내 (메모리에 페이지 보관)"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.pages = {}
+
+    def route(self, method, path, body):
+        now = time.strftime('%Y-%m-%dT%H:%M:%S.000Z', time.gmtime())
+
+        if path == '/v1/pages':
+            page_id = str(uuid.uuid4())
+            page = {"object": "page", "id": page_id, "created_time": now, "last_edited_time": now,
+                    "archived": False, "in_trash": False, "properties": body.get('properties', {})}
+            with self.lock:
+                self.pages[page_id] = page
+            return 200, page
+
+        if path.startswith('/v1/pages/'):
+            with self.lock:
+                page = self.pages.get(path.rsplit('/', 1)[-1])
+                if page is None:
+                    return 404, {"object": "error", "status": 404, "code": "object_not_found", "message": "not found"}
+                page['properties'].update(body.get('properties', {}))
+                page['last_edited_time'] = now
+            return 200, page
+
+        if path.endswith('/query'):
+            with self.lock:
+                pages = list(self.pages.values())
+            # url 속성 equals 필터만 흉내 (생성 응답을 잃었을 때의 중복 확인 조회)
+            condition = body.get('filter') or {}
+            if 'url' in condition:
+                pages = [
+                    page for page in pages
+                    if (page['properties'].get(condition.get('property')) or {}).get('url') == condition['url'].get('equals')
+                ]
+            if body.get('page_size'):
+                pages = pages[:body['page_size']]
+            return 200, {"object": "list", "results": pages, "has_more": False, "next_cursor": None}
+
+        return 404, {"object": "error", "status": 404, "code": "invalid_request_url", "message": path}
+
+
+def percentile(values: list, p: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+def max_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def rss_mb() -> float:
+    """현재 RSS (Linux 외에는 최대 RSS)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * resource.getpagesize() / 1024 / 1024
+    except OSError:
+        return max_rss_mb()
+
+
+async def run_e2e(args):
+    """가짜 백엔드로 봇 전체 경로 (접수 → 대기열 → 분석 → 중복 확인 → 저장) 측정"""
+    from fake_telegram import FakeBotApi, make_update
+
+    openai_backend = FakeOpenAI('openai', latency=args.openai_latency, error_rate=args.openai_errors,
+                                rate_limit=args.openai_rate, retry_after=args.retry_after,
+                                outage=args.openai_outage, outage_latency=args.outage_latency,
+                                token_delay=args.openai_token_ms / 1000, invalid_rate=args.openai_invalid)
+    notion_backend = FakeNotion('notion', latency=args.notion_latency, error_rate=args.notion_errors,
+                                rate_limit=args.notion_rate, retry_after=args.retry_after,
+                                outage=args.notion_outage, outage_latency=args.outage_latency)
+    telegram = FakeBotApi()
+    telegram_port = random.randint(20000, 40000)
+    telegram.serve(telegram_port)
+
+    workdir = tempfile.mkdtemp(prefix='bench-')
+    os.environ.update({
+        "TELEGRAM_BOT_TOKEN": "123:bench",
+        "OPENAI_API_KEY": "bench",
+        "NOTION_API_KEY": "bench",
+        "NOTION_DATABASE_ID": "bench-db",
+        "OPENAI_BASE_URL": f"{openai_backend.serve()}/v1",
+        "NOTION_BASE_URL": notion_backend.serve(),
+        "EVENT_DB_PATH": os.path.join(workdir, 'events.db'),
+        "QUEUE_MAX_BACKLOG": str(max(1000, args.messages * 2)),
+        "HTTP2": "0",
+    })
+
+    import main
+    from telegram.ext import Application
+    logging.getLogger().setLevel(logging.WARNING)
+    for name in ('httpx', 'notion_client'):
+        logging.getLogger(name).setLevel(logging.WARNING)
+
+    corpus = load_corpus(args.corpus) if args.corpus else synthetic_corpus(args.messages, args.dup_rate)
+    corpus = corpus[:args.messages]
+
+    app = Application.builder().token("123:bench").base_url(f"http://127.0.0.1:{telegram_port}/bot").build()
+    await app.initialize()
+    main.event_index.load(main.event_store)
+    main.notion_writer.start()
+    workers = [asyncio.create_task(main.ingest_worker(app)) for _ in range(main.INGEST_WORKERS)]
+
+    receipt = []
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    rng = random.Random(2)
+    updates = []
+
+    def album(data: dict, n: int) -> list:
+        """포워딩 게시물을 사진 앨범 (설명은 한 장에만) 업데이트 여러 개로"""
+        size = rng.randint(2, 4)
+        caption = rng.randrange(size)
+        items = []
+        for i in range(size):
+            item = json.loads(json.dumps(data))
+            message = item['message']
+            item['update_id'] = message['message_id'] = (n + 1) * 10 + i
+            message['forward_origin']['message_id'] = data['message']['forward_origin']['message_id'] * 10 + i
+            message['media_group_id'] = f"album{n}"
+            message['photo'] = [{"file_id": f"photo{n}_{i}", "file_unique_id": f"u{n}_{i}", "width": 800, "height": 600}]
+            text = message.pop('text')
+            if i == caption:
+                message['caption'] = text
+            items.append(item)
+        return items
+
+    async def send(n: int, item: dict):
+        data = make_update(n + 1, 1000 + n % args.chats, bool(item.get('channel')))
+        data['message']['text'] = item['text']
+        if item.get('channel'):
+            data['message']['forward_origin']['chat']['username'] = item['channel']
+            data['message']['forward_origin']['message_id'] = item.get('message_id', n)
+        parts = album(data, n) if item.get('channel') and rng.random() < args.album_rate else [data]
+        updates.append(len(parts))
+
+        async with semaphore:
+            started = time.monotonic()
+            await asyncio.gather(*(
+                main.handle_message(main.Update.de_json(part, app.bot), None) for part in parts
+            ))
+            receipt.append(time.monotonic() - started)
+
+    tracemalloc.start()
+    started = time.monotonic()
+    await asyncio.gather(*(send(n, item) for n, item in enumerate(corpus)))
+
+    # 대기열이 빌 때까지 대기
+    while main.ingest_queue.backlog():
+        if time.monotonic() - started > args.timeout:
+            print(f"⚠️ 시간 초과: {main.ingest_queue.backlog()}건 미처리")
+            break
+        await asyncio.sleep(0.05)
+    elapsed = time.monotonic() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    for task in workers:
+        task.cancel()
+    await asyncio.gather(*workers, return_exceptions=True)
+    await main.notion_writer.close()
+    await main.clients.aclose()
+    await app.shutdown()
+
+    rows = main.ingest_queue.conn.execute(
+        "SELECT status, attempts, updated_at - created_at FROM ingest_queue"
+    ).fetchall()
+    latencies = [row[2] for row in rows if row[0] == 'done']
+    statuses = defaultdict(int)
+    for row in rows:
+        statuses[row[0]] += 1
+
+    messages = len(corpus)
+    report = {
+        "messages": messages,
+        "updates": sum(updates),
+        "queued": len(rows),
+        "prechecked_duplicates": messages - len(rows),
+        "statuses": dict(statuses),
+        "results": main.metrics.counts("events_total", "result"),
+        "retries": sum(row[1] - 1 for row in rows if row[1] > 1),
+        "elapsed_s": round(elapsed, 2),
+        "messages_per_s": round(messages / elapsed, 1),
+        "receipt_ms": {p: round(percentile(receipt, q) * 1000, 1) for p, q in (("p50", .5), ("p95", .95), ("p99", .99))},
+        "e2e_ms": {p: round(percentile(latencies, q) * 1000) for p, q in (("p50", .5), ("p95", .95), ("p99", .99))},
+        "openai_calls_per_msg": round(openai_backend.api_calls() / messages, 3),
+        "notion_calls_per_msg": round(notion_backend.api_calls() / messages, 3),
+        "telegram_calls_per_msg": round(sum(telegram.calls.values()) / messages, 3),
+        "openai_tokens_per_msg": round((openai_backend.calls['prompt_tokens'] + openai_backend.calls['completion_tokens']) / messages),
+        "openai_prompt_tokens_per_msg": round(openai_backend.calls['prompt_tokens'] / messages),
+        "openai_cached_tokens_per_msg": round(openai_backend.calls['cached_tokens'] / messages),
+        "openai_completion_tokens_per_msg": round(openai_backend.calls['completion_tokens'] / messages),
+        "openai_streams_aborted": openai_backend.calls['stream_aborted'],
+        "openai_invalid_fields": openai_backend.calls['invalid'],
+        "injected": {"openai_429": openai_backend.calls['429'], "openai_500": openai_backend.calls['500'],
+                     "openai_503": openai_backend.calls['503'],
+                     "notion_429": notion_backend.calls['429'], "notion_500": notion_backend.calls['500'],
+                     "notion_503": notion_backend.calls['503']},
+        "resilience": {backend.name: backend.stats() for backend in main.BACKENDS},
+        "stages": main.metrics.summary(),
+        "peak_traced_mb": round(peak / 1024 / 1024, 1),
+        "max_rss_mb": round(max_rss_mb(), 1),
+    }
+    return report
+
+
+def run_dedupe(args):
+    """저장소 행 수별 check_duplicate 지연 (적중/미적중) 과 인덱스 적재 시간/메모리"""
+    from event_index import EventIndex
+    from event_store import EventStore
+
+    reports = []
+    for size in [int(s) for s in args.rows.split(',')]:
+        workdir = tempfile.mkdtemp(prefix='bench-dedupe-')
+        store = EventStore(os.path.join(workdir, 'events.db'))
+
+        # 합성 페이지 적재
+        chunk = []
+        started = time.monotonic()
+        for n in range(size):
+            chunk.append({
+                "id": f"page-{n}",
+                "last_edited_time": "2026-01-01T00:00:00.000Z",
+                "properties": {
+                    "이벤트 제목": {"title": [{"text": {"content": f"Project{n} 이벤트"}}]},
+                    "프로젝트명": {"rich_text": [{"text": {"content": f"Project{n}"}}]},
+                    "이벤트 시작일": {"date": {"start": f"2026-{n % 12 + 1:02d}-{n % 28 + 1:02d}"}},
+                    "원본 링크": {"url": f"https://t.me/channel{n % 500}/{n}"},
+                },
+            })
+            if len(chunk) >= 10000:
+                store.upsert_pages(chunk)
+                chunk = []
+        if chunk:
+            store.upsert_pages(chunk)
+        fill_s = time.monotonic() - started
+
+        rss_before = rss_mb()
+        started = time.monotonic()
+        index = EventIndex()
+        index.load(store)
+        load_s = time.monotonic() - started
+        index_mb = rss_mb() - rss_before
+
+        rng = random.Random(size)
+        timings = {"hit_url": [], "hit_project_date": [], "miss": [], "store_miss": []}
+        for _ in range(args.lookups):
+            n = rng.randrange(size)
+            cases = {
+                "hit_url": (f"https://t.me/channel{n % 500}/{n}", None, None),
+                "hit_project_date": (None, f"Project{n}", f"2026-{n % 12 + 1:02d}-{n % 28 + 1:02d}"),
+                "miss": (f"https://t.me/other/{n}", f"Other{n}", "2026-01-01"),
+            }
+            for case, (url, project, start) in cases.items():
+                t = time.perf_counter()
+                index.refresh(store)
+                index.find_duplicate(url, project, start)
+                timings[case].append(time.perf_counter() - t)
+
+            # 인덱스 없이 저장소(SQLite) 만으로 확인하는 경우
+            t = time.perf_counter()
+            store.find_duplicate(*cases["miss"])
+            timings["store_miss"].append(time.perf_counter() - t)
+
+        report = {
+            "rows": size,
+            "fill_s": round(fill_s, 2),
+            "index_load_s": round(load_s, 2),
+            "index_rss_mb": round(index_mb, 1),
+        }
+        for case, values in timings.items():
+            report[f"{case}_us"] = {
+                "p50": round(percentile(values, .5) * 1e6, 1),
+                "p99": round(percentile(values, .99) * 1e6, 1),
+            }
+        reports.append(report)
+        store.close()
+        print(json.dumps(report, ensure_ascii=False))
+
+    return reports
+
+
+def main():
+    parser = argparse.ArgumentParser(description="봇 처리량 / 중복 확인 벤치마크")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    e2e = sub.add_parser('e2e', help="가짜 OpenAI/Notion/텔레그램으로 전체 처리 경로 측정")
+    e2e.add_argument('--messages', type=int, default=200)
+    e2e.add_argument('--corpus', help="녹화한 메시지 JSONL (없으면 합성 메시지)")
+    e2e.add_argument('--dup-rate', type=float, default=0.1, help="합성 메시지 중 재전송 비율")
+    e2e.add_argument('--chats', type=int, default=5)
+    e2e.add_argument('--album-rate', type=float, default=0.0, help="포워딩 게시물 중 사진 앨범(여러 업데이트)으로 보낼 비율")
+    e2e.add_argument('--concurrency', type=int, default=32, help="동시에 넣는 메시지 수")
+    e2e.add_argument('--openai-latency', type=float, default=0.3, help="OpenAI 평균 응답 시간 (초)")
+    e2e.add_argument('--notion-latency', type=float, default=0.1, help="Notion 평균 응답 시간 (초)")
+    e2e.add_argument('--openai-token-ms', type=float, default=5, help="스트리밍 응답 조각 간격 (ms)")
+    e2e.add_argument('--openai-invalid', type=float, default=0.0, help="형식이 잘못된 필드 값을 섞는 응답 비율")
+    e2e.add_argument('--openai-errors', type=float, default=0.0, help="OpenAI 500 오류 비율")
+    e2e.add_argument('--notion-errors', type=float, default=0.0, help="Notion 500 오류 비율")
+    e2e.add_argument('--openai-rate', type=float, default=None, help="OpenAI 초당 요청 제한 (넘으면 429)")
+    e2e.add_argument('--notion-rate', type=float, default=3.0, help="Notion 초당 요청 제한 (넘으면 429)")
+    e2e.add_argument('--retry-after', type=float, default=1.0, help="429 응답의 Retry-After (초)")
+    e2e.add_argument('--openai-outage', help="OpenAI 장애 구간 '시작:길이' (초, 그동안 모든 요청 503)")
+    e2e.add_argument('--notion-outage', help="Notion 장애 구간 '시작:길이' (초)")
+    e2e.add_argument('--outage-latency', type=float, default=0.0, help="장애 중 503 을 돌려주기까지 걸리는 시간 (초)")
+    e2e.add_argument('--timeout', type=float, default=300)
+
+    dedupe = sub.add_parser('dedupe', help="저장소 규모별 check_duplicate 지연")
+    dedupe.add_argument('--rows', default='10000,100000', help="쉼표로 구분한 행 수 (예: 10000,100000,1000000)")
+    dedupe.add_argument('--lookups', type=int, default=2000)
+    dedupe.add_argument('--max-p99-us', type=float, default=None,
+                        help="미적중 조회 p99 가 이 값(µs)을 넘으면 종료 코드 1 (CI 회귀 확인)")
+
+    for p in (e2e, dedupe):
+        p.add_argument('--json', help="결과를 JSON 파일로 저장")
+
+    args = parser.parse_args()
+
+    if args.command == 'e2e':
+        report = asyncio.run(run_e2e(args))
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+        failed = False
+    else:
+        report = run_dedupe(args)
+        failed = args.max_p99_us is not None and any(r["miss_us"]["p99"] > args.max_p99_us for r in report)
+        if failed:
+            print(f"❌ 미적중 조회 p99 가 {args.max_p99_us}µs 를 넘었습니다")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,211 @@
+import os
+import sys
+import time
+import logging
+import threading
+import importlib.util
+
+import httpx
+
+import metrics
+
+# OpenAI / Notion 클라이언트 공용 저장소
+#
+# 처음 쓸 때 만들고 프로세스 안에서 재사용한다 (커넥션 풀 유지, TLS 재협상 없음).
+# openai 패키지는 import 만 0.5초 넘게 걸려서 실제로 필요할 때 import 한다.
+# 설정 값은 load_dotenv() 이후에 읽도록 생성 시점에 읽는다.
+
+logger = logging.getLogger(__name__)
+
+_clients = {}
+_latency = {}
+_lock = threading.Lock()
+
+
+def http_options() -> dict:
+    """httpx 클라이언트 공통 설정 (커넥션 풀 크기, 타임아웃, HTTP/2)"""
+    http2 = os.getenv('HTTP2', '1') == '1'
+    if http2 and importlib.util.find_spec('h2') is None:
+        logger.warning("⚠️ h2 패키지가 없어 HTTP/1.1 로 연결합니다 (pip install h2)")
+        http2 = False
+
+    return {
+        "http2": http2,
+        "limits": httpx.Limits(
+            max_connections=int(os.getenv('HTTP_MAX_CONNECTIONS', '20')),
+            max_keepalive_connections=int(os.getenv('HTTP_MAX_KEEPALIVE', '10')),
+            keepalive_expiry=float(os.getenv('HTTP_KEEPALIVE_EXPIRY', '60')),
+        ),
+        "timeout": httpx.Timeout(
+            float(os.getenv('HTTP_TIMEOUT', '60')),
+            connect=float(os.getenv('HTTP_CONNECT_TIMEOUT', '10')),
+        ),
+    }
+
+
+class Latency:
+    """서비스별 요청 수와 응답 시간"""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds: float):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def summary(self) -> dict:
+        average = self.total / self.count if self.count else 0.0
+        return {"requests": self.count, "avg_ms": round(average * 1000), "max_ms": round(self.max * 1000)}
+
+
+def _hooks(service: str, is_async: bool) -> dict:
+    """요청별 응답 시간을 재는 httpx event hook"""
+    latency = _latency.setdefault(service, Latency())
+
+    def on_request(request):
+        request.extensions['started'] = time.monotonic()
+
+    def on_response(response):
+        started = response.request.extensions.get('started')
+        if started is not None:
+            latency.add(time.monotonic() - started)
+            metrics.observe("http_request_seconds", time.monotonic() - started, service=service)
+        metrics.inc("http_responses_total", service=service, status=response.status_code)
+
+    if not is_async:
+        return {"request": [on_request], "response": [on_response]}
+
+    async def on_request_async(request):
+        on_request(request)
+
+    async def on_response_async(response):
+        on_response(response)
+
+    return {"request": [on_request_async], "response": [on_response_async]}
+
+
+def _get(name: str, factory):
+    client = _clients.get(name)
+    if client is not None:
+        return client
+
+    # 스크립트의 작업자 스레드가 동시에 불러도 한 번만 생성
+    with _lock:
+        client = _clients.get(name)
+        if client is None:
+            started = time.monotonic()
+            client = _clients[name] = factory()
+            logger.info(f"🔌 {name} 클라이언트 생성 ({(time.monotonic() - started) * 1000:.0f}ms)")
+    return client
+
+
+def openai_async():
+    """AsyncOpenAI (봇)"""
+    def factory():
+        from openai import AsyncOpenAI
+        # 재시도는 봇이 차단기/동시 요청 한도를 거쳐 직접 함 (main.OPENAI_RETRIES)
+        return AsyncOpenAI(
+            api_key=os.getenv('OPENAI_API_KEY'),
+            max_retries=0,
+            http_client=httpx.AsyncClient(**http_options(), event_hooks=_hooks('openai', True))
+        )
+    return _get('openai_async', factory)
+
+
+def openai_sync():
+    """OpenAI (마이그레이션 스크립트, 스레드 간 공유)"""
+    def factory():
+        from openai import OpenAI
+        return OpenAI(
+            api_key=os.getenv('OPENAI_API_KEY'),
+            http_client=httpx.Client(**http_options(), event_hooks=_hooks('openai', False))
+        )
+    return _get('openai_sync', factory)
+
+
+def notion_async():
+    """notion_client.AsyncClient (봇)"""
+    def factory():
+        from notion_client import AsyncClient
+        return AsyncClient(
+            auth=os.getenv('NOTION_API_KEY'),
+            base_url=os.getenv('NOTION_BASE_URL', 'https://api.notion.com'),
+            timeout_ms=int(float(os.getenv('HTTP_TIMEOUT', '60')) * 1000),
+            client=httpx.AsyncClient(**http_options(), event_hooks=_hooks('notion', True))
+        )
+    return _get('notion_async', factory)
+
+
+def notion_sync():
+    """notion_client.Client (마이그레이션 스크립트, 스레드 간 공유)"""
+    def factory():
+        from notion_client import Client
+        return Client(
+            auth=os.getenv('NOTION_API_KEY'),
+            base_url=os.getenv('NOTION_BASE_URL', 'https://api.notion.com'),
+            timeout_ms=int(float(os.getenv('HTTP_TIMEOUT', '60')) * 1000),
+            client=httpx.Client(**http_options(), event_hooks=_hooks('notion', False))
+        )
+    return _get('notion_sync', factory)
+
+
+def latency_stats() -> dict:
+    """서비스별 요청 수/평균/최대 응답 시간"""
+    return {service: latency.summary() for service, latency in _latency.items()}
+
+
+async def aclose():
+    """만든 클라이언트 모두 닫기 (봇 종료 시)"""
+    for name, client in list(_clients.items()):
+        if name == 'notion_async':
+            await client.aclose()
+        elif name == 'openai_async':
+            await client.close()
+        else:
+            client.close()
+        del _clients[name]
+
+
+def close():
+    """만든 동기 클라이언트 모두 닫기 (스크립트 종료 시)"""
+    for name, client in list(_clients.items()):
+        if not name.endswith('_async'):
+            client.close()
+            del _clients[name]
+
+
+def measure(url: str, requests: int = 10):
+    """시작 시간(import)과 요청당 지연을 새 클라이언트 / 공유 클라이언트로 비교"""
+    import subprocess
+
+    for module in ('openai', 'notion_client', 'clients'):
+        started = time.monotonic()
+        subprocess.run([sys.executable, '-c', f'import {module}'], check=True)
+        print(f"⏱️ import {module}: {(time.monotonic() - started) * 1000:.0f}ms (인터프리터 시작 포함)")
+
+    def timed(client):
+        started = time.monotonic()
+        try:
+            client.get(url)
+        except httpx.HTTPError as e:
+            print(f"⚠️ 요청 실패: {e}")
+        return time.monotonic() - started
+
+    fresh = []
+    for _ in range(requests):
+        with httpx.Client(**http_options()) as client:
+            fresh.append(timed(client))
+
+    with httpx.Client(**http_options()) as client:
+        shared = [timed(client) for _ in range(requests)]
+
+    print(f"🆕 요청마다 새 클라이언트: 평균 {sum(fresh) / len(fresh) * 1000:.0f}ms")
+    print(f"♻️ 공유 클라이언트: 평균 {sum(shared) / len(shared) * 1000:.0f}ms "
+          f"(첫 요청 {shared[0] * 1000:.0f}ms, 이후 {sum(shared[1:]) / max(1, len(shared) - 1) * 1000:.0f}ms)")
+
+
+if __name__ == '__main__':
+    measure(sys.argv[1] if len(sys.argv) > 1 else 'https://api.notion.com/v1/users/me')
@@ -0,0 +1,162 @@
+import asyncio
+import uuid
+from contextlib import asynccontextmanager
+
+from event_store import normalize_url, project_date_key, page_to_row
+from fingerprint import FingerprintIndex, simhash
+
+
+class EventIndex:
+    """원본 링크 / (프로젝트명, 시작일) / 본문 지문 기준 중복 확인 인덱스
+
+    시작 시 로컬 저장소(EventStore)에서 한 번 적재하고, 이후 저장소 동기화로
+    들어온 변경 페이지만 반영한다. 조회는 네트워크 없이 dict 조회.
+    같은 저장소를 쓰는 다른 프로세스가 저장한 이벤트는 refresh() 로 받아온다.
+    """
+
+    def __init__(self):
+        self.by_url = {}
+        self.by_project_date = {}
+        self.page_keys = {}
+        self.fingerprints = FingerprintIndex()
+        # 저장소에서 마지막으로 읽은 쓰기 순번 seq (events, fingerprints) 와 삭제 기록 id
+        self.row_mark = 0
+        self.fp_mark = 0
+        self.del_mark = 0
+        # 저장 중인 키 → [asyncio.Lock, 기다리는/잡은 작업 수] (같은 이벤트 동시 저장 방지)
+        self.reservations = {}
+
+    def __len__(self):
+        return len(self.page_keys)
+
+    def add(self, page_id: str, url, project_name, start_date):
+        """페이지 한 건 등록 (같은 페이지가 수정된 경우 기존 키 교체)"""
+        fp = self.fingerprints.by_page.get(page_id)
+        self.remove(page_id)
+        if fp is not None:
+            self.fingerprints.add(page_id, fp)
+
+        url_key = normalize_url(url)
+        pd_key = project_date_key(project_name, start_date)
+
+        if url_key:
+            self.by_url[url_key] = page_id
+        if pd_key:
+            self.by_project_date[pd_key] = page_id
+        self.page_keys[page_id] = (url_key, pd_key)
+
+    def add_row(self, row: dict):
+        """EventStore 행 등록"""
+        self.add(row['page_id'], row['url'], row['project_name'], row['start_date'])
+
+    def add_page(self, page: dict):
+        """Notion 페이지 객체 등록 (보관/휴지통 페이지는 제거)"""
+        if page.get('archived') or page.get('in_trash'):
+            self.remove(page['id'])
+            return
+
+        self.add_row(page_to_row(page))
+
+    def load(self, store):
+        """저장소 전체 적재"""
+        self.row_mark = self.fp_mark = 0
+        self.del_mark = store.deletion_mark()
+        self.refresh(store)
+
+    def refresh(self, store) -> int:
+        """마지막 적재 이후 저장소에 쓰인 행/지문과 삭제 반영 (반영 건수 반환)"""
+        count = 0
+        for seq, row in store.rows_after(self.row_mark):
+            self.add_row(row)
+            self.row_mark = seq
+            count += 1
+        for seq, page_id, fp in store.fingerprints_after(self.fp_mark):
+            self.fingerprints.add(page_id, fp)
+            self.fp_mark = seq
+        for mark, page_id in store.deletions_after(self.del_mark):
+            self.remove(page_id)
+            self.del_mark = mark
+            count += 1
+        return count
+
+    def remove(self, page_id: str):
+        """페이지 키 제거"""
+        url_key, pd_key = self.page_keys.pop(page_id, (None, None))
+        if url_key and self.by_url.get(url_key) == page_id:
+            del self.by_url[url_key]
+        if pd_key and self.by_project_date.get(pd_key) == page_id:
+            del self.by_project_date[pd_key]
+        self.fingerprints.remove(page_id)
+
+    @asynccontextmanager
+    async def reserve(self, url, project_name, start_date, store=None, poll: float = 0.2):
+        """원본 링크 / (프로젝트명, 시작일) 키를 저장이 끝날 때까지 예약
+
+        같은 키를 저장하려는 다른 작업은 앞선 저장이 끝날 때까지 기다린 뒤 중복을
+        다시 확인한다. 저장이 성공하면 on_written 이 저장소/인덱스에 반영한 뒤 풀리고,
+        실패하면 그대로 풀려 다음 작업이 저장한다.
+
+        프로세스 안에서는 asyncio.Lock 으로 줄을 세우고, store 가 있으면 같은 키를
+        저장소(EventStore.reserve) 에도 잡아 같은 파일을 쓰는 다른 프로세스와도 겹치지 않게 한다.
+        """
+        url_key = normalize_url(url)
+        pd_key = project_date_key(project_name, start_date)
+        # 여러 키를 항상 같은 순서로 잡아 교착 방지
+        keys = sorted((key for key in (('url', url_key), ('project_date', pd_key)) if key[1]), key=repr)
+
+        joined, held = [], []
+        stored_keys, owner = [], uuid.uuid4().hex
+        try:
+            for key in keys:
+                entry = self.reservations.setdefault(key, [asyncio.Lock(), 0])
+                entry[1] += 1
+                joined.append(key)
+                await entry[0].acquire()
+                held.append(key)
+
+            if store is not None and keys:
+                names = [f"url:{url_key}"] if url_key else []
+                if pd_key:
+                    names.append(f"pd:{pd_key[0]}|{pd_key[1]}")
+                # 다른 프로세스가 같은 키를 저장 중이면 끝날 때까지 대기
+                while not store.reserve(names, owner):
+                    await asyncio.sleep(poll)
+                stored_keys = names
+            yield
+        finally:
+            if stored_keys:
+                store.release(stored_keys, owner)
+            for key in joined:
+                entry = self.reservations[key]
+                if key in held:
+                    entry[0].release()
+                entry[1] -= 1
+                if not entry[1]:
+                    del self.reservations[key]
+
+    def find_duplicate(self, url, project_name, start_date):
+        """중복 사유 반환 ('url' / 'project_date'), 없으면 None"""
+        url_key = normalize_url(url)
+        if url_key and url_key in self.by_url:
+            return 'url'
+
+        pd_key = project_date_key(project_name, start_date)
+        if pd_key and pd_key in self.by_project_date:
+            return 'project_date'
+
+        return None
+
+    def precheck(self, url, text):
+        """AI 분석 전 중복 확인 (원본 링크 일치 또는 본문 근사 일치)
+
+        (사유, page_id) 반환, 사유는 'url' / 'content', 없으면 (None, None)
+        """
+        url_key = normalize_url(url)
+        if url_key and url_key in self.by_url:
+            return 'url', self.by_url[url_key]
+
+        page_id = self.fingerprints.find(simhash(text))
+        if page_id:
+            return 'content', page_id
+
+        return None, None
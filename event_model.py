@@ -0,0 +1,344 @@
+import re
+from dataclasses import dataclass, fields as dataclass_fields
+from datetime import date
+
+# 이벤트 한 건의 형식과 변환
+#
+# - AI 추출 결과: OpenAI JSON 스키마, 검증/변환 (잘못된 필드는 이름을 돌려주고 호출자가 그 필드만 다시 묻는다)
+# - Notion 페이지 ↔ Event: PROPERTIES 표에서 한 번 만든 변환 함수로 읽고 씀
+#   (봇 저장, 로컬 저장소, 마이그레이션 스크립트 공용)
+
+LOCATIONS = ("온라인", "오프라인")
+LOCATION_ALIASES = {"online": "온라인", "offline": "오프라인", "on-line": "온라인", "off-line": "오프라인"}
+
+# 값 없음으로 보는 문자열
+BLANK = ("", "N/A", "n/a", "None", "none", "null")
+
+# 필드별 형식: text / title (비어 있으면 안 됨) / date / int / location
+FIELD_TYPES = {
+    "event_title": "title",
+    "project_name": "text",
+    "total_prize": "text",
+    "prize_per_round": "text",
+    "start_date": "date",
+    "end_date": "date",
+    "duration_days": "int",
+    "mission_content": "text",
+    "location": "location",
+    "prize_value": "number",
+    "url": "url",
+}
+
+SCHEMA_TYPES = {
+    "title": {"type": "string"},
+    "text": {"type": ["string", "null"]},
+    "date": {"type": ["string", "null"], "format": "date"},
+    "int": {"type": ["integer", "null"]},
+    "location": {"type": "string", "enum": list(LOCATIONS)},
+}
+
+INT_RE = re.compile(r'-?\d+')
+
+
+@dataclass(slots=True)
+class Event:
+    """이벤트 한 건 (날짜는 date, 진행 일수는 int, 장소는 LOCATIONS 중 하나)
+
+    page_id / last_edited_time 은 Notion 에서 읽은 경우에만 있다.
+    """
+    event_title: str = None
+    project_name: str = None
+    total_prize: str = None
+    prize_per_round: str = None
+    start_date: date = None
+    end_date: date = None
+    duration_days: int = None
+    mission_content: str = None
+    location: str = "온라인"
+    prize_value: float = None
+    url: str = None
+    page_id: str = None
+    last_edited_time: str = None
+
+    def to_dict(self) -> dict:
+        """JSON 으로 옮길 수 있는 dict (날짜는 YYYY-MM-DD, 값 없는 Notion 전용 필드 제외)"""
+        data = {name: getattr(self, name) for name in EVENT_SLOTS}
+        for name in ("start_date", "end_date"):
+            if data[name] is not None:
+                data[name] = data[name].isoformat()
+        for name in ("prize_value", "url", "page_id", "last_edited_time"):
+            if data[name] is None:
+                del data[name]
+        return data
+
+
+EVENT_SLOTS = [f.name for f in dataclass_fields(Event)]
+
+
+def _text(value):
+    if value is None:
+        return None
+    value = str(value).strip()
+    return None if value in BLANK else value
+
+
+def _title(value):
+    value = _text(value)
+    if value is None:
+        raise ValueError("빈 값")
+    return value
+
+
+def _date(value):
+    if isinstance(value, date):
+        return value
+    value = _text(value)
+    return date.fromisoformat(value[:10]) if value else None
+
+
+def _int(value):
+    if isinstance(value, bool):
+        raise ValueError("정수 아님")
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    if not isinstance(value, int):
+        value = _text(value)
+        if value is None:
+            return None
+        match = INT_RE.search(value)
+        if not match:
+            raise ValueError("정수 아님")
+        value = int(match[0])
+    if value < 0:
+        raise ValueError("음수")
+    return value
+
+
+def _location(value):
+    value = _text(value)
+    if value is None:
+        return "온라인"
+    value = LOCATION_ALIASES.get(value.casefold(), value)
+    if value not in LOCATIONS:
+        raise ValueError("장소 값 아님")
+    return value
+
+
+def _number(value):
+    if isinstance(value, bool):
+        raise ValueError("숫자 아님")
+    if value is None or isinstance(value, (int, float)):
+        return value
+    value = _text(value)
+    return float(value.replace(",", "")) if value else None
+
+
+def _url(value):
+    # "URL 없음", "비공개 채널" 같은 안내 문구는 링크 없음
+    value = _text(value)
+    return value if value and value.startswith("http") else None
+
+
+COERCE = {
+    "title": _title, "text": _text, "date": _date, "int": _int, "location": _location,
+    "number": _number, "url": _url,
+}
+
+
+def coerce(raw: dict, fields: list = None):
+    """raw 를 Event 로 변환, (Event, 잘못된 필드 목록) 반환
+
+    fields 에 있는 필드만 검증하고 (없으면 전체) 잘못된 값은 기본값으로 둔다.
+    종료일이 시작일보다 앞서면 종료일을 잘못된 값으로 본다.
+    진행 일수가 없으면 시작일~종료일로 계산한다.
+    """
+    fields = fields if fields is not None else list(FIELD_TYPES)
+    values = {}
+    invalid = []
+    for name, kind in FIELD_TYPES.items():
+        if name not in raw:
+            if kind == "title" and name in fields:
+                invalid.append(name)
+            continue
+        try:
+            values[name] = COERCE[kind](raw[name])
+        except (ValueError, TypeError):
+            if name in fields:
+                invalid.append(name)
+
+    event = Event(**values)
+    if event.start_date and event.end_date and event.end_date < event.start_date:
+        event.end_date = None
+        if "end_date" in fields:
+            invalid.append("end_date")
+    if event.duration_days is None and event.start_date and event.end_date:
+        event.duration_days = (event.end_date - event.start_date).days
+
+    return event, invalid
+
+
+def object_schema(fields: list) -> dict:
+    """fields 만 담은 객체의 JSON 스키마 (strict: 모든 필드 필수, 추가 필드 없음)"""
+    return {
+        "type": "object",
+        "properties": {name: SCHEMA_TYPES[FIELD_TYPES[name]] for name in fields},
+        "required": list(fields),
+        "additionalProperties": False,
+    }
+
+
+def response_format(fields: list, batch: bool = False) -> dict:
+    """chat.completions 의 response_format (structured outputs)
+
+    묶음 요청은 최상위가 객체여야 해서 {"events": [{"index": 번호, ...}, ...]} 형식.
+    """
+    schema = object_schema(fields)
+    if batch:
+        item = dict(schema, properties={"index": {"type": "integer"}, **schema["properties"]},
+                    required=["index", *schema["required"]])
+        schema = {
+            "type": "object",
+            "properties": {"events": {"type": "array", "items": item}},
+            "required": ["events"],
+            "additionalProperties": False,
+        }
+    return {
+        "type": "json_schema",
+        "json_schema": {"name": "events" if batch else "event", "strict": True, "schema": schema},
+    }
+
+
+def from_dict(data: dict) -> Event:
+    """dict (캐시, 규칙 추출 결과 등) → Event, 잘못된 값은 비움"""
+    return coerce(data, fields=[])[0]
+
+
+# --- Notion 속성 ---
+
+# (Notion 속성 이름, 형식, Event 필드, 최대 글자 수)
+PROPERTIES = [
+    ("이벤트 제목", "title", "event_title", 100),
+    ("프로젝트명", "rich_text", "project_name", 100),
+    ("원본 링크", "url", "url", 2000),
+    ("총 상금", "rich_text", "total_prize", 2000),
+    ("회차별 상금", "rich_text", "prize_per_round", 2000),
+    ("상금 가치", "number", "prize_value", None),
+    ("이벤트 시작일", "date_range", ("start_date", "end_date"), None),
+    ("이벤트 진행 기간", "number", "duration_days", None),
+    ("미션 내용", "rich_text", "mission_content", 2000),
+    ("장소", "select", "location", None),
+]
+
+
+def _read_text(kind):
+    def read(prop):
+        items = prop.get(kind)
+        if not items:
+            return None
+        if len(items) == 1:
+            return items[0]['text']['content'] if 'text' in items[0] else items[0].get('plain_text')
+        return "".join(item['text']['content'] if 'text' in item else item.get('plain_text', '') for item in items)
+    return read
+
+
+def _read_date(value: str):
+    try:
+        return date.fromisoformat(value[:10]) if value else None
+    except ValueError:
+        return None
+
+
+def _read_date_range(prop):
+    value = prop.get('date')
+    if not value:
+        return None, None
+    return _read_date(value.get('start')), _read_date(value.get('end'))
+
+
+def _read_select(prop):
+    value = prop.get('select')
+    return value.get('name') if value else None
+
+
+READERS = {
+    "title": _read_text("title"),
+    "rich_text": _read_text("rich_text"),
+    "url": lambda prop: prop.get('url'),
+    "number": lambda prop: prop.get('number'),
+    "date_range": _read_date_range,
+    "select": _read_select,
+}
+
+
+def _write_text(kind, limit):
+    def write(value):
+        return {kind: [{"text": {"content": str(value)[:limit]}}]}
+    return write
+
+
+def _write_date_range(value):
+    start, end = value
+    if start is None:
+        return None
+    date_range = {"start": start.isoformat()}
+    if end is not None and end != start:
+        date_range["end"] = end.isoformat()
+    return {"date": date_range}
+
+
+def _writer(kind, limit):
+    if kind in ("title", "rich_text"):
+        return _write_text(kind, limit)
+    if kind == "url":
+        return lambda value: {"url": value[:limit]}
+    if kind == "number":
+        return lambda value: {"number": value}
+    if kind == "date_range":
+        return _write_date_range
+    if kind == "select":
+        return lambda value: {"select": {"name": value}} if value in LOCATIONS else None
+    raise ValueError(kind)
+
+
+# 표에서 한 번 만든 (속성 이름, Event 필드, 읽기, 쓰기)
+CODECS = [(name, field, READERS[kind], _writer(kind, limit)) for name, kind, field, limit in PROPERTIES]
+EMPTY = {}
+
+
+def from_page(page: dict) -> Event:
+    """Notion 페이지 → Event"""
+    properties = page.get('properties') or EMPTY
+    event = Event(page_id=page.get('id'), last_edited_time=page.get('last_edited_time'), location=None)
+    for name, field, read, _ in CODECS:
+        prop = properties.get(name)
+        if not prop:
+            continue
+        if isinstance(field, tuple):
+            event.start_date, event.end_date = read(prop)
+        else:
+            setattr(event, field, read(prop))
+    return event
+
+
+def to_properties(event: Event, names: list = None) -> dict:
+    """Event → Notion 속성 (값 없는 속성은 뺌, names 가 있으면 그 속성만)"""
+    properties = {}
+    for name, field, _, write in CODECS:
+        if names is not None and name not in names:
+            continue
+        if isinstance(field, tuple):
+            value = (getattr(event, field[0]), getattr(event, field[1]))
+        else:
+            value = getattr(event, field)
+            if value is None:
+                continue
+        prop = write(value)
+        if prop is not None:
+            properties[name] = prop
+    return properties
+
+
+def read_property(properties: dict, name: str, kind: str):
+    """표에 없는 속성 하나 읽기 (예: 예전 '이벤트 종료일' 열)"""
+    prop = properties.get(name)
+    return READERS[kind](prop) if prop else None
@@ -0,0 +1,155 @@
+import math
+import sqlite3
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import Counter
+from datetime import date
+
+# 조회 명령(/stats, /search, /upcoming)용 열 단위 메모리 스냅샷
+#
+# 로컬 저장소(EventStore) 의 events 행을 필드별 배열로 옮겨 두고, 시작일 정렬 순서와
+# 프로젝트별 행 번호 색인으로 조회한다. 행의 값은 저장소가 Notion 페이지를
+# event_model 변환표로 읽어 둔 것이라 봇 저장과 같은 필드 매핑을 쓴다.
+# 스냅샷은 만든 뒤 바꾸지 않고, 저장소가 바뀌면 새로 만들어 통째로 교체한다.
+
+NO_DATE = 0
+COLUMNS = ["page_id", "title", "project_name", "total_prize", "prize_value",
+           "start_date", "end_date", "location", "url"]
+
+
+def _ordinal(value) -> int:
+    """YYYY-MM-DD → date ordinal (없거나 잘못된 값은 NO_DATE)"""
+    try:
+        return date.fromisoformat(value[:10]).toordinal() if value else NO_DATE
+    except ValueError:
+        return NO_DATE
+
+
+def store_signature(conn) -> tuple:
+    """저장소가 바뀌었는지 비교할 값 (마지막 쓰기 순번, 삭제 기록 id, 행 수)"""
+    return tuple(conn.execute(
+        "SELECT (SELECT COALESCE(MAX(seq), 0) FROM events), "
+        "(SELECT COALESCE(MAX(id), 0) FROM deletions), (SELECT COUNT(*) FROM events)"
+    ).fetchone())
+
+
+class EventSnapshot:
+    """이벤트 열 배열 + 시작일/프로젝트 색인 (조회는 네트워크/DB 없이 메모리에서)"""
+
+    def __init__(self):
+        self.page_id = []
+        self.title = []
+        self.project = []
+        self.total_prize = []
+        self.url = []
+        self.start = array('l')        # 시작일 ordinal (NO_DATE = 없음)
+        self.end = array('l')          # 종료일 ordinal (없으면 시작일)
+        self.prize_value = array('d')  # 상금 가치 (nan = 없음)
+        self.offline = bytearray()     # 1 = 오프라인
+        self.by_project = {}           # 비교용 프로젝트명 → 행 번호 목록
+        self.by_start = array('l')     # 시작일 순 행 번호 (시작일 없는 행 제외)
+        self.start_sorted = array('l') # by_start 순서의 시작일 (bisect 용)
+        self.signature = None
+        self.built_at = 0.0
+        self.build_seconds = 0.0
+
+    def __len__(self):
+        return len(self.page_id)
+
+    @classmethod
+    def build(cls, path: str) -> "EventSnapshot":
+        """저장소 파일에서 스냅샷 생성 (읽기 전용 연결을 따로 열어 다른 스레드에서도 호출 가능)"""
+        started = time.monotonic()
+        snapshot = cls()
+        conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        try:
+            snapshot.signature = store_signature(conn)
+            for row in conn.execute(f"SELECT {', '.join(COLUMNS)} FROM events"):
+                snapshot._append(*row)
+        finally:
+            conn.close()
+
+        order = sorted((i for i, start in enumerate(snapshot.start) if start != NO_DATE),
+                       key=snapshot.start.__getitem__)
+        snapshot.by_start = array('l', order)
+        snapshot.start_sorted = array('l', (snapshot.start[i] for i in order))
+        snapshot.built_at = time.time()
+        snapshot.build_seconds = time.monotonic() - started
+        return snapshot
+
+    def _append(self, page_id, title, project_name, total_prize, prize_value,
+                start_date, end_date, location, url):
+        row = len(self.page_id)
+        self.page_id.append(page_id)
+        self.title.append(title)
+        self.project.append(project_name)
+        self.total_prize.append(total_prize)
+        self.url.append(url)
+        start = _ordinal(start_date)
+        self.start.append(start)
+        self.end.append(_ordinal(end_date) or start)
+        self.prize_value.append(prize_value if prize_value is not None else math.nan)
+        self.offline.append(1 if location == "오프라인" else 0)
+        # 저장소의 project_key 는 시작일이 있을 때만 채워지므로 프로젝트명으로 직접 만듦
+        key = project_name.strip().casefold() if project_name else None
+        if key:
+            self.by_project.setdefault(key, []).append(row)
+
+    def stale(self, conn) -> bool:
+        """저장소가 스냅샷을 만든 뒤 바뀌었는지"""
+        return store_signature(conn) != self.signature
+
+    # --- 조회 ---
+
+    def starting_between(self, first: date, last: date) -> list:
+        """시작일이 [first, last] 인 행 번호 (시작일 순)"""
+        lo = bisect_left(self.start_sorted, first.toordinal())
+        hi = bisect_right(self.start_sorted, last.toordinal())
+        return list(self.by_start[lo:hi])
+
+    def ongoing(self, day: date) -> list:
+        """day 에 진행 중인 행 번호 (시작일 순)"""
+        ordinal = day.toordinal()
+        hi = bisect_right(self.start_sorted, ordinal)
+        return [i for i in self.by_start[:hi] if self.end[i] >= ordinal]
+
+    def stats(self, rows: list, top: int = 5) -> dict:
+        """행 묶음 통계: 건수, 온/오프라인, 프로젝트별 건수, 상금 가치 합계와 상위 행"""
+        offline = sum(self.offline[i] for i in rows)
+        projects = Counter(self.project[i] for i in rows if self.project[i])
+        valued = [i for i in rows if not math.isnan(self.prize_value[i])]
+        return {
+            "count": len(rows),
+            "online": len(rows) - offline,
+            "offline": offline,
+            "projects": projects.most_common(top),
+            "prize_value_total": sum(self.prize_value[i] for i in valued),
+            "top_prize": sorted(valued, key=self.prize_value.__getitem__, reverse=True)[:top],
+        }
+
+    def search(self, query: str, limit: int = 10) -> list:
+        """프로젝트명 (정확히 일치 우선, 없으면 부분 일치) 또는 제목에 query 가 들어간 행 번호 (최근 시작일 순)"""
+        key = query.strip().casefold()
+        if not key:
+            return []
+        rows = self.by_project.get(key)
+        if rows is None:
+            rows = [i for project, matched in self.by_project.items() if key in project for i in matched]
+        if not rows:
+            rows = [i for i, title in enumerate(self.title) if title and key in title.casefold()]
+        return sorted(rows, key=self.start.__getitem__, reverse=True)[:limit]
+
+    def row(self, i: int) -> dict:
+        """행 하나 (답장 표시용)"""
+        return {
+            "page_id": self.page_id[i],
+            "title": self.title[i],
+            "project_name": self.project[i],
+            "total_prize": self.total_prize[i],
+            "start_date": date.fromordinal(self.start[i]) if self.start[i] else None,
+            "end_date": date.fromordinal(self.end[i]) if self.end[i] else None,
+            "prize_value": None if math.isnan(self.prize_value[i]) else self.prize_value[i],
+            "location": "오프라인" if self.offline[i] else "온라인",
+            "url": self.url[i],
+        }
@@ -0,0 +1,523 @@
+import json
+import logging
+import sqlite3
+import threading
+import time
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+from event_model import from_page
+
+logger = logging.getLogger(__name__)
+
+# 중복 판정에 영향을 주지 않는 추적용 쿼리 파라미터
+TRACKING_PARAMS = {"fbclid", "gclid", "igshid", "ref", "ref_src", "s", "si", "single", "t"}
+
+# 텔레그램 링크 도메인 별칭
+TELEGRAM_HOSTS = {"t.me", "www.t.me", "telegram.me", "www.telegram.me"}
+
+
+def normalize_url(url) -> str:
+    """중복 비교용 URL 정규화 (대소문자, 추적 파라미터, 끝 슬래시 제거)"""
+    if not url:
+        return None
+
+    url = str(url).strip()
+    if not url.startswith("http"):
+        return None
+
+    parts = urlsplit(url)
+    host = parts.netloc.lower()
+    path = parts.path.rstrip("/")
+
+    if host in TELEGRAM_HOSTS:
+        host = "t.me"
+        # t.me/s/<채널>/<id> 미리보기 링크도 같은 게시물
+        if path.startswith("/s/"):
+            path = path[2:]
+
+    query = [
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if k not in TRACKING_PARAMS and not k.startswith("utm_")
+    ]
+
+    return urlunsplit(("https", host, path, urlencode(sorted(query)), ""))
+
+
+def project_date_key(project_name, start_date):
+    """(프로젝트명, 시작일) 비교 키"""
+    if not project_name or not start_date:
+        return None
+
+    project = str(project_name).strip().casefold()
+    start = str(start_date).strip()[:10]
+    if not project or project in ["n/a", "none", "미확인"] or start in ["None", "null", "N/A", ""]:
+        return None
+
+    return (project, start)
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    page_id          TEXT PRIMARY KEY,
+    title            TEXT,     -- 이벤트 제목
+    project_name     TEXT,     -- 프로젝트명
+    total_prize      TEXT,     -- 총 상금
+    prize_per_round  TEXT,     -- 회차별 상금
+    prize_value      REAL,     -- 상금 가치
+    start_date       TEXT,     -- 이벤트 시작일 (start)
+    end_date         TEXT,     -- 이벤트 시작일 (end)
+    duration_days    INTEGER,  -- 이벤트 진행 기간
+    mission_content  TEXT,     -- 미션 내용
+    location         TEXT,     -- 장소
+    url              TEXT,     -- 원본 링크
+    url_key          TEXT,     -- 정규화된 원본 링크
+    project_key      TEXT,     -- 비교용 프로젝트명
+    last_edited_time TEXT,
+    properties       TEXT,     -- Notion properties 원본 (JSON)
+    seq              INTEGER   -- 쓰기 순번 (sequence 카운터)
+);
+CREATE INDEX IF NOT EXISTS idx_events_url_key ON events (url_key);
+CREATE INDEX IF NOT EXISTS idx_events_project ON events (project_key, start_date);
+CREATE INDEX IF NOT EXISTS idx_events_dates ON events (start_date, end_date);
+
+-- 봇이 저장한 메시지 본문의 SimHash (근사 중복 판정용)
+CREATE TABLE IF NOT EXISTS fingerprints (
+    page_id TEXT PRIMARY KEY,
+    simhash TEXT NOT NULL,
+    seq     INTEGER
+);
+
+-- 삭제/보관된 페이지 (다른 프로세스의 인덱스가 id 기준으로 따라 지움)
+CREATE TABLE IF NOT EXISTS deletions (
+    id      INTEGER PRIMARY KEY AUTOINCREMENT,
+    page_id TEXT NOT NULL
+);
+
+-- 저장 중인 이벤트 키 (여러 프로세스가 같은 이벤트를 동시에 Notion 에 쓰지 않도록, 저장이 끝나면 지움)
+CREATE TABLE IF NOT EXISTS reservations (
+    key        TEXT PRIMARY KEY,  -- url:<정규화 링크> / pd:<프로젝트명>|<시작일>
+    owner      TEXT NOT NULL,     -- 예약한 작업 (다른 작업의 예약을 지우지 않도록)
+    expires_at REAL NOT NULL      -- 프로세스가 멈춰 풀리지 않은 예약의 만료 시각
+);
+
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT
+);
+
+-- 증가만 하는 쓰기 순번 (rowid 는 마지막 행을 지우면 재사용되므로 변경분 추적에 쓰지 않음)
+CREATE TABLE IF NOT EXISTS sequence (
+    name  TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+# seq 열이 생긴 뒤 실행 (이전 DB 는 _migrate 가 먼저 열을 추가)
+# INSERT OR REPLACE 도 AFTER INSERT 트리거를 실행하므로 다시 쓴 행은 새 순번을 받는다.
+# 카운터 증가가 쓰기와 같은 트랜잭션이라 여러 프로세스가 써도 순번이 겹치지 않음.
+SEQUENCE = """
+INSERT OR IGNORE INTO sequence (name, value) SELECT 'rows', MAX(
+    (SELECT COALESCE(MAX(seq), 0) FROM events), (SELECT COALESCE(MAX(seq), 0) FROM fingerprints)
+);
+CREATE INDEX IF NOT EXISTS idx_events_seq ON events (seq);
+CREATE INDEX IF NOT EXISTS idx_fingerprints_seq ON fingerprints (seq);
+
+CREATE TRIGGER IF NOT EXISTS events_seq AFTER INSERT ON events BEGIN
+    UPDATE sequence SET value = value + 1 WHERE name = 'rows';
+    UPDATE events SET seq = (SELECT value FROM sequence WHERE name = 'rows') WHERE rowid = NEW.rowid;
+END;
+CREATE TRIGGER IF NOT EXISTS fingerprints_seq AFTER INSERT ON fingerprints BEGIN
+    UPDATE sequence SET value = value + 1 WHERE name = 'rows';
+    UPDATE fingerprints SET seq = (SELECT value FROM sequence WHERE name = 'rows') WHERE rowid = NEW.rowid;
+END;
+"""
+
+COLUMNS = [
+    "page_id", "title", "project_name", "total_prize", "prize_per_round",
+    "prize_value", "start_date", "end_date", "duration_days", "mission_content",
+    "location", "url", "url_key", "project_key", "last_edited_time", "properties",
+]
+
+
+def page_to_row(page: dict) -> dict:
+    """Notion 페이지 → events 테이블 행"""
+    event = from_page(page)
+    start_date = event.start_date.isoformat() if event.start_date else None
+    pd_key = project_date_key(event.project_name, start_date)
+
+    return {
+        "page_id": event.page_id,
+        "title": event.event_title,
+        "project_name": event.project_name,
+        "total_prize": event.total_prize,
+        "prize_per_round": event.prize_per_round,
+        "prize_value": event.prize_value,
+        "start_date": start_date,
+        "end_date": event.end_date.isoformat() if event.end_date else None,
+        "duration_days": event.duration_days,
+        "mission_content": event.mission_content,
+        "location": event.location,
+        "url": event.url,
+        "url_key": normalize_url(event.url),
+        "project_key": pd_key[0] if pd_key else None,
+        "last_edited_time": event.last_edited_time,
+        "properties": json.dumps(page.get('properties', {}), ensure_ascii=False),
+    }
+
+
+class EventStore:
+    """Notion 이벤트 데이터베이스의 로컬 SQLite 미러
+
+    save_to_notion 성공 시 write-through 로 즉시 반영하고,
+    sync() 로 last_edited_time 이후 변경분을 주기적으로 가져온다.
+    데이터베이스 조회에는 삭제된 페이지가 나오지 않으므로 reconcile() 로
+    가끔 전체 페이지 ID 를 받아 없어진 페이지를 지운다.
+    """
+
+    def __init__(self, path: str = "events.db"):
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+        self._migrate()
+        self.conn.executescript(SEQUENCE)
+        self.conn.commit()
+
+    def _migrate(self):
+        """seq 열이 없는 이전 DB 에 열 추가 (기존 행은 rowid 순서를 순번으로)"""
+        with self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")
+            for table in ("events", "fingerprints"):
+                columns = [row[1] for row in self.conn.execute(f"PRAGMA table_info({table})")]
+                if 'seq' not in columns:
+                    self.conn.execute(f"ALTER TABLE {table} ADD COLUMN seq INTEGER")
+                    self.conn.execute(f"UPDATE {table} SET seq = rowid")
+
+    def close(self):
+        self.conn.close()
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM events").fetchone()[0]
+
+    # --- meta ---
+
+    def get_meta(self, key: str, default=None):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    @property
+    def last_edited_time(self):
+        return self.get_meta('last_edited_time')
+
+    def reconcile_due(self, interval: float) -> bool:
+        """마지막 삭제 확인 후 interval 초가 지났는지 (0 이하면 끔)"""
+        if interval <= 0:
+            return False
+        return time.time() - float(self.get_meta('reconciled_at', 0)) >= interval
+
+    # --- 쓰기 ---
+
+    def upsert_pages(self, pages, advance: bool = True) -> int:
+        """Notion 페이지 반영 (보관/휴지통 페이지는 삭제), 바뀐 건수 반환
+
+        저장된 행과 내용이 같은 페이지는 다시 쓰지 않는다 (on_or_after 조회로
+        겹쳐 받은 페이지가 seq 를 바꿔 인덱스에 다시 반영되지 않도록).
+
+        advance=False 이면 동기화 기준 시각(last_edited_time)을 옮기지 않는다.
+        write-through 로 들어온 페이지가 아직 동기화되지 않은 다른 수정분을
+        건너뛰게 만들지 않기 위함.
+        """
+        rows = []
+        removed = []
+        high_water = self.last_edited_time
+
+        for page in pages:
+            if page.get('archived') or page.get('in_trash'):
+                removed.append((page['id'],))
+            else:
+                rows.append(page_to_row(page))
+
+            edited = page.get('last_edited_time')
+            if edited and (high_water is None or edited > high_water):
+                high_water = edited
+
+        stored = self._stored_versions([row['page_id'] for row in rows])
+        rows = [row for row in rows if stored.get(row['page_id']) != (row['last_edited_time'], row['properties'])]
+
+        placeholders = ", ".join(f":{c}" for c in COLUMNS)
+        with self.lock, self.conn:
+            self.conn.executemany(
+                f"INSERT OR REPLACE INTO events ({', '.join(COLUMNS)}) VALUES ({placeholders})",
+                rows
+            )
+            self._delete(removed)
+            if advance and high_water:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO meta (key, value) VALUES ('last_edited_time', ?)",
+                    (high_water,)
+                )
+
+        return len(rows) + len(removed)
+
+    def _stored_versions(self, page_ids: list, chunk_size: int = 500) -> dict:
+        """page_id → 저장된 (last_edited_time, properties)"""
+        stored = {}
+        for i in range(0, len(page_ids), chunk_size):
+            chunk = page_ids[i:i + chunk_size]
+            for page_id, edited, properties in self.conn.execute(
+                f"SELECT page_id, last_edited_time, properties FROM events "
+                f"WHERE page_id IN ({', '.join('?' * len(chunk))})",
+                chunk
+            ):
+                stored[page_id] = (edited, properties)
+        return stored
+
+    def _delete(self, removed: list):
+        """행/지문 삭제와 삭제 기록 (lock 과 트랜잭션 안에서 호출)"""
+        self.conn.executemany("DELETE FROM events WHERE page_id = ?", removed)
+        self.conn.executemany("DELETE FROM fingerprints WHERE page_id = ?", removed)
+        self.conn.executemany("INSERT INTO deletions (page_id) VALUES (?)", removed)
+
+    def upsert_page(self, page: dict):
+        """write-through 반영 (동기화 기준 시각 유지)"""
+        self.upsert_pages([page], advance=False)
+
+    def add_fingerprint(self, page_id: str, fp: int):
+        """메시지 본문 지문 저장"""
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO fingerprints (page_id, simhash) VALUES (?, ?)",
+                (page_id, format(fp, "016x"))
+            )
+
+    def reserve(self, keys: list, owner: str, ttl: float = 300.0) -> bool:
+        """keys 를 owner 로 예약 (하나라도 다른 작업이 잡고 있으면 아무것도 잡지 않고 False)
+
+        키가 PRIMARY KEY 라 같은 파일을 여는 모든 프로세스 사이에서 한 작업만 성공한다.
+        ttl 초가 지난 예약은 멈춘 프로세스의 것으로 보고 지운다.
+        """
+        now = time.time()
+        try:
+            with self.lock, self.conn:
+                self.conn.execute("DELETE FROM reservations WHERE expires_at < ?", (now,))
+                self.conn.executemany(
+                    "INSERT INTO reservations (key, owner, expires_at) VALUES (?, ?, ?)",
+                    [(key, owner, now + ttl) for key in keys]
+                )
+        except sqlite3.IntegrityError:
+            return False
+        return True
+
+    def release(self, keys: list, owner: str):
+        """owner 가 잡은 예약 해제"""
+        with self.lock, self.conn:
+            self.conn.executemany(
+                "DELETE FROM reservations WHERE key = ? AND owner = ?",
+                [(key, owner) for key in keys]
+            )
+
+    # --- 동기화 ---
+
+    def sync_query(self, full: bool = False) -> dict:
+        """증분 동기화용 databases.query 인자 (정렬 + last_edited_time 필터)"""
+        query = {"sorts": [{"timestamp": "last_edited_time", "direction": "ascending"}]}
+        if not full and self.last_edited_time:
+            # Notion last_edited_time 은 분 단위로 반올림되므로 on_or_after 로 겹치게 조회
+            query["filter"] = {
+                "timestamp": "last_edited_time",
+                "last_edited_time": {"on_or_after": self.last_edited_time},
+            }
+        return query
+
+    async def sync(self, query, full: bool = False) -> int:
+        """Notion 변경분을 가져와 반영하고 바뀐 건수 반환
+
+        query: databases.query 를 감싼 비동기 함수 (database_id 바인딩 완료)
+        """
+        changed = 0
+        async for pages in self._query_all(query, self.sync_query(full)):
+            changed += self.upsert_pages(pages)
+        return changed
+
+    async def _query_all(self, query, params: dict):
+        """커서 페이지네이션으로 조회 결과를 100건씩 돌려주는 비동기 제너레이터"""
+        params = dict(params, page_size=100)
+        while True:
+            results = await query(**params)
+            yield results.get('results', [])
+
+            if not results.get('has_more'):
+                return
+            params["start_cursor"] = results.get('next_cursor')
+
+    def reconcile_query(self) -> dict:
+        """삭제 확인용 databases.query 인자 (제목 속성만 받아 응답을 줄임)"""
+        return {"filter_properties": ["title"]}
+
+    async def reconcile(self, query) -> list:
+        """Notion 에 없는 페이지를 지우고 지운 page_id 목록 반환
+
+        전체 페이지 ID 만 받아 비교한다 (100건당 조회 1번).
+        """
+        mark = self.max_seq()
+        page_ids = set()
+        async for pages in self._query_all(query, self.reconcile_query()):
+            page_ids.update(page['id'] for page in pages)
+        return self.remove_missing(page_ids, mark)
+
+    def reconcile_blocking(self, pages) -> list:
+        """페이지 스트림과 비교해 없어진 페이지 삭제 (마이그레이션 스크립트용)
+
+        pages: notion_bulk.iter_pages(..., **store.reconcile_query()) 같은 제너레이터
+        """
+        mark = self.max_seq()
+        return self.remove_missing({page['id'] for page in pages}, mark)
+
+    def remove_missing(self, page_ids: set, mark: int) -> list:
+        """page_ids 에 없는 페이지 삭제 (삭제 확인 기록 시각 갱신)
+
+        mark: 조회 시작 전 max_seq(). 조회 도중 write-through 로 새로 쓰인 행은
+        조회 결과에 없을 수 있으므로 지우지 않는다.
+        """
+        missing = [
+            (page_id,) for page_id, in self.conn.execute(
+                "SELECT page_id FROM events WHERE seq <= ?", (mark,)
+            ).fetchall()
+            if page_id not in page_ids
+        ]
+        if missing and not page_ids:
+            # 조회 결과가 통째로 비면 권한/데이터베이스 ID 문제로 보고 지우지 않음
+            logger.warning(f"⚠️ 삭제 확인 건너뜀: Notion 조회 결과 없음 (로컬 {len(missing)}건)")
+            return []
+        with self.lock, self.conn:
+            self._delete(missing)
+            self.conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('reconciled_at', ?)", (str(time.time()),)
+            )
+        if missing:
+            logger.info(f"🗑️ Notion 에서 삭제된 페이지 {len(missing)}건 정리")
+        return [page_id for page_id, in missing]
+
+    def sync_blocking(self, pages, chunk_size: int = 100) -> int:
+        """페이지 스트림을 받아 반영 (마이그레이션 스크립트용)
+
+        pages: notion_bulk.iter_pages(..., **store.sync_query()) 같은 제너레이터
+        """
+        count = 0
+        chunk = []
+
+        for page in pages:
+            chunk.append(page)
+            if len(chunk) >= chunk_size:
+                count += self.upsert_pages(chunk)
+                chunk = []
+
+        if chunk:
+            count += self.upsert_pages(chunk)
+
+        return count
+
+    # --- 조회 ---
+
+    def find_duplicate(self, url, project_name, start_date):
+        """중복 사유 반환 ('url' / 'project_date'), 없으면 None"""
+        url_key = normalize_url(url)
+        if url_key and self.conn.execute(
+            "SELECT 1 FROM events WHERE url_key = ? LIMIT 1", (url_key,)
+        ).fetchone():
+            return 'url'
+
+        pd_key = project_date_key(project_name, start_date)
+        if pd_key and self.conn.execute(
+            "SELECT 1 FROM events WHERE project_key = ? AND substr(start_date, 1, 10) = ? LIMIT 1",
+            pd_key
+        ).fetchone():
+            return 'project_date'
+
+        return None
+
+    def get(self, page_id: str):
+        """페이지 ID 로 행 조회"""
+        row = self.conn.execute("SELECT * FROM events WHERE page_id = ?", (page_id,)).fetchone()
+        return dict(row) if row else None
+
+    def fingerprints(self):
+        """(page_id, simhash) 전체 순회"""
+        for _, page_id, fp in self.fingerprints_after(0):
+            yield page_id, fp
+
+    def fingerprints_after(self, seq: int):
+        """seq 이후에 쓰인 지문 (seq, page_id, simhash)"""
+        for seq, page_id, fp in self.conn.execute(
+            "SELECT f.seq, f.page_id, f.simhash FROM fingerprints f JOIN events e USING (page_id) "
+            "WHERE f.seq > ? ORDER BY f.seq",
+            (seq,)
+        ).fetchall():
+            yield seq, page_id, int(fp, 16)
+
+    def rows(self):
+        """전체 행 (dict)"""
+        for _, row in self.rows_after(0):
+            yield row
+
+    def max_seq(self) -> int:
+        return self.conn.execute("SELECT COALESCE(MAX(seq), 0) FROM events").fetchone()[0]
+
+    def deletions_after(self, mark: int):
+        """mark 이후 삭제된 페이지 (id, page_id)"""
+        return self.conn.execute(
+            "SELECT id, page_id FROM deletions WHERE id > ? ORDER BY id", (mark,)
+        ).fetchall()
+
+    def deletion_mark(self) -> int:
+        return self.conn.execute("SELECT COALESCE(MAX(id), 0) FROM deletions").fetchone()[0]
+
+    def rows_after(self, seq: int):
+        """seq 이후에 쓰인 행 (seq, dict)
+
+        INSERT OR REPLACE 도 새 seq 를 받으므로, 다른 프로세스가 write-through 로
+        쓴 행을 이 값 기준으로 가져올 수 있다. rowid 와 달리 지운 뒤에도 재사용되지 않는다.
+        """
+        for row in self.conn.execute(
+            f"SELECT seq, {', '.join(COLUMNS)} FROM events WHERE seq > ? ORDER BY seq",
+            (seq,)
+        ).fetchall():
+            row = dict(row)
+            yield row.pop('seq'), row
+
+    def pages(self, chunk_size: int = 500):
+        """Notion 페이지 형태 ({'id', 'properties'}) 로 전체 순회
+
+        page_id 순서로 chunk_size 건씩 읽는다. 순회 중에 write-through 로 다시 쓴
+        행은 page_id 가 그대로라 두 번 나오지 않는다.
+        """
+        last = ""
+        while True:
+            chunk = self.conn.execute(
+                "SELECT page_id, properties, last_edited_time FROM events "
+                "WHERE page_id > ? ORDER BY page_id LIMIT ?",
+                (last, chunk_size)
+            ).fetchall()
+            for page_id, properties, edited in chunk:
+                yield {"id": page_id, "properties": json.loads(properties), "last_edited_time": edited}
+            if len(chunk) < chunk_size:
+                return
+            last = chunk[-1][0]
+
+    def events_between(self, start: str, end: str) -> list:
+        """기간이 [start, end] 와 겹치는 이벤트"""
+        return [dict(r) for r in self.conn.execute(
+            "SELECT * FROM events WHERE start_date <= ? AND COALESCE(end_date, start_date) >= ? "
+            "ORDER BY start_date",
+            (end, start)
+        )]
+
+    def count_by_project(self, limit: int = 20) -> list:
+        """프로젝트별 이벤트 수"""
+        return [tuple(r) for r in self.conn.execute(
+            "SELECT project_name, COUNT(*) AS n FROM events WHERE project_name IS NOT NULL "
+            "GROUP BY project_key ORDER BY n DESC LIMIT ?",
+            (limit,)
+        )]
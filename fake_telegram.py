@@ -0,0 +1,205 @@
+import argparse
+import asyncio
+import json
+import threading
+import time
+from collections import defaultdict, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl
+
+import httpx
+
+# 로컬 시험용 가짜 텔레그램
+#
+# 1) Bot API 흉내 서버: 봇의 sendMessage / editMessageText 등을 받아 기록
+# 2) 업데이트 발송기: 웹훅 주소(여러 개면 로드 밸런서처럼 돌아가며)로 가짜 메시지 POST
+#
+# 봇은 TELEGRAM_API_BASE_URL=http://127.0.0.1:<api-port>/bot BOT_MODE=webhook 으로 실행
+
+SAMPLE = """🎉 {project} 신년맞이 이벤트 #{n}
+
+총 상금: {prize} USDT
+기간: 2026-01-{day:02d} ~ 2026-01-{end:02d}
+1등 {first} USDT, 2등 {second} USDT
+
+미션: 트위터 팔로우, 리트윗, 텔레그램 가입
+https://x.com/{project}/status/{n}"""
+
+
+class FakeBotApi:
+    """Bot API 응답 흉내 + 봇이 보낸 메시지 기록"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.message_id = 0
+        self.calls = defaultdict(int)
+        self.acks = defaultdict(deque)   # chat_id → 접수 답장 시각
+
+    def handle(self, method: str, params: dict):
+        with self.lock:
+            self.calls[method] += 1
+
+            if method == 'getMe':
+                return {"id": 1, "is_bot": True, "first_name": "fake", "username": "fake_bot"}
+            if method in ('sendMessage', 'editMessageText'):
+                chat_id = int(params.get('chat_id', 0))
+                if method == 'sendMessage':
+                    self.message_id += 1
+                    self.acks[chat_id].append(time.monotonic())
+                return {
+                    "message_id": int(params.get('message_id') or self.message_id),
+                    "date": int(time.time()),
+                    "chat": {"id": chat_id, "type": "private"},
+                    "text": params.get('text', ''),
+                }
+            return True
+
+    def serve(self, port: int) -> ThreadingHTTPServer:
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get('Content-Length') or 0)).decode()
+                if 'json' in (self.headers.get('Content-Type') or ''):
+                    params = json.loads(body or '{}')
+                else:
+                    params = dict(parse_qsl(body))
+
+                result = api.handle(self.path.rsplit('/', 1)[-1], params)
+                payload = json.dumps({"ok": True, "result": result}).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            do_GET = do_POST
+
+            def log_message(self, *args):
+                pass
+
+        # 여러 봇 프로세스의 동시 요청을 받도록 연결 대기열을 늘림
+        server_class = type('FakeApiServer', (ThreadingHTTPServer,), {'request_queue_size': 256, 'daemon_threads': True})
+        server = server_class(('127.0.0.1', port), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+
+def make_update(n: int, chat_id: int, forwarded: bool) -> dict:
+    """가짜 텔레그램 업데이트 (포워딩 / 일반 메시지)"""
+    now = int(time.time())
+    project = f"FakeProject{n}"
+    message = {
+        "message_id": n,
+        "date": now,
+        "chat": {"id": chat_id, "type": "private", "first_name": "tester"},
+        "from": {"id": chat_id, "is_bot": False, "first_name": "tester"},
+        "text": SAMPLE.format(
+            project=project, n=n, prize=1000 + n, day=1 + n % 20, end=8 + n % 20,
+            first=500 + n, second=250 + n
+        ),
+    }
+    if forwarded:
+        message["forward_origin"] = {
+            "type": "channel",
+            "chat": {"id": -1000000000000 - n, "type": "channel", "title": project, "username": f"fake_channel_{n}"},
+            "message_id": n,
+            "date": now,
+        }
+    return {"update_id": n, "message": message}
+
+
+def percentile(values: list, p: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+async def post_updates(targets: list, updates: int, chats: int, concurrency: int, secret: str):
+    """업데이트를 targets 에 돌아가며 POST, 채팅방별 발송 시각과 응답 지연 반환"""
+    semaphore = asyncio.Semaphore(concurrency)
+    sent = defaultdict(list)
+    latencies = []
+    errors = 0
+    headers = {"X-Telegram-Bot-Api-Secret-Token": secret} if secret else {}
+
+    async with httpx.AsyncClient(timeout=30) as client:
+        async def post(n: int):
+            nonlocal errors
+            chat_id = 1000 + n % chats
+            async with semaphore:
+                started = time.monotonic()
+                sent[chat_id].append(started)
+                try:
+                    response = await client.post(
+                        targets[n % len(targets)], json=make_update(n, chat_id, n % 2 == 0), headers=headers
+                    )
+                    response.raise_for_status()
+                    latencies.append(time.monotonic() - started)
+                except Exception as e:
+                    errors += 1
+                    print(f"❌ 업데이트 #{n} 전송 실패: {e}")
+
+        await asyncio.gather(*(post(n) for n in range(1, updates + 1)))
+
+    return sent, latencies, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description="가짜 텔레그램 업데이트 발송기 (웹훅 부하 시험)")
+    parser.add_argument('--targets', default='http://127.0.0.1:8443/telegram',
+                        help="웹훅 주소 (쉼표로 여러 개, 돌아가며 전송)")
+    parser.add_argument('--api-port', type=int, default=8081, help="가짜 Bot API 포트")
+    parser.add_argument('--updates', type=int, default=200, help="보낼 업데이트 수")
+    parser.add_argument('--chats', type=int, default=10, help="채팅방 수")
+    parser.add_argument('--concurrency', type=int, default=32, help="동시 전송 수")
+    parser.add_argument('--secret', default=None, help="WEBHOOK_SECRET 과 같은 값")
+    parser.add_argument('--wait', type=float, default=30, help="접수 답장을 기다릴 최대 시간 (초)")
+    parser.add_argument('--delay', type=float, default=0, help="봇이 뜰 때까지 전송 전 대기 (초)")
+    parser.add_argument('--serve-only', action='store_true', help="Bot API 서버만 띄우고 대기")
+    args = parser.parse_args()
+
+    api = FakeBotApi()
+    api.serve(args.api_port)
+    print(f"🤖 가짜 Bot API: http://127.0.0.1:{args.api_port}/bot")
+
+    if args.serve_only:
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            return
+
+    time.sleep(args.delay)
+    targets = [t.strip() for t in args.targets.split(',') if t.strip()]
+    started = time.monotonic()
+    sent, latencies, errors = asyncio.run(
+        post_updates(targets, args.updates, args.chats, args.concurrency, args.secret)
+    )
+    elapsed = time.monotonic() - started
+
+    # 모든 업데이트에 접수 답장이 올 때까지 대기
+    deadline = time.monotonic() + args.wait
+    while time.monotonic() < deadline and api.calls['sendMessage'] < args.updates - errors:
+        time.sleep(0.2)
+
+    # 채팅방별로 보낸 순서와 답장 순서를 짝지어 접수 지연 계산
+    ack_latencies = []
+    for chat_id, times in sent.items():
+        for posted, acked in zip(sorted(times), api.acks.get(chat_id, [])):
+            ack_latencies.append(acked - posted)
+
+    print(f"\n{'='*60}")
+    print(f"📤 전송: {args.updates - errors}/{args.updates}건, {elapsed:.2f}초 "
+          f"({(args.updates - errors) / elapsed:.1f}건/s), 대상 {len(targets)}개")
+    print(f"   POST 지연 p50 {percentile(latencies, 0.5) * 1000:.0f}ms · "
+          f"p95 {percentile(latencies, 0.95) * 1000:.0f}ms")
+    print(f"📥 접수 답장: {api.calls['sendMessage']}건 · 지연 p50 {percentile(ack_latencies, 0.5) * 1000:.0f}ms · "
+          f"p95 {percentile(ack_latencies, 0.95) * 1000:.0f}ms")
+    print(f"✏️ 답장 수정: {api.calls['editMessageText']}건")
+    print(f"{'='*60}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+import hashlib
+
+from llm_cache import URL_RE, normalize_text
+
+SIMHASH_BITS = 64
+
+# 64비트를 8비트씩 8개 블록으로 나눠 색인 (해밍 거리 7 이하면 최소 한 블록이 일치)
+BLOCK_BITS = 8
+BLOCKS = SIMHASH_BITS // BLOCK_BITS
+BLOCK_MASK = (1 << BLOCK_BITS) - 1
+
+# 이보다 짧은 메시지는 지문이 불안정하므로 근사 중복 판정에서 제외
+MIN_TOKENS = 8
+
+
+def _tokens(text: str) -> list:
+    """지문용 단어 목록 (링크는 원본 링크 비교에서 따로 처리하므로 제외)"""
+    return normalize_text(URL_RE.sub(" ", text or "")).split()
+
+
+def shingles(text: str, size: int = 3) -> list:
+    """정규화된 단어 n-gram"""
+    tokens = _tokens(text)
+    if len(tokens) < size:
+        return [" ".join(tokens)] if tokens else []
+    return [" ".join(tokens[i:i + size]) for i in range(len(tokens) - size + 1)]
+
+
+def simhash(text: str):
+    """단어 3-gram SimHash (64비트), 너무 짧은 메시지는 None"""
+    if len(_tokens(text)) < MIN_TOKENS:
+        return None
+
+    weights = [0] * SIMHASH_BITS
+    for shingle in shingles(text):
+        h = int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "big")
+        for bit in range(SIMHASH_BITS):
+            weights[bit] += 1 if h >> bit & 1 else -1
+
+    return sum(1 << bit for bit, w in enumerate(weights) if w > 0)
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+class FingerprintIndex:
+    """SimHash 근사 중복 색인 (블록 단위 버킷으로 후보만 비교)
+
+    max_distance 는 BLOCKS 보다 작아야 비둘기집 원리로 누락 없이 찾는다.
+    """
+
+    def __init__(self, max_distance: int = 6):
+        self.max_distance = max_distance
+        self.buckets = [{} for _ in range(BLOCKS)]
+        self.by_page = {}
+
+    def __len__(self):
+        return len(self.by_page)
+
+    def _blocks(self, fp: int):
+        return [(fp >> (i * BLOCK_BITS)) & BLOCK_MASK for i in range(BLOCKS)]
+
+    def add(self, page_id: str, fp: int):
+        self.remove(page_id)
+        self.by_page[page_id] = fp
+        for bucket, block in zip(self.buckets, self._blocks(fp)):
+            bucket.setdefault(block, set()).add(page_id)
+
+    def remove(self, page_id: str):
+        fp = self.by_page.pop(page_id, None)
+        if fp is None:
+            return
+        for bucket, block in zip(self.buckets, self._blocks(fp)):
+            pages = bucket.get(block)
+            if pages:
+                pages.discard(page_id)
+                if not pages:
+                    del bucket[block]
+
+    def find(self, fp: int):
+        """해밍 거리 max_distance 이내의 페이지 ID, 없으면 None"""
+        if fp is None:
+            return None
+
+        for bucket, block in zip(self.buckets, self._blocks(fp)):
+            for page_id in bucket.get(block, ()):
+                if hamming(fp, self.by_page[page_id]) <= self.max_distance:
+                    return page_id
+
+        return None
@@ -0,0 +1,264 @@
+import os
+import re
+import json
+import asyncio
+import logging
+import argparse
+from collections import Counter
+from dotenv import load_dotenv
+
+from notion_bulk import Checkpoint, Progress
+from partial_json import PartialJson
+from resilience import CircuitOpen
+from rule_extractor import AMOUNT_RE, DURATION_RE, find_dates
+
+# 환경 변수 로드
+load_dotenv()
+
+# 동시에 처리할 게시물 수 (AI 묶음 분석이 채워지도록 BATCH_MAX_SIZE x OPENAI_CONCURRENCY 정도)
+IMPORT_WORKERS = int(os.getenv('IMPORT_WORKERS', '32'))
+# 이보다 짧은 게시물은 이벤트 공지로 보지 않음
+IMPORT_MIN_LENGTH = int(os.getenv('IMPORT_MIN_LENGTH', '40'))
+
+# 중단 후 이어서 실행하기 위한 체크포인트 파일
+CHECKPOINT_PATH = '.import.checkpoint.json'
+
+# 이벤트 공지에 거의 항상 들어가는 단어 (하나도 없으면 AI 에 묻지 않음)
+EVENT_PATTERN = re.compile(
+    r'이벤트|에어드[랍롭]|airdrop|giveaway|경품|캠페인|campaign|상금|prize|리워드|reward|보상|'
+    r'추첨|당첨|winners?|퀘스트|quest|미션|mission|event|contest|competition|대회|'
+    r'밋업|meetup|해커톤|hackathon|퀴즈|quiz|\bama\b',
+    re.IGNORECASE
+)
+
+READ_SIZE = 1 << 16
+
+
+def looks_like_event(text: str) -> bool:
+    """AI 분석 전 싼 규칙으로 이벤트 공지가 아닌 게시물 거르기
+
+    이벤트 단어가 있고, 날짜/기간/금액 중 하나가 있어야 한다.
+    """
+    if len(text.strip()) < IMPORT_MIN_LENGTH or not EVENT_PATTERN.search(text):
+        return False
+    return bool(AMOUNT_RE.search(text) or DURATION_RE.search(text) or find_dates(text))
+
+
+def export_text(value) -> str:
+    """텔레그램 내보내기의 text (문자열 또는 문자열/서식 조각 목록) → 문자열"""
+    if isinstance(value, str):
+        return value
+    return "".join(part if isinstance(part, str) else part.get('text', '') for part in value or [])
+
+
+def export_message(message: dict, channel: str, chat_id) -> dict:
+    """내보내기 메시지 → {'id', 'url', 'text'} (서비스 메시지는 None)"""
+    if message.get('type') != 'message':
+        return None
+
+    text = export_text(message.get('text'))
+    if message.get('photo') and text:
+        text += "\n[이미지 포함]"
+
+    # 공개 채널은 t.me/<이름>/<번호>, 아니면 t.me/c/<채널 ID>/<번호> (원본 링크 중복 확인용)
+    if channel:
+        url = f"https://t.me/{channel}/{message['id']}"
+    else:
+        url = f"https://t.me/c/{chat_id}/{message['id']}"
+    return {"id": url, "url": url, "text": text}
+
+
+def iter_export(path: str, channel: str = None):
+    """텔레그램 데스크톱 내보내기 (result.json) 를 조각으로 읽으며 메시지 순회
+
+    파일 전체를 메모리에 올리지 않는다. 채널 이름/ID 는 "messages" 앞의 머리말에서 읽는다.
+    """
+    with open(path, encoding='utf-8') as f:
+        head = ""
+        while '"messages"' not in head:
+            chunk = f.read(READ_SIZE)
+            if not chunk:
+                raise ValueError("텔레그램 내보내기 형식이 아닙니다 (messages 없음)")
+            head += chunk
+
+        start = head.index('"messages"')
+        match = re.search(r'"id"\s*:\s*(-?\d+)', head[:start])
+        chat_id = match[1] if match else None
+        if not channel and chat_id is None:
+            raise ValueError("채널 ID 를 찾지 못했습니다 (--channel 로 지정)")
+
+        parser = PartialJson(array=True)
+        current, message = 0, {}
+        chunk = head[start + len('"messages"'):]
+        while chunk:
+            for item, key, value in parser.feed(chunk):
+                if item != current:
+                    converted = export_message(message, channel, chat_id)
+                    if converted:
+                        yield converted
+                    current, message = item, {}
+                message[key] = value
+            chunk = f.read(READ_SIZE)
+
+        converted = export_message(message, channel, chat_id) if message else None
+        if converted:
+            yield converted
+
+
+def iter_jsonl(path: str, channel: str = None):
+    """메시지 JSONL ({"text", "url"?, "channel"?, "message_id"?}) 순회 (bench.py 녹화 형식과 같음)"""
+    with open(path, encoding='utf-8') as f:
+        for line_no, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            data = json.loads(line)
+            url = data.get('url')
+            source = data.get('channel') or channel
+            if not url and source and data.get('message_id') is not None:
+                url = f"https://t.me/{source}/{data['message_id']}"
+            yield {"id": url or f"{os.path.basename(path)}:{line_no}", "url": url, "text": data.get('text') or ""}
+
+
+def iter_messages(path: str, channel: str = None):
+    """확장자로 형식을 골라 메시지 순회 (.jsonl 이면 JSONL, 아니면 텔레그램 내보내기)"""
+    if path.endswith('.jsonl'):
+        return iter_jsonl(path, channel)
+    return iter_export(path, channel)
+
+
+async def import_message(bot, item: dict, dry_run: bool) -> str:
+    """게시물 하나 처리, 결과 반환 (skipped / duplicate / candidate / saved / failed)"""
+    url, text = item['url'], item['text']
+    if not looks_like_event(text):
+        return 'skipped'
+
+    bot.event_index.refresh(bot.event_store)
+    reason, _ = bot.event_index.precheck(url, text)
+    if reason:
+        return 'duplicate'
+    if dry_run:
+        return 'candidate'
+
+    # 프로젝트명과 시작일이 나오는 즉시 중복 확인, 중복이면 AI 생성 중단
+    checked = set()
+
+    def on_progress(partial: dict) -> bool:
+        key = (partial.get("project_name"), partial.get("start_date"))
+        if not all(key) or key in checked:
+            return False
+        checked.add(key)
+        return bot.check_duplicate(url, key[0], key[1])
+
+    event = await bot.analyze_event(text, on_progress)
+    if event.event_title == bot.FAILED_TITLE:
+        return 'failed'
+    return await bot.save_if_new(url or "URL 없음", event, text)
+
+
+async def import_history(path: str, channel: str = None, workers: int = IMPORT_WORKERS, dry_run: bool = False,
+                         checkpoint_path: str = CHECKPOINT_PATH, fresh: bool = False, limit: int = None):
+    """내보낸 채널 기록을 분석해 Notion 에 저장 (봇과 같은 분석/중복 확인/쓰기 경로)"""
+    # 봇 모듈의 저장소, 분석 캐시, 묶음 분석, Notion 쓰기 대기열을 그대로 사용
+    import main as bot
+
+    print("🔄 Notion 변경분을 로컬 저장소에 동기화하는 중...")
+    bot.event_index.load(bot.event_store)
+    changed = await bot.sync_store()
+    print(f"   동기화: {changed}건 변경 (저장소 {len(bot.event_index)}건)\n")
+
+    checkpoint = Checkpoint(checkpoint_path, flush_every=200)
+    if fresh:
+        checkpoint.clear()
+    elif checkpoint.processed:
+        print(f"♻️  체크포인트에서 이어서 실행: {len(checkpoint.processed)}건 처리됨\n")
+
+    if dry_run:
+        print("🔍 dry-run: 규칙 필터와 중복 확인만 하고 AI/Notion 은 호출하지 않습니다.\n")
+
+    bot.notion_writer.start()
+    counts = Counter()
+    progress = Progress(None)
+    queue = asyncio.Queue(maxsize=workers * 2)
+
+    async def worker():
+        while True:
+            item = await queue.get()
+            while True:
+                # OpenAI/Notion 차단 중이면 게시물을 실패로 넘기지 않고 복구될 때까지 대기
+                await bot.wait_for_backends()
+                try:
+                    outcome = await import_message(bot, item, dry_run)
+                except CircuitOpen:
+                    continue
+                except Exception as e:
+                    print(f"❌ [{item['id']}] 처리 실패: {e}")
+                    outcome = 'failed'
+                break
+            counts[outcome] += 1
+            # 실패한 게시물은 다음 실행에서 다시 시도
+            if outcome != 'failed' and not dry_run:
+                checkpoint.mark(item['id'])
+            progress.step()
+            queue.task_done()
+
+    tasks = [asyncio.create_task(worker()) for _ in range(workers)]
+    try:
+        read = 0
+        for item in iter_messages(path, channel):
+            if item['id'] in checkpoint:
+                counts['resumed'] += 1
+                continue
+            await queue.put(item)
+            read += 1
+            if limit and read >= limit:
+                break
+        await queue.join()
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await bot.notion_writer.close()
+        if not dry_run:
+            checkpoint.save()
+        await bot.clients.aclose()
+
+    print("\n" + "="*60)
+    print("✅ 가져오기 완료!")
+    print(f"   💾 저장: {counts['saved']}개")
+    if dry_run:
+        print(f"   🔎 저장 후보 (dry-run): {counts['candidate']}개")
+    print(f"   ⚠️  중복: {counts['duplicate']}개")
+    print(f"   ⏭️  이벤트 아님 (규칙 필터): {counts['skipped']}개")
+    print(f"   ♻️  이전 실행에서 처리됨: {counts['resumed']}개")
+    print(f"   ❌ 실패: {counts['failed']}개")
+    print("="*60)
+    return counts
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="텔레그램 채널 기록 일괄 가져오기")
+    parser.add_argument('path', help="텔레그램 데스크톱 내보내기 result.json 또는 메시지 JSONL")
+    parser.add_argument('--channel', help="공개 채널 사용자명 (원본 링크 t.me/<채널>/<번호> 생성용)")
+    parser.add_argument('--workers', type=int, default=IMPORT_WORKERS, help="동시에 처리할 게시물 수")
+    parser.add_argument('--limit', type=int, default=None, help="앞에서부터 이 개수만 처리")
+    parser.add_argument('--dry-run', action='store_true', help="규칙 필터와 중복 확인 결과만 출력")
+    parser.add_argument('--fresh', action='store_true', help="체크포인트를 무시하고 처음부터 실행")
+    parser.add_argument('--checkpoint', default=CHECKPOINT_PATH, help="체크포인트 파일 경로")
+    parser.add_argument('--verbose', action='store_true', help="게시물별 봇 로그 출력")
+    args = parser.parse_args()
+
+    print("="*60)
+    print("🚀 텔레그램 채널 기록 가져오기")
+    print("="*60)
+    print()
+
+    # 봇 모듈이 로깅을 INFO 로 설정하므로 불러온 뒤에 낮춤 (진행률만 출력)
+    import main  # noqa: F401
+    if not args.verbose:
+        logging.getLogger().setLevel(logging.WARNING)
+        logging.getLogger('main').setLevel(logging.ERROR)
+
+    asyncio.run(import_history(
+        args.path, channel=args.channel, workers=args.workers, dry_run=args.dry_run,
+        checkpoint_path=args.checkpoint, fresh=args.fresh, limit=args.limit
+    ))
@@ -0,0 +1,170 @@
+import sqlite3
+import threading
+import time
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS ingest_queue (
+    id               INTEGER PRIMARY KEY AUTOINCREMENT,
+    chat_id          INTEGER NOT NULL,
+    update_id        INTEGER,            -- 텔레그램 update_id (프로세스가 여럿이어도 수신 순서 유지)
+    reply_message_id INTEGER,            -- 진행 상황을 수정할 봇 답장
+    url              TEXT,
+    text             TEXT NOT NULL,
+    status           TEXT NOT NULL DEFAULT 'pending',  -- pending / processing / done / dead
+    attempts         INTEGER NOT NULL DEFAULT 0,
+    last_error       TEXT,
+    next_attempt_at  REAL NOT NULL,
+    created_at       REAL NOT NULL,
+    updated_at       REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_ingest_queue_ready ON ingest_queue (status, next_attempt_at);
+CREATE INDEX IF NOT EXISTS idx_ingest_queue_chat ON ingest_queue (chat_id, status);
+"""
+
+# 임대가 아직 이 작업자의 것인지 (다른 작업자가 다시 가져가면 attempts 가 바뀜)
+OWNED = "id = :id AND status = 'processing' AND attempts = :attempts"
+
+
+class LeaseLost(Exception):
+    """임대가 만료돼 다른 작업자가 가져간 작업"""
+
+    def __init__(self, job_id: int):
+        super().__init__(f"작업 #{job_id} 임대 만료")
+        self.job_id = job_id
+
+
+class IngestQueue:
+    """수신한 메시지를 먼저 기록해 두는 영속 작업 큐 (SQLite)
+
+    텔레그램 수신과 분석/저장을 분리해, 백엔드가 느리거나 봇이 재시작돼도
+    메시지를 잃지 않는다. 실패한 작업은 지수 백오프로 재시도하고
+    max_attempts 를 넘으면 dead 로 남긴다.
+
+    여러 프로세스가 같은 파일을 열어도 claim 이 원자적이라 작업이 한 번만
+    나간다. lease_seconds 동안 renew 되지 않은 작업은 멈춘 프로세스의 것으로 보고
+    다른 작업자가 다시 가져간다. 다시 가져가면 attempts 가 올라가므로, 임대를 잃은
+    작업자의 renew/complete/fail/defer 는 반영되지 않는다 (False 반환).
+    chat_ordering 이면 채팅방별로 앞선 작업이 끝나야 다음 작업을 내준다.
+    """
+
+    def __init__(self, path: str = "events.db", max_attempts: int = 5, base_delay: float = 5.0,
+                 lease_seconds: float = 300.0, chat_ordering: bool = False):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.lease_seconds = lease_seconds
+        self.chat_ordering = chat_ordering
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+
+        # update_id 열이 없던 이전 대기열 파일 보정
+        columns = {row['name'] for row in self.conn.execute("PRAGMA table_info(ingest_queue)")}
+        if 'update_id' not in columns:
+            self.conn.execute("ALTER TABLE ingest_queue ADD COLUMN update_id INTEGER")
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    def backlog(self) -> int:
+        """처리 대기 중인 작업 수"""
+        return self.conn.execute(
+            "SELECT COUNT(*) FROM ingest_queue WHERE status IN ('pending', 'processing')"
+        ).fetchone()[0]
+
+    def enqueue(self, chat_id: int, reply_message_id: int, url, text: str, update_id: int = None) -> int:
+        now = time.time()
+        with self.lock, self.conn:
+            cursor = self.conn.execute(
+                "INSERT INTO ingest_queue "
+                "(chat_id, update_id, reply_message_id, url, text, next_attempt_at, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (chat_id, update_id, reply_message_id, url, text, now, now, now)
+            )
+        return cursor.lastrowid
+
+    def claim(self):
+        """처리할 작업 하나를 processing 으로 바꿔 가져오기 (없으면 None)
+
+        update_id 순서로 내주고, 임대 시간이 지난 processing 작업도 다시 가져온다.
+        """
+        now = time.time()
+        ordering = (
+            "AND NOT EXISTS (SELECT 1 FROM ingest_queue p WHERE p.chat_id = q.chat_id "
+            "AND p.status IN ('pending', 'processing') "
+            "AND (COALESCE(p.update_id, 0), p.id) < (COALESCE(q.update_id, 0), q.id)) "
+            if self.chat_ordering else ""
+        )
+        with self.lock, self.conn:
+            row = self.conn.execute(
+                "UPDATE ingest_queue SET status = 'processing', attempts = attempts + 1, updated_at = :now "
+                "WHERE id = (SELECT q.id FROM ingest_queue q "
+                "WHERE ((q.status = 'pending' AND q.next_attempt_at <= :now) "
+                "OR (q.status = 'processing' AND q.updated_at < :stale)) "
+                f"{ordering}"
+                "ORDER BY COALESCE(q.update_id, 0), q.id LIMIT 1) RETURNING *",
+                {"now": now, "stale": now - self.lease_seconds}
+            ).fetchone()
+        return dict(row) if row else None
+
+    def _update(self, job: dict, assignments: str, **params) -> bool:
+        """임대를 가진 작업일 때만 갱신, 반영됐는지 반환"""
+        with self.lock, self.conn:
+            cursor = self.conn.execute(
+                f"UPDATE ingest_queue SET {assignments}, updated_at = :now WHERE {OWNED}",
+                dict(params, now=time.time(), id=job['id'], attempts=job['attempts'])
+            )
+        return cursor.rowcount > 0
+
+    def renew(self, job: dict) -> bool:
+        """처리 중인 작업의 임대 연장 (임대를 잃었으면 False)"""
+        return self._update(job, "status = 'processing'")
+
+    def complete(self, job: dict) -> bool:
+        return self._update(job, "status = 'done', last_error = NULL")
+
+    def fail(self, job: dict, error: str) -> bool:
+        """실패 기록 후 재시도 예약, 재시도 한도를 넘으면 dead 로 두고 True 반환
+
+        임대를 잃은 작업이면 LeaseLost (새 작업자의 기록을 덮어쓰지 않음).
+        """
+        dead = job['attempts'] >= self.max_attempts
+        delay = self.base_delay * 2 ** (job['attempts'] - 1)
+
+        if not self._update(
+            job, "status = :status, last_error = :error, next_attempt_at = :now + :delay",
+            status='dead' if dead else 'pending', error=error[:500], delay=delay
+        ):
+            raise LeaseLost(job['id'])
+        return dead
+
+    def defer(self, job: dict, delay: float, reason: str) -> bool:
+        """백엔드 장애로 처리하지 못한 작업을 delay 초 뒤로 미룸 (재시도 횟수에 세지 않음)"""
+        return self._update(
+            job, "status = 'pending', attempts = MAX(attempts - 1, 0), last_error = :error, "
+            "next_attempt_at = :now + :delay",
+            error=reason[:500], delay=delay
+        )
+
+    def recover(self) -> int:
+        """재시작 시 처리 중이던 작업을 다시 대기 상태로 (단일 프로세스 전용)
+
+        여러 프로세스가 대기열을 공유하면 다른 프로세스가 처리 중인 작업까지
+        되돌리므로 호출하지 않고 임대 만료에 맡긴다.
+        """
+        with self.lock, self.conn:
+            cursor = self.conn.execute(
+                "UPDATE ingest_queue SET status = 'pending' WHERE status = 'processing'"
+            )
+        return cursor.rowcount
+
+    def next_ready_in(self):
+        """다음 재시도 작업까지 남은 시간 (초), 대기 작업이 없으면 None"""
+        row = self.conn.execute(
+            "SELECT MIN(next_attempt_at) FROM ingest_queue WHERE status = 'pending'"
+        ).fetchone()
+        if row[0] is None:
+            return None
+        return max(0.0, row[0] - time.time())
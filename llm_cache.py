@@ -0,0 +1,102 @@
+import hashlib
+import json
+import logging
+import re
+import sqlite3
+import threading
+import time
+
+from event_store import normalize_url
+
+logger = logging.getLogger(__name__)
+
+URL_RE = re.compile(r'https?://[^\s]+')
+EMOJI_RE = re.compile(
+    "[\U0001F000-\U0001FAFF\U00002600-\U000027BF\U00002B00-\U00002BFF"
+    "\U0001F1E6-\U0001F1FF\uFE0F\u200D\u20E3]+"
+)
+WHITESPACE_RE = re.compile(r'\s+')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS llm_cache (
+    key         TEXT PRIMARY KEY,
+    value       TEXT NOT NULL,
+    created_at  REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_llm_cache_accessed ON llm_cache (accessed_at);
+"""
+
+
+def normalize_text(text: str) -> str:
+    """캐시 키용 메시지 정규화 (이모지/공백/URL 추적 파라미터 제거)"""
+    text = URL_RE.sub(lambda m: normalize_url(m.group(0)) or m.group(0), text or "")
+    text = EMOJI_RE.sub(" ", text)
+    return WHITESPACE_RE.sub(" ", text).strip().casefold()
+
+
+def content_key(text: str) -> str:
+    """정규화된 메시지의 SHA-256"""
+    return hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+
+
+class ExtractionCache:
+    """analyze_event 결과 캐시 (메시지 내용 해시 → 파싱된 dict)
+
+    SQLite 에 저장해 재시작 후에도 유지하며, TTL 이 지난 항목은 무시하고
+    max_entries 를 넘으면 가장 오래 사용되지 않은 항목부터 지운다.
+    """
+
+    def __init__(self, path: str = "events.db", ttl_seconds: float = 7 * 24 * 3600,
+                 max_entries: int = 5000):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    def get(self, text: str):
+        """캐시된 분석 결과, 없거나 만료되면 None"""
+        key = content_key(text)
+        now = time.time()
+
+        with self.lock, self.conn:
+            row = self.conn.execute(
+                "SELECT value, created_at FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+
+            if row and now - row[1] <= self.ttl_seconds:
+                self.conn.execute("UPDATE llm_cache SET accessed_at = ? WHERE key = ?", (now, key))
+                self.hits += 1
+                logger.info(f"💾 분석 캐시 적중 (적중 {self.hits} / 미스 {self.misses})")
+                return json.loads(row[0])
+
+            if row:
+                self.conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+
+        self.misses += 1
+        logger.info(f"💾 분석 캐시 미스 (적중 {self.hits} / 미스 {self.misses})")
+        return None
+
+    def put(self, text: str, value: dict):
+        """분석 결과 저장 후 용량 초과분 정리"""
+        now = time.time()
+
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?)",
+                (content_key(text), json.dumps(value, ensure_ascii=False), now, now)
+            )
+            self.conn.execute(
+                "DELETE FROM llm_cache WHERE key IN ("
+                "SELECT key FROM llm_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
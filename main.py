@@ -1,11 +1,36 @@
 import os
+import time
+import dataclasses
+import asyncio
 import logging
 import re
 import json
+from datetime import date, timedelta
 from dotenv import load_dotenv
 from telegram import Update
 from telegram.ext import Application, CommandHandler, MessageHandler, filters, ContextTypes
-from notion_client import Client
+
+import clients
+import event_model
+import metrics
+from event_index import EventIndex
+from event_model import Event
+from event_snapshot import EventSnapshot
+from batcher import MicroBatcher
+from event_store import EventStore
+from fingerprint import simhash
+from ingest_queue import IngestQueue, LeaseLost
+from llm_cache import ExtractionCache
+from message_group import MessageGrouper
+from notion_bulk import TokenBucket, call_with_retry_async
+from notion_writer import NotionWriter
+import prompt_input
+from partial_json import PartialJson
+from resilience import Backend, CircuitOpen, classify
+from rule_extractor import confident_fields, extract_fields
+
+# 시작 시간 측정용
+STARTED = time.monotonic()
 
 # 환경 변수 로드
 load_dotenv()
@@ -23,315 +48,926 @@ OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
 NOTION_API_KEY = os.getenv('NOTION_API_KEY')
 NOTION_DB_ID = os.getenv('NOTION_DATABASE_ID')
 
-# Notion 클라이언트
-notion = Client(auth=NOTION_API_KEY)
+# 동시 처리 설정 (백엔드별 동시 요청 상한)
+TELEGRAM_CONCURRENCY = int(os.getenv('TELEGRAM_CONCURRENCY', '32'))
+OPENAI_CONCURRENCY = int(os.getenv('OPENAI_CONCURRENCY', '8'))
+NOTION_CONCURRENCY = int(os.getenv('NOTION_CONCURRENCY', '3'))
 
+# 장애 대응: 연속 실패 수만큼 실패하면 차단 (BREAKER_RESET_SECONDS 뒤 재확인), OpenAI 재시도 횟수
+BREAKER_FAILURES = int(os.getenv('BREAKER_FAILURES', '5'))
+BREAKER_RESET_SECONDS = float(os.getenv('BREAKER_RESET_SECONDS', '30'))
+OPENAI_RETRIES = int(os.getenv('OPENAI_RETRIES', '2'))
+# 동시 요청 한도 자동 조절 (최근 응답 시간이 평소의 몇 배면 줄일지) 과 hedge 기준 분위수 (0이면 끔)
+LATENCY_RATIO = float(os.getenv('LATENCY_RATIO', '2'))
+HEDGE_QUANTILE = float(os.getenv('HEDGE_QUANTILE', '0.95'))
 
-def analyze_event(text: str) -> dict:
-    """OpenAI로 이벤트 메시지 분석"""
-    from openai import OpenAI
-    
-    prompt = f"""다음은 크립토/블록체인 이벤트 메시지입니다.
+# Notion 요청 제한 (초당 요청 수, 조회/쓰기 공유)과 쓰기 묶음 주기 (초)
+NOTION_RATE_LIMIT = float(os.getenv('NOTION_RATE_LIMIT', '3'))
+NOTION_FLUSH_SECONDS = float(os.getenv('NOTION_FLUSH_SECONDS', '0.5'))
+
+# 로컬 이벤트 저장소 (Notion 미러) 경로와 증분 동기화 주기 (초)
+EVENT_DB_PATH = os.getenv('EVENT_DB_PATH', 'events.db')
+INDEX_REFRESH_SECONDS = int(os.getenv('INDEX_REFRESH_SECONDS', '60'))
+RECONCILE_SECONDS = int(os.getenv('RECONCILE_SECONDS', '3600'))
+
+# AI 분석 결과 캐시 (동일 공지 재포워딩 시 OpenAI 호출 생략)
+LLM_CACHE_TTL_HOURS = float(os.getenv('LLM_CACHE_TTL_HOURS', '168'))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv('LLM_CACHE_MAX_ENTRIES', '5000'))
+
+# 포워딩 폭주 시 묶음 분석 (시간 창 안에 들어온 메시지를 한 요청으로, 1이면 끔)
+BATCH_WINDOW_SECONDS = float(os.getenv('BATCH_WINDOW_SECONDS', '2'))
+BATCH_MAX_SIZE = int(os.getenv('BATCH_MAX_SIZE', '8'))
+
+# AI 응답 스트리밍 (필드가 완성되는 대로 중복 확인/진행 안내, 중복이면 생성 중단)과 답장 수정 최소 간격 (초)
+LLM_STREAM = os.getenv('LLM_STREAM', '1') == '1'
+REPLY_EDIT_SECONDS = float(os.getenv('REPLY_EDIT_SECONDS', '1'))
+# JSON 스키마 강제 응답 (structured outputs, 지원하지 않는 모델/프록시면 0)
+LLM_STRUCTURED = os.getenv('LLM_STRUCTURED', '1') == '1'
+# 프롬프트에 넣을 메시지 본문 토큰 상한 (넘으면 앞부분 위주로 자름, 0이면 자르지 않음)
+LLM_INPUT_MAX_TOKENS = int(os.getenv('LLM_INPUT_MAX_TOKENS', '1200'))
+
+# 나뉘어 온 게시물 (앨범, 이어진 포워딩, 잘린 긴 글) 을 모으는 대기 시간 (초, 0이면 끔)
+GROUP_WINDOW_SECONDS = float(os.getenv('GROUP_WINDOW_SECONDS', '1.5'))
+
+# 수신 대기열 (접수 즉시 기록 후 작업자가 분석/저장)
+INGEST_WORKERS = int(os.getenv('INGEST_WORKERS', '4'))
+QUEUE_MAX_BACKLOG = int(os.getenv('QUEUE_MAX_BACKLOG', '1000'))
+QUEUE_MAX_ATTEMPTS = int(os.getenv('QUEUE_MAX_ATTEMPTS', '5'))
+QUEUE_LEASE_SECONDS = float(os.getenv('QUEUE_LEASE_SECONDS', '300'))
+
+# 실행 방식: polling (단일 프로세스) / webhook (로드 밸런서 뒤 여러 프로세스)
+BOT_MODE = os.getenv('BOT_MODE', 'polling')
+# 채팅방별 처리 순서 유지 (webhook 은 여러 프로세스가 같은 채팅방 메시지를 동시에 가져가므로 기본으로 켬,
+# polling 은 한 프로세스라 작업자 수만큼만 겹치므로 처리량을 위해 기본으로 끔)
+QUEUE_CHAT_ORDERING = os.getenv('QUEUE_CHAT_ORDERING', '1' if BOT_MODE == 'webhook' else '0') == '1'
+WEBHOOK_URL = os.getenv('WEBHOOK_URL')   # 외부 공개 주소, 비우면 웹훅 등록 생략
+WEBHOOK_LISTEN = os.getenv('WEBHOOK_LISTEN', '0.0.0.0')
+WEBHOOK_PORT = int(os.getenv('WEBHOOK_PORT', '8443'))
+WEBHOOK_PATH = os.getenv('WEBHOOK_PATH', 'telegram')
+WEBHOOK_SECRET = os.getenv('WEBHOOK_SECRET')
+WEBHOOK_MAX_CONNECTIONS = int(os.getenv('WEBHOOK_MAX_CONNECTIONS', '40'))
+# 메트릭 (/metrics, 0이면 끔, webhook 프로세스를 여럿 띄우면 프로세스마다 다르게)
+METRICS_PORT = int(os.getenv('METRICS_PORT', '9464'))
+METRICS_HOST = os.getenv('METRICS_HOST', '127.0.0.1')
+
+# 로컬 시험용 Bot API 주소 (예: fake_telegram.py 의 http://127.0.0.1:8081/bot)
+TELEGRAM_API_BASE_URL = os.getenv('TELEGRAM_API_BASE_URL')
+
+# 백엔드별 차단기와 동시 요청 한도 (설정 값이 상한, 429/오류/지연이면 줄였다가 다시 늘림)
+openai_backend = Backend(
+    "openai", OPENAI_CONCURRENCY, failures=BREAKER_FAILURES, reset=BREAKER_RESET_SECONDS,
+    latency_ratio=LATENCY_RATIO, hedge_quantile=HEDGE_QUANTILE
+)
+notion_backend = Backend(
+    "notion", NOTION_CONCURRENCY, failures=BREAKER_FAILURES, reset=BREAKER_RESET_SECONDS,
+    latency_ratio=LATENCY_RATIO, hedge_quantile=HEDGE_QUANTILE
+)
+BACKENDS = [openai_backend, notion_backend]
+notion_bucket = TokenBucket(NOTION_RATE_LIMIT)
+
+# Notion 쓰기는 모아서 요청 제한에 맞춰 전송 (429 재시도, 같은 페이지 수정 병합)
+notion_writer = NotionWriter(
+    clients.notion_async,
+    bucket=notion_bucket,
+    flush_interval=NOTION_FLUSH_SECONDS,
+    concurrency=NOTION_CONCURRENCY,
+    backend=notion_backend
+)
+
+# 로컬 저장소와 중복 확인 인덱스 (원본 링크 / 프로젝트명+시작일)
+event_store = EventStore(EVENT_DB_PATH)
+event_index = EventIndex()
+# 조회 명령용 열 단위 스냅샷 (저장소 동기화 때 바뀌었으면 새로 만들어 교체)
+event_snapshot = EventSnapshot()
+llm_cache = ExtractionCache(
+    EVENT_DB_PATH,
+    ttl_seconds=LLM_CACHE_TTL_HOURS * 3600,
+    max_entries=LLM_CACHE_MAX_ENTRIES
+)
+ingest_queue = IngestQueue(
+    EVENT_DB_PATH,
+    max_attempts=QUEUE_MAX_ATTEMPTS,
+    lease_seconds=QUEUE_LEASE_SECONDS,
+    chat_ordering=QUEUE_CHAT_ORDERING
+)
+queue_wakeup = asyncio.Event()
+message_grouper = MessageGrouper(window=GROUP_WINDOW_SECONDS)
+
+
+# 추출 필드: (필드명, 규칙, 값의 응답 토큰 예산)
+FIELD_SPECS = [
+    ("event_title", "프로젝트명 + 핵심 내용으로 매력적이고 명확한 제목 (예: PlayKami 신년맞이 이벤트)", 60),
+    ("project_name", "프로젝트명만 간단히 (예: PlayKami, Rootstock)", 30),
+    ("total_prize", "전체 상금이 명시되어 있으면 작성 (예: 5천만원, 총 150000 $CROSS), "
+     "회차별로만 나뉘어 있고 전체 합계가 없으면 \"총 상금 통일\"", 60),
+    ("prize_per_round", "각 회차/등수별 상금을 자세히 (예: 1등 30000 $CROSS, 2등 15000 $CROSS)", 300),
+    ("start_date", "YYYY-MM-DD (현재 2026년 1월)", 8),
+    ("end_date", "YYYY-MM-DD (시작일 + 진행일수로 계산)", 8),
+    ("duration_days", "시작일~종료일 일수 (정수)", 4),
+    ("mission_content", "유저가 해야 할 행동을 핵심 키워드만 쉼표로 나열, 설명 문장 없이 "
+     "(예: 트위터 팔로우, 리트윗, 텔레그램 가입, 댓글 작성)", 150),
+    ("location", "\"온라인\" 또는 \"오프라인\" (특정 오프라인 장소/주소 언급 시 \"오프라인\", 그 외 \"온라인\")", 5),
+]
+EVENT_FIELDS = [spec[0] for spec in FIELD_SPECS]
+
+
+# 고정 지시문은 모든 요청 (단건/묶음/재질의) 에서 같은 system 메시지로 보내 프롬프트 캐시를 탄다.
+# 요청마다 달라지는 메시지 본문과 응답 필드 목록은 user 메시지에만 넣는다.
+SYSTEM_PROMPT = "\n".join([
+    "크립토/블록체인 이벤트 메시지(<메시지> 안)에서 이벤트 정보를 추출해, "
+    "user 메시지의 \"응답 필드\" 만 담은 JSON 으로만 응답하세요 (설명/코드 블록 없이).",
+    "",
+    "필드 규칙:",
+    *(f"- {name}: {rule}" for name, rule, _ in FIELD_SPECS),
+    "- 메시지에 없는 값은 null",
+    "- 여러 메시지를 받으면 메시지마다 객체 하나, 맨 앞 \"index\" 필드에 메시지 번호",
+])
+
+
+def fields_line(fields: list) -> str:
+    return f"응답 필드: {', '.join(fields)}"
+
+
+def max_tokens_for(fields: list, items: int = 1) -> int:
+    """JSON 스키마 기준 응답 토큰 상한
+
+    필드마다 이름/따옴표/구분자 + 값 예산, 묶음이면 항목마다 index 와 감싸는 객체를 더한다.
+    """
+    budgets = {name: budget for name, _, budget in FIELD_SPECS}
+    per_item = sum(len(name) // 4 + 4 + budgets[name] for name in fields) + 2
+    if items > 1:
+        return (per_item + 6) * items + 8
+    return per_item + 8
+
+
+FAILED_TITLE = "분석 실패"
 
-<메시지>
+
+def failed_event(values: dict = None) -> Event:
+    """AI 분석 실패 시 기본값 (values: 규칙으로 확실히 뽑은 필드)"""
+    return event_model.from_dict({"event_title": FAILED_TITLE, "project_name": "미확인", **(values or {})})
+
+
+def record_usage(response, batch: int = 1):
+    """OpenAI 응답의 토큰 사용량 집계와 메시지당 입력/출력 토큰 로그"""
+    usage = getattr(response, 'usage', None)
+    if not usage:
+        return
+    details = getattr(usage, 'prompt_tokens_details', None)
+    cached = (getattr(details, 'cached_tokens', None) or 0) if details else 0
+    metrics.inc("openai_tokens_total", usage.prompt_tokens or 0, kind="prompt")
+    metrics.inc("openai_tokens_total", cached, kind="cached_prompt")
+    metrics.inc("openai_tokens_total", usage.completion_tokens or 0, kind="completion")
+    logger.info(
+        f"🔢 토큰 (메시지 {batch}건): 입력 {(usage.prompt_tokens or 0) / batch:.0f} "
+        f"(캐시 {cached / batch:.0f}) / 출력 {(usage.completion_tokens or 0) / batch:.0f}"
+    )
+
+
+async def complete(prompt: str, max_tokens: int, batch: int = 1, on_field=None, fields: list = None):
+    """OpenAI 응답 본문 반환
+
+    on_field 가 있고 LLM_STREAM=1 이면 스트리밍으로 받으며, 값이 완성된 필드마다
+    on_field(항목 번호, 필드명, 값) 을 부른다. on_field 가 True 를 돌려주면 생성을
+    멈추고 None 을 반환한다 (남은 토큰 절약).
+    fields 가 있고 LLM_STRUCTURED=1 이면 응답을 해당 필드의 JSON 스키마로 강제한다.
+    요청은 openai_backend 의 차단기와 동시 요청 한도를 거치고, 429/5xx/타임아웃은
+    OPENAI_RETRIES 번까지 재시도한다. 차단 중이면 바로 CircuitOpen.
+    """
+    request = {
+        "model": "gpt-4o-mini",
+        "messages": [{"role": "system", "content": SYSTEM_PROMPT}, {"role": "user", "content": prompt}],
+        "temperature": 0.3,
+        "max_tokens": max_tokens,
+    }
+    if LLM_STRUCTURED and fields:
+        request["response_format"] = event_model.response_format(fields, batch=batch > 1)
+    create = clients.openai_async().chat.completions.create
+
+    async def respond():
+        response = await create(**request)
+        record_usage(response, batch)
+        message = response.choices[0].message
+        if message.content is None:
+            raise RuntimeError(f"AI 응답 없음: {getattr(message, 'refusal', None)}")
+        return message.content
+
+    async def stream():
+        # 응답을 끝까지 받는 동안 동시 요청 자리를 잡고 있음 (재시도하면 처음부터 다시 받음)
+        response = await create(**request, stream=True, stream_options={"include_usage": True})
+        parser = PartialJson(array=batch > 1)
+        parts = []
+        try:
+            async for chunk in response:
+                record_usage(chunk, batch)
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content or ""
+                parts.append(delta)
+                for found in parser.feed(delta):
+                    if on_field(*found):
+                        # 끊은 스트림은 usage 가 오지 않아 받은 조각 수로 근사
+                        metrics.inc("openai_tokens_total", len(parts), kind="completion")
+                        metrics.inc("llm_streams_total", result="aborted")
+                        return None
+        finally:
+            await response.close()
+
+        metrics.inc("llm_streams_total", result="completed")
+        return "".join(parts)
+
+    def on_retry(error, delay):
+        metrics.inc("retries_total", kind="openai")
+        logger.warning(f"🔁 OpenAI 재시도 ({delay:.1f}초 후): {error}")
+
+    # 스트리밍은 중복이면 생성을 끊으므로 hedge 하지 않음 (같은 응답이 두 번 오면 안내가 겹침)
+    streaming = bool(LLM_STREAM and on_field)
+    with metrics.span("llm", batch=batch):
+        return await call_with_retry_async(
+            openai_backend.wrap(stream if streaming else respond, hedge=not streaming),
+            retries=OPENAI_RETRIES, on_retry=on_retry
+        )
+
+
+def strip_code_fence(result: str) -> str:
+    """```json 코드 블록 제거"""
+    if '```json' in result:
+        result = result.split('```json')[1].split('```')[0]
+    elif '```' in result:
+        result = result.split('```')[1].split('```')[0]
+    return result.strip()
+
+
+async def extract_event(text: str, fields: list = EVENT_FIELDS, on_fields=None):
+    """메시지 한 건에서 fields 를 OpenAI로 추출 (실패 시 None)
+
+    on_fields(지금까지 완성된 필드) 가 True 를 돌려주면 생성을 멈추고 그때까지의 필드 반환.
+    """
+    prompt = f"""<메시지>
 {text}
 </메시지>
 
-이벤트 정보를 정확히 추출하여 JSON으로만 응답하세요:
-
-{{
-  "event_title": "이벤트 제목 (프로젝트명 + 핵심 내용, 예: PlayKami 신년맞이 이벤트)",
-  "project_name": "프로젝트명만 (예: PlayKami, Rootstock)",
-  "total_prize": "총 상금이 명시되어 있으면 기입, 없으면 '총 상금 통일'",
-  "prize_per_round": "회차별/등수별 상금 상세 (예: 1등 30000 $CROSS, 2등 15000 $CROSS)",
-  "start_date": "YYYY-MM-DD",
-  "end_date": "YYYY-MM-DD",
-  "duration_days": 이벤트 진행 일수,
-  "mission_content": "유저가 수행해야 할 미션을 최대한 간결하게 쉼표로 나열 (예: 트위터 팔로우, 텔레그램 가입, 댓글 작성)",
-  "location": "온라인 또는 오프라인 (오프라인 장소 언급이 있으면 '오프라인', 없으면 '온라인')"
-}}
-
-규칙:
-1. event_title: 매력적이고 명확한 제목 생성
-2. project_name: 프로젝트명만 간단히
-3. total_prize:
-   - 전체 상금이 명시되어 있으면 작성 (예: 5천만원, 총 150000 $CROSS)
-   - 회차별로만 나뉘어 있고 전체 합계가 없으면 "총 상금 통일"
-4. prize_per_round: 각 회차/등수별 상금을 자세히
-5. start_date: YYYY-MM-DD (현재 2026년 1월)
-6. end_date: YYYY-MM-DD (시작일 + 진행일수로 계산)
-7. duration_days: 시작일~종료일 일수
-8. mission_content: 유저가 해야 할 행동을 핵심 키워드만 쉼표로 나열 (예: 트위터 팔로우, 리트윗, 텔레그램 가입, 댓글 작성) - 설명 문장 없이 행동만 나열
-9. location: "온라인" 또는 "오프라인" (특정 오프라인 장소/주소 언급 시 "오프라인", 그 외 "온라인")
-10. JSON만 출력
-
-JSON:"""
+{fields_line(fields)}"""
+
+    partial = {}
+
+    def on_field(item: int, name: str, value) -> bool:
+        partial[name] = value
+        return bool(on_fields(dict(partial)))
 
     try:
-        client = OpenAI(api_key=OPENAI_API_KEY)
-        
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.3,
-            max_tokens=800
+        result = await complete(
+            prompt, max_tokens_for(fields), on_field=on_field if on_fields else None, fields=fields
         )
-        
-        result = response.choices[0].message.content.strip()
-        
-        if '```json' in result:
-            result = result.split('```json')[1].split('```')[0]
-        elif '```' in result:
-            result = result.split('```')[1].split('```')[0]
-        
-        parsed = json.loads(result.strip())
+        if result is None:
+            logger.info(f"⏹️ AI 분석 중단 (중복): {partial}")
+            return partial
+
+        with metrics.span("parse"):
+            parsed = json.loads(strip_code_fence(result.strip()))
         logger.info(f"✅ AI 분석: {parsed}")
         return parsed
-    
+
+    except CircuitOpen:
+        raise
     except Exception as e:
         logger.error(f"❌ AI 분석 실패: {e}")
-        import traceback
-        logger.error(traceback.format_exc())
-        return {
-            "event_title": "분석 실패",
-            "project_name": "미확인",
-            "total_prize": "N/A",
-            "prize_per_round": "N/A",
-            "start_date": None,
-            "end_date": None,
-            "duration_days": None,
-            "mission_content": "N/A",
-            "location": "온라인"
-        }
-
-
-def check_duplicate(url: str, project_name: str, start_date: str) -> bool:
-    """Notion에서 중복 이벤트 확인"""
+        # 백엔드 장애 (5xx/타임아웃/429) 는 한 줄만, 그 밖의 오류는 상세 로그
+        if classify(e) is None:
+            import traceback
+            logger.error(traceback.format_exc())
+        return None
+
+
+async def extract_events(items: list) -> list:
+    """여러 메시지를 한 번의 요청으로 분석 (항목별 결과, 실패 항목은 None)
+
+    items: [(메시지, 요청 필드[, on_fields]), ...]
+    지시문을 한 번만 보내 메시지당 토큰을 줄인다. 응답에서 빠진 항목만
+    단건 요청으로 다시 분석한다. on_fields 는 extract_event 와 같고, 묶음 전체
+    생성은 모든 항목이 중단을 요청했을 때만 멈춘다.
+    """
+    if len(items) == 1:
+        return [await extract_event(*items[0])]
+
+    fields = [name for name in EVENT_FIELDS if any(name in item[1] for item in items)]
+    messages = "\n\n".join(
+        f'<메시지 index="{i}">\n{item[0]}\n</메시지>' for i, item in enumerate(items, 1)
+    )
+    # structured outputs 는 최상위가 객체여야 해서 {"events": [...]} 로 감쌈
+    output = '{"events": [...]} 형식의 JSON' if LLM_STRUCTURED else 'JSON 배열'
+    prompt = f"""{messages}
+
+{fields_line(fields)}
+메시지 순서대로 {len(items)}개 객체를 담은 {output}으로 응답"""
+
+    callbacks = [item[2] if len(item) > 2 else None for item in items]
+    partials = {}     # 메시지 번호 → 완성된 필드
+    positions = {}    # 배열 순서 → 메시지 번호 (index 필드가 나오기 전에는 순서대로)
+    stopped = set()
+
+    def on_field(position: int, name: str, value) -> bool:
+        if name == 'index':
+            if str(value).isdigit():
+                positions[position] = int(value)
+            return False
+        index = positions.get(position, position + 1)
+        callback = callbacks[index - 1] if 1 <= index <= len(items) else None
+        if callback is None or index in stopped:
+            return False
+        partial = partials.setdefault(index, {})
+        partial[name] = value
+        if callback(dict(partial)):
+            stopped.add(index)
+        return len(stopped) == len(items)
+
+    by_index = {}
     try:
-        logger.info(f"🔍 중복 확인 시작...")
-        
-        results = notion.databases.query(
-            database_id=NOTION_DB_ID,
-            page_size=100
+        result = await complete(
+            prompt, min(max_tokens_for(fields, len(items)), 16000), batch=len(items),
+            on_field=on_field if any(callbacks) else None, fields=fields
         )
-        
-        for page in results.get('results', []):
-            properties = page.get('properties', {})
-            
-            if '원본 링크' in properties:
-                existing_url = properties['원본 링크'].get('url')
-                if existing_url and url and existing_url == url:
-                    logger.warning(f"⚠️ 중복 감지: 동일한 원본 링크 - {url}")
-                    return True
-            
-            if project_name and start_date:
-                existing_project = None
-                if '프로젝트명' in properties:
-                    project_rich = properties['프로젝트명'].get('rich_text', [])
-                    if project_rich and len(project_rich) > 0:
-                        existing_project = project_rich[0].get('text', {}).get('content', '')
-                
-                existing_date = None
-                if '이벤트 시작일' in properties:
-                    date_obj = properties['이벤트 시작일'].get('date')
-                    if date_obj:
-                        existing_date = date_obj.get('start')
-                
-                if existing_project and existing_date:
-                    if existing_project == project_name and existing_date == start_date:
-                        logger.warning(f"⚠️ 중복 감지: {project_name} - {start_date}")
-                        return True
-        
-        logger.info("✅ 중복 없음 - 신규 이벤트")
-        return False
-    
+        if result is None:
+            logger.info(f"⏹️ AI 묶음 분석 중단 (모두 중복): {len(items)}건")
+            return [partials.get(i, {}) for i in range(1, len(items) + 1)]
+
+        with metrics.span("parse"):
+            parsed = json.loads(strip_code_fence(result.strip()))
+            if isinstance(parsed, dict):
+                parsed = parsed.get('events') or []
+            for item in parsed:
+                if isinstance(item, dict) and str(item.get('index', '')).isdigit():
+                    by_index[int(item.pop('index'))] = item
+        logger.info(f"✅ AI 묶음 분석: {len(by_index)}/{len(items)}건")
+
+    except CircuitOpen:
+        raise
     except Exception as e:
-        logger.error(f"❌ 중복 확인 실패: {e}")
-        return False
+        logger.error(f"❌ AI 묶음 분석 실패: {e}")
+        return [None] * len(items)
+
+    results = [by_index.get(i) for i in range(1, len(items) + 1)]
+    missing = [i for i, result in enumerate(results) if result is None]
+    if missing:
+        retried = await asyncio.gather(*(extract_event(*items[i]) for i in missing))
+        for i, result in zip(missing, retried):
+            results[i] = result
+
+    return results
+
+
+async def repair_fields(text: str, values: dict, invalid: list) -> dict:
+    """형식이 잘못된 필드만 다시 추출 (전체 재분석 대신, 실패 시 빈 dict)"""
+    problems = "\n".join(f"- {name}: {json.dumps(values.get(name), ensure_ascii=False)}" for name in invalid)
+    prompt = f"""<메시지>
+{text}
+</메시지>
+
+앞서 추출한 아래 값의 형식이 올바르지 않습니다. 이 필드만 다시 추출하세요:
+{problems}
 
+{fields_line(invalid)}"""
 
-def save_to_notion(url: str, data: dict) -> bool:
-    """Notion 데이터베이스에 저장"""
+    logger.info(f"🩹 필드 재질의: {invalid}")
+    for name in invalid:
+        metrics.inc("repairs_total", field=name)
     try:
-        properties = {
-            "이벤트 제목": {
-                "title": [{"text": {"content": str(data.get("event_title", "미확인"))[:100]}}]
-            }
-        }
-        
-        logger.info(f"1️⃣ 이벤트 제목: {data.get('event_title')}")
-        
-        project = str(data.get("project_name", "")).strip()
-        if project and project not in ["N/A", "None", ""]:
-            properties["프로젝트명"] = {
-                "rich_text": [{"text": {"content": project[:100]}}]
-            }
-            logger.info(f"2️⃣ 프로젝트명: {project}")
-        
-        if url and url not in ["URL 없음", "개인 메시지 (링크 없음)", "비공개 채널"]:
-            if url.startswith("http"):
-                properties["원본 링크"] = {"url": url[:2000]}
-                logger.info(f"3️⃣ 원본 링크: {url[:50]}")
-        
-        total_prize = str(data.get("total_prize", "")).strip()
-        if total_prize and total_prize not in ["N/A", "None", "", "총 상금 통일"]:
-            properties["총 상금"] = {
-                "rich_text": [{"text": {"content": total_prize[:2000]}}]
-            }
-            logger.info(f"4️⃣ 총 상금: {total_prize[:50]}")
-        elif total_prize == "총 상금 통일":
-            properties["총 상금"] = {
-                "rich_text": [{"text": {"content": "총 상금 통일"}}]
-            }
-            logger.info(f"4️⃣ 총 상금: 통일")
-        
-        per_round = str(data.get("prize_per_round", "")).strip()
-        if per_round and per_round not in ["N/A", "None", ""]:
-            properties["회차별 상금"] = {
-                "rich_text": [{"text": {"content": per_round[:2000]}}]
-            }
-            logger.info(f"5️⃣ 회차별 상금: {per_round[:50]}")
-        
-        start_date = data.get("start_date")
-        end_date = data.get("end_date")
-
-        if start_date:
-            start_str = str(start_date).strip()
-            if start_str and start_str not in ["None", "null", "N/A", ""]:
-                date_property = {"start": start_str}
-
-                # 종료일이 있으면 함께 설정
-                if end_date:
-                    end_str = str(end_date).strip()
-                    if end_str and end_str not in ["None", "null", "N/A", ""]:
-                        date_property["end"] = end_str
-                        logger.info(f"6️⃣ 이벤트 기간: {start_str} → {end_str}")
-                    else:
-                        logger.info(f"6️⃣ 이벤트 시작일: {start_str}")
-                else:
-                    logger.info(f"6️⃣ 이벤트 시작일: {start_str}")
-
-                properties["이벤트 시작일"] = {"date": date_property}
-
-        duration = data.get("duration_days")
-        if duration is not None:
-            try:
-                duration_num = int(duration) if duration else None
-                if duration_num:
-                    properties["이벤트 진행 기간"] = {"number": duration_num}
-                    logger.info(f"7️⃣ 이벤트 진행 기간: {duration_num}일")
-            except (ValueError, TypeError):
-                logger.warning(f"⚠️ 진행 기간 변환 실패: {duration}")
-
-        mission = str(data.get("mission_content", "")).strip()
-        if mission and mission not in ["N/A", "None", ""]:
-            properties["미션 내용"] = {
-                "rich_text": [{"text": {"content": mission[:2000]}}]
-            }
-            logger.info(f"8️⃣ 미션 내용: {mission[:50]}")
-
-        location = str(data.get("location", "온라인")).strip()
-        if location in ["온라인", "오프라인"]:
-            properties["장소"] = {
-                "select": {"name": location}
-            }
-            logger.info(f"9️⃣ 장소: {location}")
-
-        result = notion.pages.create(
-            parent={"database_id": NOTION_DB_ID},
-            properties=properties
+        with metrics.span("repair"):
+            result = await complete(prompt, max_tokens_for(invalid), fields=invalid)
+            repaired = json.loads(strip_code_fence(result.strip()))
+        return {name: repaired[name] for name in invalid if name in repaired}
+    except CircuitOpen:
+        raise
+    except Exception as e:
+        logger.error(f"❌ 필드 재질의 실패: {e}")
+        return {}
+
+
+def prompt_text(text: str) -> str:
+    """프롬프트에 넣을 본문 (공백/이모지/반복 링크 정리, 토큰 상한까지 자름)"""
+    with metrics.span("trim"):
+        prepared = prompt_input.prepare(text, LLM_INPUT_MAX_TOKENS)
+        before, after = prompt_input.count_tokens(text), prompt_input.count_tokens(prepared)
+    metrics.inc("input_tokens_total", before, kind="raw")
+    metrics.inc("input_tokens_total", after, kind="trimmed")
+    if after < before:
+        logger.info(f"✂️ 입력 정리: {before} → {after} 토큰")
+    return prepared
+
+
+extraction_batcher = MicroBatcher(extract_events, window=BATCH_WINDOW_SECONDS, max_size=BATCH_MAX_SIZE)
+
+
+async def analyze_event(text: str, on_progress=None) -> Event:
+    """이벤트 메시지 분석 (같은 내용은 캐시에서 반환)
+
+    정규식으로 확실히 뽑히는 필드(날짜, 상금, 장소 등)는 먼저 채우고,
+    빠지거나 신뢰도가 낮은 필드만 OpenAI 에 묻는다.
+
+    on_progress(지금까지의 결과) 는 규칙 추출 직후와 AI 필드가 완성될 때마다 불린다.
+    True 를 돌려주면 (이미 등록된 이벤트 등) 분석을 멈추고 그때까지의 결과를 반환하며,
+    중단된 결과는 캐시하지 않는다.
+    """
+    cached = llm_cache.get(text)
+    metrics.inc("cache_total", result="miss" if cached is None else "hit")
+    if cached is not None:
+        return event_model.from_dict(cached)
+
+    with metrics.span("rules"):
+        values, confidence = extract_fields(text)
+        known = confident_fields(confidence)
+    fields = [name for name in EVENT_FIELDS if name not in known]
+    logger.info(f"⚡ 규칙 추출: {sorted(known)} / AI 요청: {fields}")
+
+    stopped = False
+
+    def on_fields(partial: dict) -> bool:
+        nonlocal stopped
+        stopped = bool(on_progress({**values, **partial, **{name: values[name] for name in known}}))
+        return stopped
+
+    parsed = {}
+    if on_progress:
+        on_fields({})
+    # 규칙 추출은 원문으로, AI 에는 정리한 본문을 보냄
+    prepared = prompt_text(text) if fields else text
+    if fields and not stopped:
+        callback = on_fields if on_progress else None
+        if BATCH_MAX_SIZE > 1:
+            parsed = await extraction_batcher.submit((prepared, fields, callback))
+        else:
+            parsed = await extract_event(prepared, fields, callback)
+
+    if parsed is None:
+        metrics.inc("failures_total", stage="analyze")
+        return failed_event({name: values[name] for name in known})
+
+    # AI 가 빠뜨린 필드는 신뢰도 낮은 규칙 값으로 보충, 확실한 규칙 값이 우선
+    merged = {**values, **parsed, **{name: values[name] for name in known}}
+    event, invalid = event_model.coerce(merged, fields)
+
+    # 형식이 잘못된 필드만 다시 묻고, 그래도 잘못된 값은 비움 (중단된 분석은 그대로)
+    if invalid and not stopped:
+        merged.update(await repair_fields(prepared, merged, invalid))
+        event, invalid = event_model.coerce(merged, fields)
+        if invalid:
+            logger.warning(f"⚠️ 재질의 후에도 잘못된 필드: {invalid}")
+        if "event_title" in invalid:
+            metrics.inc("failures_total", stage="analyze")
+            return failed_event({name: values[name] for name in known})
+
+    if not stopped:
+        llm_cache.put(text, event.to_dict())
+    return event
+
+
+async def query_database(**kwargs) -> dict:
+    """Notion 데이터베이스 조회 (차단기 + 동시 요청 한도 + 요청 속도 제한, 429/5xx 재시도, 느리면 hedge)"""
+    return await call_with_retry_async(
+        notion_backend.wrap(clients.notion_async().databases.query, hedge=True),
+        bucket=notion_bucket, database_id=NOTION_DB_ID, **kwargs
+    )
+
+
+def check_duplicate(url: str, project_name: str, start_date) -> bool:
+    """로컬 인덱스에서 중복 이벤트 확인 (네트워크 호출 없음)"""
+    with metrics.span("dedupe"):
+        event_index.refresh(event_store)
+        reason = event_index.find_duplicate(url, project_name, start_date)
+
+    if reason == 'url':
+        logger.warning(f"⚠️ 중복 감지: 동일한 원본 링크 - {url}")
+        return True
+    if reason == 'project_date':
+        logger.warning(f"⚠️ 중복 감지: {project_name} - {start_date}")
+        return True
+
+    logger.info("✅ 중복 없음 - 신규 이벤트")
+    return False
+
+
+async def save_to_notion(url: str, event: Event, text: str = None) -> bool:
+    """Notion 데이터베이스에 저장 (text 가 있으면 근사 중복 판정용 지문도 저장)"""
+    try:
+        event = dataclasses.replace(
+            event,
+            event_title=event.event_title or "미확인",
+            url=url if url and url.startswith("http") else None
         )
-        
+        properties = event_model.to_properties(event)
+        logger.info(f"📝 {event.event_title} ({event.project_name or 'N/A'}, {event.start_date or 'N/A'}): "
+                    f"{', '.join(properties)}")
+
+        def on_written(page: dict):
+            # 작업이 취소돼도 생성된 페이지는 로컬 저장소/인덱스에 반영
+            event_store.upsert_page(page)
+            event_index.add_page(page)
+
+            fp = simhash(text) if text else None
+            if fp is not None:
+                event_store.add_fingerprint(page['id'], fp)
+                event_index.fingerprints.add(page['id'], fp)
+
+        with metrics.span("notion_write"):
+            result = await notion_writer.create(
+                parent={"database_id": NOTION_DB_ID},
+                properties=properties,
+                on_written=on_written
+            )
+
         logger.info(f"✅ Notion 저장 성공: {result['id']}")
         return True
-    
+
+    except CircuitOpen:
+        raise
     except Exception as e:
         logger.error(f"❌ Notion 저장 실패: {e}")
-        import traceback
-        logger.error(f"상세:\n{traceback.format_exc()}")
+        if classify(e) is None:
+            import traceback
+            logger.error(f"상세:\n{traceback.format_exc()}")
         return False
 
 
-async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """텔레그램 메시지 처리"""
-    message = update.message
+async def save_if_new(url: str, event: Event, text: str = None) -> str:
+    """중복이 아니면 저장, 결과 반환 (saved / duplicate / failed)
 
-    is_forwarded = message.forward_origin is not None
+    원본 링크와 (프로젝트명, 시작일) 키를 저장소에 예약한 채로 중복을 다시 확인하고 저장하므로,
+    같은 이벤트를 동시에 처리하는 작업 중 한 건만 저장된다 (webhook 프로세스가 여럿이어도).
+    """
+    dedupe_url = url if url not in ["URL 없음", "비공개 채널"] else None
+    async with event_index.reserve(dedupe_url, event.project_name, event.start_date, store=event_store):
+        if check_duplicate(url=dedupe_url, project_name=event.project_name, start_date=event.start_date):
+            return 'duplicate'
+        return 'saved' if await save_to_notion(url, event, text) else 'failed'
+
+
+# 텔레그램이 나눠 보내는 길이 (본문 4096자, 사진 설명 1024자) 에 가까우면 뒷부분이 더 올 수 있음
+TEXT_SPLIT_LENGTH = 4000
+CAPTION_SPLIT_LENGTH = 1000
 
-    if is_forwarded:
-        logger.info("📬 포워딩 메시지")
-        origin = message.forward_origin
 
-        url = None
+def message_part(update: Update) -> dict:
+    """업데이트 하나의 본문과 원본 정보"""
+    message = update.message
+    origin = message.forward_origin
+    part = {
+        "message": message,
+        "update_id": update.update_id,
+        "forwarded": origin is not None,
+        "url": None,
+        "origin_chat": None,
+        "origin_id": None,
+        "text": message.text or message.caption or "",
+        "photo": bool(message.photo),
+    }
+
+    if origin is not None:
+        logger.info("📬 포워딩 메시지")
         if hasattr(origin, 'chat') and hasattr(origin.chat, 'username'):
-            chat_username = origin.chat.username
-            message_id = origin.message_id
-            url = f"https://t.me/{chat_username}/{message_id}"
-            logger.info(f"🔗 {url}")
+            part["url"] = f"https://t.me/{origin.chat.username}/{origin.message_id}"
+            part["origin_chat"] = origin.chat.id
+            part["origin_id"] = origin.message_id
+            logger.info(f"🔗 {part['url']}")
         else:
-            url = "비공개 채널"
+            part["url"] = "비공개 채널"
+    else:
+        logger.info("💬 일반 메시지")
 
-        text = message.text or message.caption or ""
-        if message.photo:
-            text += "\n[이미지 포함]"
+    return part
+
+
+def is_fragment(part: dict) -> bool:
+    """뒤에 이어지는 업데이트가 더 올 수 있는 조각 (본문 없음, 길이 제한에 걸려 잘림)"""
+    limit = CAPTION_SPLIT_LENGTH if part['message'].caption else TEXT_SPLIT_LENGTH
+    return not part['text'] or len(part['text']) >= limit
+
+
+def follows_fragment(last: dict, part: dict) -> bool:
+    return is_fragment(last) or not part['text']
+
+
+def follows_in_channel(last: dict, part: dict) -> bool:
+    return part['origin_id'] == last['origin_id'] + 1 and follows_fragment(last, part)
+
+
+def message_group(part: dict):
+    """(묶음 키, 새 묶음을 열지, 이어짐 판정), 키가 None 이면 바로 처리
+
+    - 앨범: media_group_id 가 같은 업데이트 전부
+    - 포워딩: 같은 채널의 연속 게시물 중 앞 조각이 본문 없음/잘림이거나 뒷 조각이 본문 없음
+    - 일반 메시지: 같은 보낸 사람의 잘린 긴 글과 그 뒷부분
+    """
+    message = part['message']
+    if message.media_group_id:
+        return ('album', message.chat_id, message.media_group_id), True, None
+    if part['origin_id'] is not None:
+        return ('forward', message.chat_id, part['origin_chat']), is_fragment(part), follows_in_channel
+    if not part['forwarded'] and message.from_user:
+        return ('sender', message.chat_id, message.from_user.id), is_fragment(part), follows_fragment
+    return None, False, None
+
+
+def merge_parts(parts: list):
+    """묶인 조각을 게시물 하나로: (답장할 메시지, 원본 링크, 본문)
+
+    원본 순서대로 본문을 잇고, 링크는 첫 조각 기준.
+    """
+    parts = sorted(parts, key=lambda p: (p['origin_id'] or 0, p['update_id'] or 0))
+    first = parts[0]
+    text = "\n".join(p['text'] for p in parts if p['text'])
 
+    if first['forwarded']:
+        url = first['url']
+        if any(p['photo'] for p in parts):
+            text += "\n[이미지 포함]"
     else:
-        logger.info("💬 일반 메시지")
-        text = message.text or message.caption or ""
         urls = re.findall(r'https?://[^\s]+', text)
         url = urls[0] if urls else "URL 없음"
 
-    processing = await message.reply_text("🔄 분석 중...")
+    return first['message'], url, text
+
+
+async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """텔레그램 메시지 처리 (나뉘어 온 게시물은 모아서 한 번만)"""
+    part = message_part(update)
+    key, start, joins = message_group(part)
+    if key is None:
+        parts = [part]
+    else:
+        with metrics.span("group_wait"):
+            parts = await message_grouper.add(key, part, start=start, joins=joins)
+        if parts is None:
+            # 먼저 온 조각의 처리에 합쳐짐
+            metrics.inc("events_total", result="grouped")
+            return
 
-    result = analyze_event(text)
+    with metrics.span("receive"):
+        message, url, text = merge_parts(parts)
+
+        # AI 분석 전 빠른 중복 확인 (원본 링크 일치 / 본문 근사 일치)
+        # 다른 프로세스가 방금 저장한 이벤트도 저장소에서 받아와 확인
+        event_index.refresh(event_store)
+        reason, page_id = event_index.precheck(
+            url if url not in ["URL 없음", "비공개 채널"] else None,
+            text
+        )
+        if reason:
+            existing = event_store.get(page_id) or {}
+            logger.warning(f"⚠️ 사전 중복 감지 ({reason}): {page_id}")
+            metrics.inc("events_total", result="prechecked")
+            await message.reply_text(
+                "⚠️ 사전에 등록 된 이벤트 입니다.\n\n"
+                f"📋 이벤트: {existing.get('title') or 'N/A'}\n"
+                f"🏢 프로젝트: {existing.get('project_name') or 'N/A'}\n"
+                f"📅 시작일: {existing.get('start_date') or 'N/A'}"
+            )
+            return
 
-    is_duplicate = check_duplicate(
-        url=url if url not in ["URL 없음", "비공개 채널"] else None,
-        project_name=result.get("project_name"),
-        start_date=result.get("start_date")
+        # 대기열이 가득 차면 접수하지 않음 (무한정 쌓이지 않도록)
+        if ingest_queue.backlog() >= QUEUE_MAX_BACKLOG:
+            metrics.inc("events_total", result="rejected")
+            await message.reply_text("⏳ 처리 대기 중인 메시지가 너무 많습니다. 잠시 후 다시 보내주세요.")
+            return
+
+        # 백엔드 장애 중이면 기다리게 하지 않고 보관했다고 바로 알림 (복구되면 작업자가 처리)
+        blocked = open_backends()
+        if blocked:
+            logger.warning(f"⏸️ 차단 중 ({', '.join(blocked)}): 대기열에 보관")
+            processing = await message.reply_text(deferred_text(blocked))
+        else:
+            processing = await message.reply_text("📥 접수 완료! 순서대로 분석합니다...")
+        job_id = ingest_queue.enqueue(message.chat_id, processing.message_id, url, text, min(p['update_id'] for p in parts))
+        logger.info(f"📥 대기열 추가: #{job_id} (대기 {ingest_queue.backlog()}건)")
+        metrics.inc("events_total", result="queued")
+        queue_wakeup.set()
+
+
+def format_duplicate(event: Event) -> str:
+    """중복 이벤트 안내"""
+    return (
+        "⚠️ 사전에 등록 된 이벤트 입니다.\n\n"
+        f"📋 이벤트: {event.event_title or 'N/A'}\n"
+        f"🏢 프로젝트: {event.project_name or 'N/A'}\n"
+        f"📅 시작일: {event.start_date or 'N/A'}"
     )
 
-    if is_duplicate:
-        await processing.edit_text(
-            "⚠️ 사전에 등록 된 이벤트 입니다.\n\n"
-            f"📋 이벤트: {result.get('event_title', 'N/A')}\n"
-            f"🏢 프로젝트: {result.get('project_name', 'N/A')}\n"
-            f"📅 시작일: {result.get('start_date', 'N/A')}"
+
+def format_progress(result: dict) -> str:
+    """분석 중 안내 (지금까지 추출된 필드)"""
+    lines = [
+        f"{emoji} {label}: {result[name]}"
+        for emoji, label, name in (
+            ("📋", "이벤트", "event_title"),
+            ("🏢", "프로젝트", "project_name"),
+            ("💰", "총 상금", "total_prize"),
+            ("📅", "시작", "start_date"),
+            ("🏁", "종료", "end_date"),
         )
-        logger.info("⚠️ 중복 이벤트로 저장하지 않음")
+        if result.get(name)
+    ]
+    return "\n\n".join(["🔄 분석 중...", "\n".join(lines)]) if lines else "🔄 분석 중..."
+
+
+def format_result(url: str, event: Event) -> str:
+    """저장 완료 안내"""
+    duration = f"{event.duration_days}일" if event.duration_days else 'N/A'
+    total_info = event.total_prize or 'N/A'
+
+    mission_text = event.mission_content or 'N/A'
+    if len(mission_text) > 80:
+        mission_text = mission_text[:80] + "..."
+
+    location_emoji = "🌐" if event.location == "온라인" else "📍"
+
+    response_text = (
+        f"✅ 분석 완료!\n\n"
+        f"📋 이벤트: {event.event_title or 'N/A'}\n"
+        f"🏢 프로젝트: {event.project_name or 'N/A'}\n"
+        f"💰 총 상금: {total_info}\n"
+        f"🎁 회차별: {(event.prize_per_round or 'N/A')[:60]}...\n"
+        f"📅 시작: {event.start_date or 'N/A'}\n"
+        f"🏁 종료: {event.end_date or 'N/A'}\n"
+        f"⏱️ 기간: {duration}\n"
+        f"{location_emoji} 장소: {event.location or '온라인'}\n"
+        f"🎯 미션: {mission_text}\n"
+        f"💵 가치: 수동 입력 필요"
+    )
+    if url and url not in ["URL 없음", "비공개 채널"]:
+        response_text += f"\n🔗 {url}"
+    return response_text
+
+
+async def edit_reply(bot, job: dict, text: str):
+    """작업의 진행 안내 메시지 수정 (실패해도 작업은 계속)"""
+    if not job.get('reply_message_id'):
         return
+    try:
+        with metrics.span("reply_edit"):
+            await bot.edit_message_text(text, chat_id=job['chat_id'], message_id=job['reply_message_id'])
+    except Exception as e:
+        logger.warning(f"⚠️ 답장 수정 실패: {e}")
+
+
+class ProgressReply:
+    """분석 중 안내를 interval 초에 한 번만 수정 (그 사이 들어온 내용은 마지막 것만 전송)"""
+
+    def __init__(self, bot, job: dict, interval: float):
+        self.bot = bot
+        self.job = job
+        self.interval = interval
+        self.text = None
+        self.sent = None
+        self.last = 0.0
+        self.task = None
+
+    def update(self, text: str):
+        self.text = text
+        if self.task is None and text != self.sent:
+            self.task = asyncio.create_task(self._send())
+
+    async def _send(self):
+        while self.text != self.sent:
+            await asyncio.sleep(max(0.0, self.last + self.interval - time.monotonic()))
+            text, self.last = self.text, time.monotonic()
+            await edit_reply(self.bot, self.job, text)
+            self.sent = text
+        self.task = None
+
+    async def close(self):
+        """보내지 않은 진행 안내 취소 (최종 결과로 바로 수정하기 전)"""
+        if self.task:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
 
-    success = save_to_notion(url, result)
-
-    if success:
-        duration = f"{result.get('duration_days', 'N/A')}일" if result.get('duration_days') else 'N/A'
-        total_info = result.get('total_prize', 'N/A')
-
-        mission_text = result.get('mission_content', 'N/A')
-        if len(mission_text) > 80:
-            mission_text = mission_text[:80] + "..."
-
-        location_emoji = "🌐" if result.get('location') == "온라인" else "📍"
-
-        response_text = (
-            f"✅ 분석 완료!\n\n"
-            f"📋 이벤트: {result.get('event_title', 'N/A')}\n"
-            f"🏢 프로젝트: {result.get('project_name', 'N/A')}\n"
-            f"💰 총 상금: {total_info}\n"
-            f"🎁 회차별: {result.get('prize_per_round', 'N/A')[:60]}...\n"
-            f"📅 시작: {result.get('start_date', 'N/A')}\n"
-            f"🏁 종료: {result.get('end_date', 'N/A')}\n"
-            f"⏱️ 기간: {duration}\n"
-            f"{location_emoji} 장소: {result.get('location', '온라인')}\n"
-            f"🎯 미션: {mission_text}\n"
-            f"💵 가치: 수동 입력 필요"
+
+async def process_job(bot, job: dict):
+    """대기열 작업 하나 처리: 분석 → 중복 확인 → 저장 (실패 시 예외)"""
+    url, text = job['url'], job['text']
+    metrics.observe("stage_seconds", max(0.0, time.time() - job['next_attempt_at']), stage="queue_wait")
+
+    progress = ProgressReply(bot, job, REPLY_EDIT_SECONDS)
+    progress.update(format_progress({}))
+    checked = set()
+    started = time.monotonic()
+
+    def on_progress(partial: dict) -> bool:
+        # 프로젝트명과 시작일이 나오는 즉시 중복 확인, 중복이면 AI 생성 중단
+        if partial.get("event_title") and "first_feedback" not in checked:
+            checked.add("first_feedback")
+            metrics.observe("stage_seconds", time.monotonic() - started, stage="first_feedback")
+        progress.update(format_progress(partial))
+        key = (partial.get("project_name"), partial.get("start_date"))
+        if not all(key) or key in checked:
+            return False
+        checked.add(key)
+        return check_duplicate(
+            url=url if url not in ["URL 없음", "비공개 채널"] else None,
+            project_name=key[0],
+            start_date=key[1]
         )
-        if url and url not in ["URL 없음", "비공개 채널"]:
-            response_text += f"\n🔗 {url}"
-    else:
-        response_text = "❌ 저장 실패"
 
-    await processing.edit_text(response_text)
+    try:
+        with metrics.span("analyze"):
+            result = await analyze_event(text, on_progress)
+    finally:
+        await progress.close()
+    if result.event_title == FAILED_TITLE:
+        raise RuntimeError("AI 분석 실패")
+
+    # 임대를 잃었으면 새로 가져간 작업자가 저장하므로 여기서는 저장하지 않음
+    if not ingest_queue.renew(job):
+        raise LeaseLost(job['id'])
+    outcome = await save_if_new(url, result, text)
+    if outcome == 'duplicate':
+        await edit_reply(bot, job, format_duplicate(result))
+        logger.info("⚠️ 중복 이벤트로 저장하지 않음")
+        metrics.inc("events_total", result="duplicate")
+        return
+    if outcome == 'failed':
+        raise RuntimeError("Notion 저장 실패")
+
+    await edit_reply(bot, job, format_result(url, result))
+    metrics.inc("events_total", result="saved")
+
+
+def open_backends() -> list:
+    """차단기가 열린 백엔드 이름"""
+    return [backend.name for backend in BACKENDS if backend.breaker.is_open()]
+
+
+def deferred_text(blocked: list) -> str:
+    return (f"⏸️ 외부 서비스({', '.join(blocked)}) 응답이 없어 대기열에 보관했습니다.\n"
+            "복구되면 자동으로 분석해 이 메시지를 수정합니다.")
+
+
+async def wait_for_backends():
+    """차단기가 열린 백엔드가 있으면 다시 확인할 수 있을 때까지 대기"""
+    while True:
+        wait = max(backend.breaker.retry_in() for backend in BACKENDS)
+        if not wait:
+            return
+        await asyncio.sleep(wait)
+
+
+async def keep_lease(job: dict):
+    """처리하는 동안 작업 임대를 주기적으로 연장 (임대 시간의 1/3 마다)"""
+    while True:
+        await asyncio.sleep(QUEUE_LEASE_SECONDS / 3)
+        if not ingest_queue.renew(job):
+            logger.warning(f"⚠️ 작업 #{job['id']} 임대 만료: 다른 작업자가 가져감")
+            return
+
+
+async def ingest_worker(app: Application):
+    """대기열에서 작업을 꺼내 처리 (실패 시 재시도 예약, 한도 초과 시 dead, 백엔드 차단 중이면 보류)"""
+    while True:
+        # 차단 중에는 작업을 꺼내 바로 실패시키지 않고 기다림
+        await wait_for_backends()
+        job = ingest_queue.claim()
+
+        if job is None:
+            ready_in = ingest_queue.next_ready_in()
+            timeout = 5.0 if ready_in is None else min(ready_in, 5.0)
+            try:
+                await asyncio.wait_for(queue_wakeup.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+            queue_wakeup.clear()
+            continue
+
+        heartbeat = asyncio.create_task(keep_lease(job))
+        try:
+            # 작업자가 모두 묶음 분석을 기다리면 창을 기다리지 않고 바로 요청
+            with metrics.span("job"), extraction_batcher.producer():
+                await process_job(app.bot, job)
+            if not ingest_queue.complete(job):
+                raise LeaseLost(job['id'])
+        except LeaseLost as e:
+            # 다시 가져간 작업자가 결과를 기록하므로 아무것도 덮어쓰지 않음
+            logger.warning(f"⚠️ {e}: 결과를 기록하지 않음")
+        except CircuitOpen as e:
+            # 재시도 횟수에 세지 않고 미룸 (분석 결과는 캐시에 있어 다시 묻지 않음)
+            if ingest_queue.defer(job, max(e.retry_in, 1.0), str(e)):
+                metrics.inc("events_total", result="deferred")
+                logger.warning(f"⏸️ 작업 #{job['id']} 보류: {e}")
+                await edit_reply(app.bot, job, deferred_text([e.name]))
+        except Exception as e:
+            try:
+                dead = ingest_queue.fail(job, str(e))
+            except LeaseLost as lost:
+                logger.warning(f"⚠️ {lost}: 실패를 기록하지 않음 ({e})")
+                continue
+            if dead:
+                metrics.inc("events_total", result="dead")
+                logger.error(f"❌ 작업 #{job['id']} 포기 ({job['attempts']}회 실패): {e}")
+                await edit_reply(app.bot, job, "❌ 저장 실패")
+            else:
+                metrics.inc("retries_total", kind="ingest")
+                logger.warning(f"🔁 작업 #{job['id']} 재시도 예약 ({job['attempts']}/{QUEUE_MAX_ATTEMPTS}): {e}")
+                await edit_reply(app.bot, job, f"🔁 일시적 오류로 재시도 대기 중... ({job['attempts']}/{QUEUE_MAX_ATTEMPTS})")
+        finally:
+            heartbeat.cancel()
 
 
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -348,24 +984,245 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
         "- 총 상금 조건부 표시\n"
         "- 회차별 상금 상세 분석\n"
         "- 중복 이벤트 확인\n"
-        "- 상금 가치는 수동 입력"
+        "- 상금 가치는 수동 입력\n\n"
+        "🔎 조회:\n"
+        "/stats [YYYY-MM] - 월별 통계\n"
+        "/search 프로젝트명 - 이벤트 찾기\n"
+        "/upcoming [일수] - 곧 시작하는 이벤트"
     )
 
 
+def format_row(row: dict) -> str:
+    """조회 결과 한 줄"""
+    start, end = row['start_date'], row['end_date']
+    period = f"{start}~{end}" if start and end and end != start else str(start or "날짜 미정")
+    place = "📍" if row['location'] == "오프라인" else "🌐"
+    return f"{place} {period} · {row['title'] or 'N/A'} ({row['project_name'] or 'N/A'})"
+
+
+def parse_month(value: str, today: date):
+    """YYYY-MM → 그 달 (첫날, 마지막 날), 값이 없으면 이번 달"""
+    year, month = today.year, today.month
+    if value:
+        year, month = (int(part) for part in value.split('-')[:2])
+    first = date(year, month, 1)
+    last = date(year + month // 12, month % 12 + 1, 1) - timedelta(days=1)
+    return first, last
+
+
+async def snapshot_ready() -> EventSnapshot:
+    """조회용 스냅샷 (시작 동기화가 실패해 아직 없으면 지금 만듦)"""
+    if event_snapshot.signature is None:
+        await refresh_snapshot()
+    return event_snapshot
+
+
+async def stats(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """/stats [YYYY-MM]: 그 달에 시작하는 이벤트 통계 (기본 이번 달)"""
+    try:
+        first, last = parse_month(context.args[0] if context.args else None, date.today())
+    except ValueError:
+        await update.message.reply_text("⚠️ 사용법: /stats 또는 /stats 2026-01")
+        return
+
+    snapshot = await snapshot_ready()
+    with metrics.span("query", command="stats"):
+        result = snapshot.stats(snapshot.starting_between(first, last))
+        top = [snapshot.row(i) for i in result['top_prize']]
+
+    lines = [
+        f"📊 {first.year}년 {first.month}월 이벤트 통계 (시작일 기준)\n",
+        f"📋 총 {result['count']}건 · 🌐 온라인 {result['online']} / 📍 오프라인 {result['offline']}",
+    ]
+    if result['projects']:
+        lines.append("🏢 프로젝트: " + ", ".join(f"{name} {count}건" for name, count in result['projects']))
+    if top:
+        lines.append(f"💰 상금 가치 합계: {result['prize_value_total']:,.0f}")
+        lines.extend(f"  {n}. {row['title']} ({row['project_name']}) {row['prize_value']:,.0f}"
+                     for n, row in enumerate(top, 1))
+    lines.append(f"\n🗂️ 전체 {len(snapshot)}건 기준")
+    await update.message.reply_text("\n".join(lines))
+
+
+async def search(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """/search <프로젝트명>: 프로젝트 (없으면 제목) 로 이벤트 찾기"""
+    query = " ".join(context.args or [])
+    if not query:
+        await update.message.reply_text("⚠️ 사용법: /search 프로젝트명")
+        return
+
+    snapshot = await snapshot_ready()
+    with metrics.span("query", command="search"):
+        rows = [snapshot.row(i) for i in snapshot.search(query)]
+
+    if not rows:
+        await update.message.reply_text(f"🔍 '{query}' 이벤트가 없습니다.")
+        return
+    await update.message.reply_text(f"🔍 '{query}' 이벤트 (최근 {len(rows)}건)\n\n" + "\n".join(map(format_row, rows)))
+
+
+# /upcoming 조회 기간 상한 (일, 큰 값은 날짜 계산이 넘치므로 잘라냄)
+UPCOMING_MAX_DAYS = 365
+
+
+async def upcoming(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """/upcoming [일수]: 앞으로 며칠 안에 시작하는 이벤트 (기본 7일, 최대 UPCOMING_MAX_DAYS)"""
+    try:
+        days = int(context.args[0]) if context.args else 7
+    except ValueError:
+        await update.message.reply_text(f"⚠️ 사용법: /upcoming 또는 /upcoming 14 (최대 {UPCOMING_MAX_DAYS}일)")
+        return
+    days = min(max(days, 0), UPCOMING_MAX_DAYS)
+
+    today = date.today()
+    snapshot = await snapshot_ready()
+    with metrics.span("query", command="upcoming"):
+        rows = snapshot.starting_between(today, today + timedelta(days=days))
+        ongoing = len(snapshot.ongoing(today))
+        shown = [snapshot.row(i) for i in rows[:20]]
+
+    lines = [f"📅 {days}일 안에 시작하는 이벤트 {len(rows)}건 (진행 중 {ongoing}건)\n"]
+    lines.extend(map(format_row, shown))
+    if len(rows) > len(shown):
+        lines.append(f"… 외 {len(rows) - len(shown)}건")
+    await update.message.reply_text("\n".join(lines))
+
+
+async def sync_store() -> int:
+    """Notion 변경분 (삭제 확인 주기가 되면 삭제분도) 을 로컬 저장소와 인덱스에 반영"""
+    with metrics.span("sync"):
+        changed = await event_store.sync(query_database)
+    metrics.inc("sync_pages_total", changed, kind="changed")
+
+    if event_store.reconcile_due(RECONCILE_SECONDS):
+        with metrics.span("reconcile"):
+            removed = await event_store.reconcile(query_database)
+        metrics.inc("sync_pages_total", len(removed), kind="removed")
+        changed += len(removed)
+
+    event_index.refresh(event_store)
+    await refresh_snapshot()
+    return changed
+
+
+async def refresh_snapshot():
+    """저장소가 바뀌었으면 조회용 스냅샷을 다른 스레드에서 새로 만들어 교체"""
+    global event_snapshot
+    if not event_snapshot.stale(event_store.conn):
+        return
+    event_snapshot = await asyncio.to_thread(EventSnapshot.build, EVENT_DB_PATH)
+    logger.info(f"🗂️ 조회 스냅샷: {len(event_snapshot)}건 ({event_snapshot.build_seconds * 1000:.0f}ms)")
+
+
+async def sync_store_loop():
+    """로컬 저장소를 주기적으로 증분 동기화"""
+    while True:
+        await asyncio.sleep(INDEX_REFRESH_SECONDS)
+        try:
+            changed = await sync_store()
+            if changed:
+                logger.info(f"🔄 저장소 동기화: {changed}건 변경 (총 {len(event_index)}건)")
+        except Exception as e:
+            logger.error(f"❌ 저장소 동기화 실패: {e}")
+
+
+async def post_init(app: Application):
+    """봇 시작 전 로컬 저장소 적재 및 동기화 작업 시작"""
+    event_index.load(event_store)
+    logger.info(f"📚 로컬 저장소 적재: {len(event_index)}건")
+
+    try:
+        changed = await sync_store()
+        logger.info(f"🔄 저장소 동기화: {changed}건 변경 (총 {len(event_index)}건)")
+    except Exception as e:
+        # 실패해도 봇은 시작하고, 동기화 작업에서 다시 시도
+        logger.error(f"❌ 저장소 동기화 실패: {e}")
+
+    app.bot_data['sync_task'] = asyncio.create_task(sync_store_loop())
+    notion_writer.start()
+
+    metrics.gauge("ingest_backlog", ingest_queue.backlog)
+    metrics.gauge("notion_write_pending", lambda: len(notion_writer))
+    metrics.gauge("event_index_size", lambda: len(event_index))
+    for backend in BACKENDS:
+        metrics.gauge(f"{backend.name}_concurrency_limit", lambda backend=backend: int(backend.limit))
+        metrics.gauge(f"{backend.name}_breaker_open", lambda backend=backend: int(backend.breaker.is_open()))
+    if METRICS_PORT:
+        app.bot_data['metrics_server'] = metrics.serve(METRICS_PORT, METRICS_HOST)
+
+    logger.info(f"⏱️ 시작 준비 완료: {time.monotonic() - STARTED:.2f}초")
+
+    # 재시작 전에 처리 중이던 작업을 되살리고 작업자 시작
+    # (webhook 모드는 다른 프로세스와 대기열을 공유하므로 임대 만료로 복구)
+    recovered = ingest_queue.recover() if BOT_MODE != 'webhook' else 0
+    logger.info(f"📥 대기열: {ingest_queue.backlog()}건 대기 (복구 {recovered}건), 작업자 {INGEST_WORKERS}개")
+    app.bot_data['worker_tasks'] = [
+        asyncio.create_task(ingest_worker(app)) for _ in range(INGEST_WORKERS)
+    ]
+
+
+async def post_shutdown(app: Application):
+    """백그라운드 작업 정리"""
+    tasks = [app.bot_data.get('sync_task'), *app.bot_data.get('worker_tasks', [])]
+    for task in tasks:
+        if task:
+            task.cancel()
+    await asyncio.gather(*(task for task in tasks if task), return_exceptions=True)
+
+    # 아직 보내지 않은 Notion 쓰기를 마저 보낸 뒤 저장소 닫기
+    await notion_writer.close()
+    logger.info(f"💾 분석 캐시 통계: 적중 {llm_cache.hits} / 미스 {llm_cache.misses}")
+    logger.info(f"🔌 API 응답 시간: {clients.latency_stats()}")
+    logger.info(f"🛡️ 장애 대응 통계: { {backend.name: backend.stats() for backend in BACKENDS} }")
+    logger.info(f"📈 단계별 처리 시간: {metrics.summary()}")
+    if app.bot_data.get('metrics_server'):
+        app.bot_data['metrics_server'].shutdown()
+    await clients.aclose()
+    llm_cache.close()
+    ingest_queue.close()
+    event_store.close()
+
+
 def main():
     """실행"""
     if not all([TELEGRAM_TOKEN, NOTION_DB_ID, OPENAI_API_KEY]):
         logger.error("❌ 환경 변수 누락")
         return
     
-    app = Application.builder().token(TELEGRAM_TOKEN).build()
+    # 여러 메시지를 동시에 처리 (포워딩 폭주 시 순차 대기 방지)
+    builder = (
+        Application.builder()
+        .token(TELEGRAM_TOKEN)
+        .concurrent_updates(TELEGRAM_CONCURRENCY)
+        .post_init(post_init)
+        .post_shutdown(post_shutdown)
+    )
+    if TELEGRAM_API_BASE_URL:
+        builder = builder.base_url(TELEGRAM_API_BASE_URL)
+    app = builder.build()
     
     app.add_handler(CommandHandler("start", start))
+    app.add_handler(CommandHandler("stats", stats))
+    app.add_handler(CommandHandler("search", search))
+    app.add_handler(CommandHandler("upcoming", upcoming))
     app.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, handle_message))
     app.add_handler(MessageHandler(filters.FORWARDED, handle_message))
     
     logger.info("🚀 봇 시작 v3.3 (미션 간결화)")
-    app.run_polling()
+
+    if BOT_MODE == 'webhook':
+        # 프로세스마다 WEBHOOK_PORT 를 달리 띄우고 로드 밸런서로 분산
+        logger.info(f"🌐 웹훅 대기: {WEBHOOK_LISTEN}:{WEBHOOK_PORT}/{WEBHOOK_PATH}")
+        app.run_webhook(
+            listen=WEBHOOK_LISTEN,
+            port=WEBHOOK_PORT,
+            url_path=WEBHOOK_PATH,
+            webhook_url=f"{WEBHOOK_URL.rstrip('/')}/{WEBHOOK_PATH}" if WEBHOOK_URL else None,
+            secret_token=WEBHOOK_SECRET,
+            max_connections=WEBHOOK_MAX_CONNECTIONS
+        )
+    else:
+        app.run_polling()
 
 
 if __name__ == '__main__':
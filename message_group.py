@@ -0,0 +1,64 @@
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class MessageGrouper:
+    """여러 업데이트로 나뉘어 온 게시물 하나를 모으는 디바운서
+
+    같은 키로 들어온 항목은 마지막 항목 뒤 window 초 동안 더 오는 것이 없거나
+    묶음을 연 뒤 max_wait 초가 지나면 닫힌다. 묶음을 연 호출자가 전체 항목
+    목록을 받아 처리하고, 나중에 합류한 호출자는 None 을 받는다.
+    """
+
+    def __init__(self, window: float = 1.5, max_wait: float = None):
+        self.window = window
+        self.max_wait = max_wait if max_wait is not None else window * 4
+        self.groups = {}   # 키 → {"parts", "future", "timer", "opened"}
+
+    def __len__(self):
+        """열려 있는 묶음 수"""
+        return len(self.groups)
+
+    async def add(self, key, part, start: bool = True, joins=None):
+        """항목 추가, 묶음이 닫히면 항목 목록 반환 (다른 호출자의 묶음에 합류했으면 None)
+
+        start: 열린 묶음이 없을 때 새로 열지 (False 면 기다리지 않고 [part] 반환)
+        joins(last, part): 열린 묶음의 마지막 항목 뒤에 이어지는지 (없으면 항상 합침)
+        """
+        group = self.groups.get(key)
+        if group is not None and (joins is None or joins(group['parts'][-1], part)):
+            group['parts'].append(part)
+            self._schedule(key, group)
+            return None
+
+        if not start or self.window <= 0:
+            return [part]
+
+        # 이어지지 않는 항목이면 앞 묶음은 바로 닫고 새로 시작
+        if group is not None:
+            self._close(key)
+
+        loop = asyncio.get_running_loop()
+        group = {"parts": [part], "future": loop.create_future(), "timer": None, "opened": loop.time()}
+        self.groups[key] = group
+        self._schedule(key, group)
+        return await group['future']
+
+    def _schedule(self, key, group: dict):
+        loop = asyncio.get_running_loop()
+        if group['timer'] is not None:
+            group['timer'].cancel()
+        deadline = min(loop.time() + self.window, group['opened'] + self.max_wait)
+        group['timer'] = loop.call_at(deadline, self._close, key)
+
+    def _close(self, key):
+        group = self.groups.pop(key, None)
+        if group is None:
+            return
+        group['timer'].cancel()
+        if len(group['parts']) > 1:
+            logger.info(f"🧩 나뉜 게시물 묶음: {len(group['parts'])}건")
+        if not group['future'].done():
+            group['future'].set_result(group['parts'])
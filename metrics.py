@@ -0,0 +1,218 @@
+import os
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# 단계별 처리 시간과 카운터 (Prometheus 텍스트 형식으로 /metrics 에 노출)
+#
+# 외부 패키지 없이 동작한다. OTEL_ENABLED=1 이고 opentelemetry 패키지가 있으면
+# 같은 단계를 OpenTelemetry span 으로도 남긴다.
+
+logger = logging.getLogger(__name__)
+
+# 처리 시간 히스토그램 구간 (초)
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+HELP = {
+    "stage_seconds": "처리 단계별 소요 시간",
+    "http_request_seconds": "외부 API 요청 응답 시간",
+    "http_responses_total": "외부 API 응답 수 (서비스, 상태 코드)",
+    "retries_total": "재시도 수",
+    "failures_total": "실패 수",
+    "cache_total": "AI 분석 캐시 조회 결과",
+    "openai_tokens_total": "OpenAI 사용 토큰",
+    "repairs_total": "형식이 잘못돼 다시 물은 AI 응답 필드",
+    "llm_streams_total": "AI 스트리밍 응답 결과 (완료 / 중복으로 중단)",
+    "events_total": "메시지 처리 결과",
+    "breaker_transitions_total": "백엔드 차단기 상태 변경 (열림/확인/닫힘)",
+    "breaker_rejected_total": "차단기가 열려 보내지 않은 요청",
+    "hedges_total": "느린 요청에 하나 더 보낸 hedge 요청 (보냄/먼저 응답)",
+}
+
+_lock = threading.Lock()
+_counters = {}     # (이름, 라벨) → 값
+_histograms = {}   # (이름, 라벨) → [구간별 누적 수, 합계, 개수]
+_gauges = {}       # 이름 → 값을 돌려주는 함수
+_tracer = None
+_tracer_checked = False
+
+
+def _key(name: str, labels: dict):
+    return name, tuple(sorted(labels.items()))
+
+
+def inc(name: str, value: float = 1, **labels):
+    """카운터 증가"""
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def counts(name: str, label: str) -> dict:
+    """카운터 name 의 label 값별 합계 (벤치마크 보고용)"""
+    totals = {}
+    with _lock:
+        for (key, labels), value in _counters.items():
+            if key == name:
+                value_of = dict(labels).get(label)
+                totals[value_of] = totals.get(value_of, 0) + value
+    return totals
+
+
+def observe(name: str, seconds: float, **labels):
+    """히스토그램에 값 기록"""
+    key = _key(name, labels)
+    with _lock:
+        buckets, total, count = _histograms.get(key) or ([0] * len(BUCKETS), 0.0, 0)
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                buckets[i] += 1
+        _histograms[key] = [buckets, total + seconds, count + 1]
+
+
+def gauge(name: str, read):
+    """렌더링 시점에 read() 값을 읽는 게이지 등록 (대기열 길이 등)"""
+    _gauges[name] = read
+
+
+def tracer():
+    """OpenTelemetry tracer (OTEL_ENABLED=1 이고 패키지가 있을 때만, 아니면 None)"""
+    global _tracer, _tracer_checked
+    if _tracer_checked:
+        return _tracer
+    _tracer_checked = True
+
+    if os.getenv('OTEL_ENABLED', '0') != '1':
+        return None
+    try:
+        from opentelemetry import trace
+    except ImportError:
+        logger.warning("⚠️ opentelemetry 패키지가 없어 span 을 내보내지 않습니다 (pip install opentelemetry-sdk)")
+        return None
+
+    try:
+        # SDK 와 OTLP 내보내기가 있으면 직접 설정 (주소는 OTEL_EXPORTER_OTLP_ENDPOINT)
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+
+        provider = TracerProvider(resource=Resource.create({"service.name": os.getenv('OTEL_SERVICE_NAME', 'event-bot')}))
+        provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+        trace.set_tracer_provider(provider)
+    except ImportError:
+        logger.info("🔭 OpenTelemetry SDK/OTLP 내보내기가 없어 기존 TracerProvider 사용")
+
+    _tracer = trace.get_tracer("event-bot")
+    return _tracer
+
+
+@contextmanager
+def span(stage: str, **attributes):
+    """단계 하나의 소요 시간 측정 (stage_seconds{stage=...}, OpenTelemetry span)"""
+    started = time.monotonic()
+    otel = tracer()
+    context = otel.start_as_current_span(stage, attributes=attributes) if otel else None
+    if context:
+        context.__enter__()
+
+    failed = False
+    try:
+        yield
+    except BaseException:
+        failed = True
+        raise
+    finally:
+        observe("stage_seconds", time.monotonic() - started, stage=stage)
+        if failed:
+            inc("failures_total", stage=stage)
+        if context:
+            context.__exit__(None, None, None)
+
+
+def _labels(labels: tuple, extra: str = "") -> str:
+    parts = [f'{k}="{v}"' for k, v in labels]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def render() -> str:
+    """Prometheus 텍스트 형식"""
+    lines = []
+    with _lock:
+        counters = sorted(_counters.items())
+        histograms = sorted((key, [list(v[0]), v[1], v[2]]) for key, v in _histograms.items())
+
+    seen = set()
+    for (name, labels), value in counters:
+        if name not in seen:
+            seen.add(name)
+            lines.append(f"# HELP {name} {HELP.get(name, name)}")
+            lines.append(f"# TYPE {name} counter")
+        lines.append(f"{name}{_labels(labels)} {value}")
+
+    for (name, labels), (buckets, total, count) in histograms:
+        if name not in seen:
+            seen.add(name)
+            lines.append(f"# HELP {name} {HELP.get(name, name)}")
+            lines.append(f"# TYPE {name} histogram")
+        for bound, bucket_count in zip(BUCKETS, buckets):
+            le = f'le="{bound}"'
+            lines.append(f"{name}_bucket{_labels(labels, le)} {bucket_count}")
+        le = 'le="+Inf"'
+        lines.append(f"{name}_bucket{_labels(labels, le)} {count}")
+        lines.append(f"{name}_sum{_labels(labels)} {total:.6f}")
+        lines.append(f"{name}_count{_labels(labels)} {count}")
+
+    for name, read in sorted(_gauges.items()):
+        try:
+            value = read()
+        except Exception:
+            continue
+        lines.append(f"# TYPE {name} gauge")
+        lines.append(f"{name} {value}")
+
+    return "\n".join(lines) + "\n"
+
+
+def summary() -> dict:
+    """단계별 평균 소요 시간 (ms) 과 호출 수 (종료 시 로그용)"""
+    with _lock:
+        return {
+            dict(labels).get('stage'): {"count": count, "avg_ms": round(total / count * 1000) if count else 0}
+            for (name, labels), (_, total, count) in _histograms.items()
+            if name == "stage_seconds"
+        }
+
+
+def serve(port: int, host: str = "127.0.0.1"):
+    """/metrics HTTP 서버를 백그라운드 스레드로 시작 (포트 사용 중이면 경고만)"""
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] != '/metrics':
+                self.send_response(404)
+                self.end_headers()
+                return
+            data = render().encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass
+
+    try:
+        server = ThreadingHTTPServer((host, port), Handler)
+    except OSError as e:
+        logger.warning(f"⚠️ 메트릭 서버 시작 실패 ({host}:{port}): {e}")
+        return None
+
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    logger.info(f"📈 메트릭: http://{host}:{port}/metrics")
+    return server
@@ -0,0 +1,353 @@
+import asyncio
+import json
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+
+import httpx
+from notion_client.errors import HTTPResponseError, RequestTimeoutError
+
+# 재시도할 Notion 응답 코드 (충돌, 요청 제한, 서버 오류)
+RETRY_STATUSES = {409, 429, 500, 502, 503, 504}
+# 요청이 처리되지 않았다는 것이 확실한 상태 (멱등이 아닌 pages.create 는 이것만 그대로 재시도)
+CREATE_RETRY_STATUSES = {409, 429}
+
+
+class TokenBucket:
+    """초당 rate 개씩 채워지는 스레드 안전 토큰 버킷 (Notion 평균 3 req/s)"""
+
+    def __init__(self, rate: float = 3.0, capacity: float = None):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """토큰 한 개를 얻을 때까지 대기"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+
+            time.sleep(wait)
+
+    async def acquire_async(self):
+        """acquire() 의 asyncio 버전 (이벤트 루프를 막지 않고 대기)"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+
+            await asyncio.sleep(wait)
+
+
+def retry_delay(error: Exception, attempt: int, base_delay: float = 1.0,
+                statuses: set = RETRY_STATUSES, transport: bool = True):
+    """재시도할 오류면 대기 시간 (초), 아니면 None
+
+    429 응답에 Retry-After 헤더가 있으면 그 시간을 우선한다.
+    OpenAI 오류 (status_code, 연결/타임아웃) 도 같은 기준으로 본다.
+    statuses 는 재시도할 상태 코드, transport=False 면 타임아웃/연결 오류는 재시도하지 않음.
+    """
+    if isinstance(error, HTTPResponseError):
+        status, headers = error.status, error.headers
+    else:
+        status = getattr(error, 'status_code', None)
+        response = getattr(error, 'response', None)
+        headers = response.headers if response is not None else {}
+
+    if isinstance(status, int):
+        if status not in statuses:
+            return None
+        retry_after = headers.get('retry-after')
+        return float(retry_after) if retry_after else base_delay * 2 ** attempt
+
+    if not transport:
+        return None
+    if isinstance(error, (RequestTimeoutError, httpx.TransportError)):
+        return base_delay * 2 ** attempt
+
+    # openai 는 쓸 때만 import 하므로 이미 불러온 경우에만 확인
+    openai = sys.modules.get('openai')
+    if openai is not None and isinstance(error, openai.APIConnectionError):
+        return base_delay * 2 ** attempt
+
+    return None
+
+
+def call_with_retry(fn, *args, bucket: TokenBucket = None, retries: int = 5,
+                    base_delay: float = 1.0, **kwargs):
+    """Notion API 호출 (토큰 버킷 대기, 429/5xx 는 지수 백오프로 재시도)
+
+    429 응답에 Retry-After 헤더가 있으면 그 시간을 우선한다.
+    """
+    for attempt in range(retries + 1):
+        if bucket:
+            bucket.acquire()
+
+        try:
+            return fn(*args, **kwargs)
+        except Exception as e:
+            delay = retry_delay(e, attempt, base_delay)
+            if delay is None or attempt == retries:
+                raise
+
+        time.sleep(delay + random.uniform(0, delay / 2))
+
+
+async def call_with_retry_async(fn, *args, bucket: TokenBucket = None, retries: int = 5,
+                                base_delay: float = 1.0, on_retry=None,
+                                retry_statuses: set = RETRY_STATUSES, retry_transport: bool = True, **kwargs):
+    """call_with_retry 의 asyncio 버전 (fn 은 notion_client.AsyncClient 메서드)
+
+    on_retry(오류, 대기 시간) 가 있으면 재시도 직전에 호출한다.
+    retry_statuses / retry_transport 는 retry_delay 의 statuses / transport.
+    """
+    for attempt in range(retries + 1):
+        if bucket:
+            await bucket.acquire_async()
+
+        try:
+            return await fn(*args, **kwargs)
+        except Exception as e:
+            delay = retry_delay(e, attempt, base_delay, retry_statuses, retry_transport)
+            if delay is None or attempt == retries:
+                raise
+            if on_retry:
+                on_retry(e, delay)
+
+        await asyncio.sleep(delay + random.uniform(0, delay / 2))
+
+
+def iter_pages(notion, database_id: str, bucket: TokenBucket = None, **query):
+    """커서 페이지네이션으로 데이터베이스의 모든 페이지를 순회하는 제너레이터"""
+    params = dict(query, page_size=100)
+
+    while True:
+        results = call_with_retry(
+            notion.databases.query, bucket=bucket, database_id=database_id, **params
+        )
+        yield from results.get('results', [])
+
+        if not results.get('has_more'):
+            return
+        params['start_cursor'] = results.get('next_cursor')
+
+
+class Progress:
+    """처리 건수, 속도, 남은 시간 출력 (total 이 None 이면 전체 건수를 모르는 스트림)"""
+
+    def __init__(self, total: int, every: float = 5.0):
+        self.total = total
+        self.every = every
+        self.done = 0
+        self.started = time.monotonic()
+        self.printed = self.started
+        self.lock = threading.Lock()
+
+    def step(self):
+        with self.lock:
+            self.done += 1
+            now = time.monotonic()
+            if now - self.printed < self.every and (self.total is None or self.done < self.total):
+                return
+            self.printed = now
+
+        elapsed = now - self.started
+        rate = self.done / elapsed if elapsed else 0
+        if self.total is None:
+            print(f"⏳ 진행: {self.done}건 · {rate:.1f}건/s · {int(elapsed // 60)}분 {int(elapsed % 60)}초 경과")
+            return
+        remaining = (self.total - self.done) / rate if rate else 0
+        percent = self.done * 100 // self.total if self.total else 100
+        print(f"⏳ 진행: {self.done}/{self.total} ({percent}%) · {rate:.1f}건/s · "
+              f"남은 시간 약 {int(remaining // 60)}분 {int(remaining % 60)}초")
+
+
+def property_value(prop: dict):
+    """비교/출력용 Notion 속성 값 (읽은 값과 쓸 값 형식 차이 제거)"""
+    if not prop:
+        return None
+    if 'date' in prop:
+        date = prop['date'] or {}
+        start, end = date.get('start'), date.get('end')
+        if not start:
+            return None
+        return f"{start} ~ {end}" if end else start
+    if 'select' in prop:
+        return (prop['select'] or {}).get('name')
+    for kind in ('title', 'rich_text'):
+        if kind in prop:
+            return "".join(item.get('text', {}).get('content', '') for item in prop[kind] or []) or None
+    for kind in ('number', 'url', 'checkbox'):
+        if kind in prop:
+            return prop[kind]
+    return None
+
+
+def property_diff(page: dict, properties: dict) -> dict:
+    """실제로 값이 바뀌는 속성만 {이름: (기존 값, 새 값)}"""
+    current = page.get('properties', {})
+    diff = {}
+    for name, prop in properties.items():
+        old, new = property_value(current.get(name)), property_value(prop)
+        if old != new:
+            diff[name] = (old, new)
+    return diff
+
+
+class Checkpoint:
+    """처리 완료한 페이지 ID 를 JSON 파일에 기록해 중단 후 이어서 실행
+
+    동기화 위치는 로컬 저장소(EventStore) 의 meta 에 있으므로 여기에는 남기지 않는다.
+    """
+
+    def __init__(self, path: str, flush_every: int = 20):
+        self.path = path
+        self.flush_every = flush_every
+        self.processed = set()
+        self.pending = 0
+        self.lock = threading.Lock()
+
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                data = json.load(f)
+            self.processed = set(data.get('processed', []))
+
+    def __contains__(self, page_id):
+        return page_id in self.processed
+
+    def mark(self, page_id: str):
+        with self.lock:
+            self.processed.add(page_id)
+            self.pending += 1
+            if self.pending < self.flush_every:
+                return
+        self.save()
+
+    def save(self):
+        with self.lock:
+            self.pending = 0
+            data = {"processed": sorted(self.processed)}
+            tmp = f"{self.path}.tmp"
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp, self.path)
+
+    def clear(self):
+        """기록 삭제 (처음부터 다시 실행)"""
+        with self.lock:
+            self.processed.clear()
+            self.pending = 0
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class BulkRunner:
+    """페이지별 변경 계산 + Notion 업데이트를 작업자 풀로 병렬 실행
+
+    plan(page) 는 업데이트할 properties dict 를 반환하고, 바꿀 것이 없으면 None.
+    모든 Notion 호출은 같은 토큰 버킷을 공유해 요청 제한을 넘지 않는다.
+    """
+
+    def __init__(self, notion, bucket: TokenBucket = None, workers: int = 3):
+        self.notion = notion
+        self.bucket = bucket or TokenBucket()
+        self.workers = workers
+
+    def _process(self, page: dict, plan, on_updated, dry_run: bool, name: str):
+        properties = plan(page)
+        if properties is None:
+            return 'skipped'
+
+        # 이미 같은 값이면 쓰기 호출 생략
+        diff = property_diff(page, properties)
+        if not diff:
+            print(f"🟰 [{name}] - 변경 없음, 건너뜀")
+            return 'unchanged'
+
+        changes = ", ".join(f"{key}: {old} → {new}" for key, (old, new) in diff.items())
+        if dry_run:
+            print(f"🔍 [{name}] - {changes}")
+            return 'updated'
+
+        updated = call_with_retry(
+            self.notion.pages.update,
+            bucket=self.bucket,
+            page_id=page['id'],
+            properties={key: properties[key] for key in diff}
+        )
+        if on_updated:
+            on_updated(updated)
+        print(f"✅ [{name}] - {changes}")
+        return 'updated'
+
+    def run(self, pages, plan, on_updated=None, label=None,
+            checkpoint: Checkpoint = None, dry_run: bool = False, total: int = None) -> dict:
+        """pages 에 plan 적용 후 결과 집계 반환
+
+        pages 는 제너레이터여도 되고, 받는 대로 처리한다 (동시에 진행하는 페이지는
+        작업자 수의 2배까지라 전체 목록을 메모리에 올리지 않음).
+        total 은 진행률 표시용 전체 건수 (없으면 건수만 출력).
+        checkpoint 가 있으면 이미 처리한 페이지는 건너뛰고 진행 상황을 기록한다.
+        dry_run 이면 바뀔 속성만 출력하고 Notion 에 쓰지 않는다.
+        """
+        counts = {'updated': 0, 'unchanged': 0, 'skipped': 0, 'resumed': 0, 'error': 0}
+
+        if total is not None and checkpoint:
+            total = max(0, total - len(checkpoint.processed))
+        progress = Progress(total)
+        window = self.workers * 2
+
+        def collect(future, page):
+            try:
+                counts[future.result()] += 1
+                if checkpoint and not dry_run:
+                    checkpoint.mark(page['id'])
+            except Exception as e:
+                name = label(page) if label else page['id']
+                print(f"❌ [{name}] - 오류: {e}")
+                counts['error'] += 1
+            progress.step()
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            running = {}
+            for page in pages:
+                if checkpoint and page['id'] in checkpoint:
+                    counts['resumed'] += 1
+                    continue
+
+                if len(running) >= window:
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        collect(future, running.pop(future))
+
+                future = pool.submit(
+                    self._process, page, plan, on_updated, dry_run,
+                    label(page) if label else page['id']
+                )
+                running[future] = page
+
+            for future in as_completed(running):
+                collect(future, running[future])
+
+        if checkpoint and not dry_run:
+            checkpoint.save()
+
+        return counts
@@ -0,0 +1,210 @@
+import asyncio
+import itertools
+import logging
+import time
+
+import metrics
+from notion_bulk import CREATE_RETRY_STATUSES, TokenBucket, call_with_retry_async, retry_delay
+
+logger = logging.getLogger(__name__)
+
+
+class NotionWriter:
+    """Notion 페이지 생성/수정을 모아 두었다가 요청 제한에 맞춰 내보내는 write-behind 작성기
+
+    create()/update() 는 작업을 대기열에 넣고 결과 페이지를 기다린다. flush_interval
+    마다 쌓인 작업을 concurrency 개씩, 공유 토큰 버킷 속도로 보낸다 (429 는
+    Retry-After 를 따라 재시도). 아직 나가지 않은 같은 페이지 수정은 하나로 합친다.
+
+    생성은 멱등이 아니라서 처리 여부를 알 수 없는 실패 (5xx, 타임아웃, 연결 끊김) 뒤에는
+    같은 원본 링크의 페이지가 이미 생겼는지 먼저 조회하고, 없을 때만 다시 만든다.
+
+    on_written(page) 콜백은 호출자가 취소돼도 실행되므로 로컬 저장소 반영
+    같은 후처리는 콜백에 둔다.
+
+    notion 은 AsyncClient 또는 AsyncClient 를 돌려주는 함수 (첫 쓰기 때 생성).
+    backend (resilience.Backend) 가 있으면 요청마다 차단기/동시 요청 한도를 거친다.
+    """
+
+    def __init__(self, notion, bucket: TokenBucket = None, flush_interval: float = 0.5,
+                 concurrency: int = 3, retries: int = 5, backend=None):
+        self.notion = notion
+        self.backend = backend
+        self.bucket = bucket or TokenBucket()
+        self.flush_interval = flush_interval
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.retries = retries
+        self.pending = {}   # 키 → 작업 (생성은 일련번호, 수정은 page_id)
+        self.sequence = itertools.count()
+        self.task = None
+
+        # 통계
+        self.written = 0
+        self.failed = 0
+        self.coalesced = 0
+        self.retried = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+
+    def __len__(self):
+        """대기 중인 작업 수"""
+        return len(self.pending)
+
+    def start(self):
+        """주기적 flush 작업 시작"""
+        if self.task is None:
+            self.task = asyncio.create_task(self._run())
+
+    async def close(self):
+        """flush 작업을 멈추고 남은 작업을 모두 내보냄 (종료 시)"""
+        if self.task:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
+        await self.flush()
+        logger.info(f"📝 Notion 쓰기 통계: {self.stats()}")
+
+    async def create(self, parent: dict, properties: dict, on_written=None) -> dict:
+        """페이지 생성 예약 후 생성된 페이지 반환"""
+        op = self._op('create', {"parent": parent, "properties": dict(properties)}, on_written)
+        self.pending[('create', next(self.sequence))] = op
+        return await asyncio.shield(op['future'])
+
+    async def update(self, page_id: str, properties: dict, on_written=None) -> dict:
+        """페이지 수정 예약 후 수정된 페이지 반환
+
+        아직 보내지 않은 같은 페이지 수정이 있으면 속성을 합쳐 한 번만 보낸다 (나중 값 우선).
+        """
+        key = ('update', page_id)
+        op = self.pending.get(key)
+        if op is None:
+            op = self._op('update', {"page_id": page_id, "properties": dict(properties)}, on_written)
+            self.pending[key] = op
+        else:
+            op['kwargs']['properties'].update(properties)
+            if on_written:
+                op['callbacks'].append(on_written)
+            self.coalesced += 1
+        return await asyncio.shield(op['future'])
+
+    def _op(self, kind: str, kwargs: dict, on_written) -> dict:
+        return {
+            "kind": kind,
+            "kwargs": kwargs,
+            "callbacks": [on_written] if on_written else [],
+            "future": asyncio.get_running_loop().create_future(),
+            "queued_at": time.monotonic(),
+        }
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"❌ Notion 쓰기 flush 실패: {e}")
+
+    async def flush(self):
+        """대기 중인 작업을 모두 보내고 끝날 때까지 대기"""
+        ops, self.pending = list(self.pending.values()), {}
+        if not ops:
+            return
+
+        started = time.monotonic()
+        await asyncio.gather(*(self._write(op) for op in ops))
+        logger.info(
+            f"📝 Notion 쓰기 {len(ops)}건 ({time.monotonic() - started:.1f}초), "
+            f"대기 {len(self.pending)}건, 평균 지연 {self.average_latency() * 1000:.0f}ms"
+        )
+
+    async def _write(self, op: dict):
+        notion = self.notion() if callable(self.notion) else self.notion
+        method = notion.pages.create if op['kind'] == 'create' else notion.pages.update
+        if self.backend is not None:
+            method = self.backend.wrap(method)
+
+        def on_retry(error, delay):
+            self.retried += 1
+            metrics.inc("retries_total", kind="notion_write")
+            logger.warning(f"🔁 Notion 쓰기 재시도 ({delay:.1f}초 후): {error}")
+
+        try:
+            async with self.semaphore:
+                if op['kind'] == 'create':
+                    page = await self._create(notion, method, on_retry, op['kwargs'])
+                else:
+                    page = await call_with_retry_async(
+                        method, bucket=self.bucket, retries=self.retries, on_retry=on_retry, **op['kwargs']
+                    )
+        except Exception as e:
+            self.failed += 1
+            metrics.inc("failures_total", stage="notion_write_op")
+            op['future'].set_exception(e)
+            return
+
+        latency = time.monotonic() - op['queued_at']
+        self.written += 1
+        self.latency_total += latency
+        self.latency_max = max(self.latency_max, latency)
+
+        for callback in op['callbacks']:
+            try:
+                callback(page)
+            except Exception as e:
+                logger.error(f"❌ Notion 쓰기 후처리 실패: {e}")
+
+        op['future'].set_result(page)
+
+    async def _create(self, notion, method, on_retry, kwargs: dict) -> dict:
+        """페이지 생성 (처리 여부를 모르는 실패 뒤에는 이미 생긴 페이지를 찾아 중복 생성 방지)"""
+        for attempt in range(self.retries + 1):
+            try:
+                # 429/409 는 처리되지 않은 요청이라 그대로 재시도
+                return await call_with_retry_async(
+                    method, bucket=self.bucket, retries=self.retries, on_retry=on_retry,
+                    retry_statuses=CREATE_RETRY_STATUSES, retry_transport=False, **kwargs
+                )
+            except Exception as e:
+                delay = retry_delay(e, attempt)
+                url = (kwargs['properties'].get('원본 링크') or {}).get('url')
+                # 원본 링크가 없으면 이미 생겼는지 확인할 수 없어서 재시도하지 않음
+                if delay is None or attempt == self.retries or not url:
+                    raise
+                on_retry(e, delay)
+                await asyncio.sleep(delay)
+
+            existing = await self._find_created(notion, kwargs['parent'], url)
+            if existing:
+                logger.warning(f"♻️ 응답을 받지 못한 생성 요청이 처리돼 있음: {existing['id']}")
+                return existing
+
+    async def _find_created(self, notion, parent: dict, url: str):
+        """원본 링크가 url 인 페이지 (없으면 None)"""
+        query = notion.databases.query
+        if self.backend is not None:
+            query = self.backend.wrap(query, hedge=True)
+        results = await call_with_retry_async(
+            query, bucket=self.bucket, retries=self.retries,
+            database_id=parent['database_id'],
+            filter={"property": "원본 링크", "url": {"equals": url}},
+            page_size=1
+        )
+        for page in results.get('results', []):
+            if (page.get('properties', {}).get('원본 링크') or {}).get('url') == url:
+                return page
+        return None
+
+    def average_latency(self) -> float:
+        return self.latency_total / self.written if self.written else 0.0
+
+    def stats(self) -> dict:
+        """대기열 깊이와 쓰기 지연 통계"""
+        return {
+            "depth": len(self.pending),
+            "written": self.written,
+            "failed": self.failed,
+            "coalesced": self.coalesced,
+            "retried": self.retried,
+            "latency_avg_ms": round(self.average_latency() * 1000),
+            "latency_max_ms": round(self.latency_max * 1000),
+        }
@@ -0,0 +1,110 @@
+import json
+
+# 스트리밍 응답용 점진적 JSON 파서
+#
+# 모델이 한 글자씩 보내는 JSON 객체 (또는 객체 배열) 에서 값이 완성된 필드를
+# 바로 꺼낸다. 숫자는 뒤에 구분자(, } 공백)가 와야 완성으로 본다 ("12" 뒤에 "3" 이 올 수 있음).
+# 큰 JSON 파일 (텔레그램 내보내기) 을 조각으로 읽어 항목 단위로 처리하는 데도 쓴다.
+
+_decoder = json.JSONDecoder()
+WHITESPACE = ' \t\r\n'
+COMPACT_SIZE = 1 << 16
+
+
+class PartialJson:
+    """feed() 로 받은 조각에서 새로 완성된 (항목 번호, 필드명, 값) 목록 반환
+
+    최상위가 객체면 항목 번호는 항상 0, 객체 배열이면 배열 안의 순서.
+    코드 블록(```json) 이나 앞뒤 설명 문장은 건너뛴다.
+    array=True 면 첫 [ 부터 읽는다 ({"events": [...]} 처럼 객체로 감싼 배열).
+    """
+
+    def __init__(self, array: bool = False):
+        self.expect_array = array
+        self.buffer = ""
+        self.pos = 0
+        self.array = None     # 최상위가 배열인지 (첫 괄호를 보기 전에는 None)
+        self.item = -1        # 현재 객체의 배열 내 순서
+        self.in_object = False
+        self.done = False
+
+    def feed(self, chunk: str) -> list:
+        self.buffer += chunk
+        found = []
+        while not self.done and self._step(found):
+            pass
+        # 읽은 앞부분은 버림 (큰 파일을 조각으로 읽을 때 버퍼가 계속 커지지 않도록)
+        if self.pos > COMPACT_SIZE:
+            self.buffer = self.buffer[self.pos:]
+            self.pos = 0
+        return found
+
+    def _skip_whitespace(self):
+        while self.pos < len(self.buffer) and self.buffer[self.pos] in WHITESPACE:
+            self.pos += 1
+
+    def _step(self, found: list) -> bool:
+        """한 단계 진행 (더 읽을 내용이 필요하면 False)"""
+        self._skip_whitespace()
+        if self.pos >= len(self.buffer):
+            return False
+        char = self.buffer[self.pos]
+
+        if self.array is None:
+            # 첫 { 또는 [ 까지 건너뜀
+            brackets = '[' if self.expect_array else '{['
+            start = min((i for i in (self.buffer.find(b, self.pos) for b in brackets) if i >= 0), default=-1)
+            if start < 0:
+                self.pos = len(self.buffer)
+                return False
+            self.array = self.buffer[start] == '['
+            self.pos = start + (1 if self.array else 0)
+            return True
+
+        if not self.in_object:
+            if char == '{':
+                self.pos += 1
+                self.in_object = True
+                self.item += 1
+            elif char == ',' and self.array:
+                self.pos += 1
+            else:
+                # 배열 끝(]) 또는 알 수 없는 내용
+                self.done = True
+                return False
+            return True
+
+        if char == ',':
+            self.pos += 1
+            return True
+        if char == '}':
+            self.pos += 1
+            self.in_object = False
+            if not self.array:
+                self.done = True
+            return True
+
+        # "필드명": 값
+        try:
+            key, end = _decoder.raw_decode(self.buffer, self.pos)
+        except json.JSONDecodeError:
+            return False
+        colon = self.buffer.find(':', end)
+        if colon < 0 or self.buffer[end:colon].strip():
+            return False
+        start = colon + 1
+        while start < len(self.buffer) and self.buffer[start] in WHITESPACE:
+            start += 1
+        if start >= len(self.buffer):
+            return False
+
+        try:
+            value, end = _decoder.raw_decode(self.buffer, start)
+        except json.JSONDecodeError:
+            return False
+        if isinstance(value, (int, float)) and not isinstance(value, bool) and end >= len(self.buffer):
+            return False
+
+        self.pos = end
+        found.append((self.item, key, value))
+        return True
@@ -0,0 +1,110 @@
+import re
+
+from event_store import normalize_url
+
+# AI 에 보낼 메시지 본문 정리
+#
+# 규칙 추출은 원문으로 하고, 프롬프트에는 정리한 본문을 넣는다.
+# - 공백/빈 줄, 연속 이모지 줄이기
+# - 같은 링크와 해시태그는 처음 한 번만
+# - 너무 긴 본문은 토큰 수 기준으로 앞부분 위주로 자름
+# 토큰 수는 tiktoken 이 있으면 정확히 세고, 없으면 보수적으로 추정한다.
+
+EMOJI = r'[\U0001F000-\U0001FAFF\u2600-\u27BF\u2B00-\u2BFF\u2300-\u23FF]'
+# 이모지 하나 (변형 선택자, 피부색, ZWJ 로 이은 조합 포함)
+EMOJI_CLUSTER = f'{EMOJI}(?:[\\uFE0F\\U0001F3FB-\\U0001F3FF]|\\u200D{EMOJI})*'
+EMOJI_RUN_RE = re.compile(f'({EMOJI_CLUSTER})(?:[ \\t]*{EMOJI_CLUSTER})+')
+SPACE_RE = re.compile(r'[ \t\u00A0\u200B\u3000]+')
+BLANK_LINES_RE = re.compile(r'\n{3,}')
+URL_RE = re.compile(r'https?://[^\s<>"]+')
+HASHTAG_RE = re.compile(r'#[^\s#]+')
+
+# 긴 본문을 자를 때 뒷부분에 남길 비율 (마지막 줄의 참여 링크/마감 안내)
+TAIL_RATIO = 0.15
+ELLIPSIS = "\n…\n"
+
+_encoding = None
+_encoding_checked = False
+
+
+def encoding():
+    """tiktoken 인코딩 (gpt-4o 계열, 패키지가 없으면 None)"""
+    global _encoding, _encoding_checked
+    if not _encoding_checked:
+        _encoding_checked = True
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding("o200k_base")
+        except (ImportError, ValueError):
+            _encoding = None
+    return _encoding
+
+
+def count_tokens(text: str) -> int:
+    """토큰 수 (tiktoken 이 없으면 ASCII 4글자당 1, 그 외 글자당 1 로 추정)"""
+    enc = encoding()
+    if enc is not None:
+        return len(enc.encode(text))
+    ascii_chars = sum(1 for char in text if char < '\x80')
+    return ascii_chars // 4 + (len(text) - ascii_chars)
+
+
+def normalize(text: str) -> str:
+    """공백/이모지 줄이기, 반복 링크/해시태그 제거"""
+    seen_urls = set()
+
+    def dedupe_url(match):
+        key = normalize_url(match[0].rstrip('.,)')) or match[0]
+        if key in seen_urls:
+            return ""
+        seen_urls.add(key)
+        return match[0]
+
+    seen_tags = set()
+
+    def dedupe_tag(match):
+        tag = match[0].casefold()
+        if tag in seen_tags:
+            return ""
+        seen_tags.add(tag)
+        return match[0]
+
+    text = URL_RE.sub(dedupe_url, text)
+    text = HASHTAG_RE.sub(dedupe_tag, text)
+    text = EMOJI_RUN_RE.sub(r'\1', text)
+    lines = [SPACE_RE.sub(' ', line).strip() for line in text.splitlines()]
+    return BLANK_LINES_RE.sub('\n\n', "\n".join(lines)).strip()
+
+
+def truncate(text: str, max_tokens: int) -> str:
+    """max_tokens 를 넘으면 앞부분과 끝부분만 남김 (줄 단위로 자름)"""
+    if max_tokens <= 0 or count_tokens(text) <= max_tokens:
+        return text
+
+    lines = text.splitlines()
+    tail_budget = int(max_tokens * TAIL_RATIO)
+    head, used = [], 0
+    for line in lines:
+        cost = count_tokens(line) + 1
+        if used + cost > max_tokens - tail_budget:
+            # 한 줄이 예산보다 길면 그 줄을 글자 수 비율로 잘라 넣음
+            if not head:
+                head.append(line[:max(1, len(line) * (max_tokens - tail_budget) // cost)])
+            break
+        head.append(line)
+        used += cost
+
+    tail, used = [], 0
+    for line in reversed(lines[len(head):]):
+        cost = count_tokens(line) + 1
+        if used + cost > tail_budget:
+            break
+        tail.insert(0, line)
+        used += cost
+
+    return "\n".join(head) + ELLIPSIS + "\n".join(tail) if tail else "\n".join(head) + ELLIPSIS.rstrip()
+
+
+def prepare(text: str, max_tokens: int) -> str:
+    """프롬프트에 넣을 본문 (정리 후 토큰 상한까지 자름)"""
+    return truncate(normalize(text), max_tokens)
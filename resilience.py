@@ -0,0 +1,342 @@
+import sys
+import time
+import random
+import asyncio
+import logging
+from collections import deque
+from contextlib import asynccontextmanager
+from functools import partial
+
+import httpx
+from notion_client.errors import RequestTimeoutError
+
+import metrics
+
+# 외부 API (OpenAI / Notion) 장애 대응
+#
+# - CircuitBreaker: 연속 실패가 쌓이면 한동안 요청을 보내지 않고 바로 CircuitOpen
+#   (장애 중에 메시지마다 타임아웃을 기다리지 않음). reset 시간이 지나면 한 요청만 보내 확인
+# - AdaptiveLimit: 동시 요청 수를 AIMD 로 조절 (정상이면 한 칸씩 늘리고,
+#   429/오류/응답 지연이면 절반으로). 설정한 동시 요청 수가 상한
+# - Backend.call: 위 둘을 거쳐 요청하고, 멱등 요청은 느리면 (최근 응답 시간 분위수)
+#   여유 자리가 있을 때만 같은 요청을 하나 더 보내 먼저 온 응답을 씀 (hedge)
+# 재시도 (지터 포함 지수 백오프, Retry-After) 는 notion_bulk.call_with_retry_async 가 맡는다.
+
+logger = logging.getLogger(__name__)
+
+OVERLOAD = "overload"   # 429: 살아 있지만 요청이 많음 → 동시 요청만 줄임
+FAILURE = "failure"     # 5xx / 타임아웃 / 연결 실패 → 차단기 실패로도 셈
+
+
+class CircuitOpen(Exception):
+    """차단기가 열려 요청을 보내지 않음 (retry_in 초 뒤 다시 시도)"""
+
+    def __init__(self, name: str, retry_in: float):
+        super().__init__(f"{name} 차단 중 ({retry_in:.0f}초 뒤 재확인)")
+        self.name = name
+        self.retry_in = retry_in
+
+
+def classify(error: Exception):
+    """오류 종류: OVERLOAD / FAILURE / None (요청 자체 오류라 백엔드 상태와 무관)"""
+    status = getattr(error, 'status', None)
+    if not isinstance(status, int):
+        status = getattr(error, 'status_code', None)
+    if status == 429:
+        return OVERLOAD
+    if isinstance(status, int):
+        return FAILURE if status >= 500 or status == 408 else None
+
+    if isinstance(error, (asyncio.TimeoutError, RequestTimeoutError, httpx.TransportError)):
+        return FAILURE
+    # openai 는 쓸 때만 import 하므로 이미 불러온 경우에만 확인 (타임아웃 포함)
+    openai = sys.modules.get('openai')
+    if openai is not None and isinstance(error, openai.APIConnectionError):
+        return FAILURE
+    return None
+
+
+class CircuitBreaker:
+    """연속 실패 failures 번이면 열리고, reset 초 뒤 요청 하나로 복구 여부 확인
+
+    closed (정상) → open (차단) → half_open (확인 요청 하나만 통과) → closed / open
+    """
+
+    def __init__(self, name: str, failures: int = 5, reset: float = 30.0):
+        self.name = name
+        self.failures = failures
+        self.reset = reset
+        self.state = "closed"
+        self.consecutive = 0
+        self.opened_at = 0.0
+        self.probing = False
+
+        # 통계
+        self.opened = 0
+        self.rejected = 0
+
+    def retry_in(self) -> float:
+        """다시 요청을 보내 볼 수 있을 때까지 남은 시간 (초, 지금 보내도 되면 0)"""
+        if self.state == "closed":
+            return 0.0
+        if self.state == "half_open":
+            # 확인 요청이 끝날 때까지는 나머지 요청을 잠깐씩 미룸
+            return 1.0 if self.probing else 0.0
+        return max(0.0, self.opened_at + self.reset - time.monotonic())
+
+    def is_open(self) -> bool:
+        return self.retry_in() > 0
+
+    def check(self):
+        """요청 전 확인 (차단 중이면 CircuitOpen)"""
+        if self.state == "open" and time.monotonic() >= self.opened_at + self.reset:
+            self._transition("half_open")
+        if self.state == "closed" or (self.state == "half_open" and not self.probing):
+            self.probing = self.state == "half_open"
+            return
+        self.rejected += 1
+        metrics.inc("breaker_rejected_total", service=self.name)
+        raise CircuitOpen(self.name, self.retry_in())
+
+    def success(self):
+        self.consecutive = 0
+        self.probing = False
+        if self.state != "closed":
+            self._transition("closed")
+
+    def failure(self):
+        self.consecutive += 1
+        self.probing = False
+        if self.state == "half_open" or (self.state == "closed" and self.consecutive >= self.failures):
+            self.opened_at = time.monotonic()
+            self.opened += 1
+            self._transition("open")
+
+    def release(self):
+        """결과와 무관하게 끝난 확인 요청 (요청 자체 오류, 취소)"""
+        self.probing = False
+
+    def _transition(self, state: str):
+        self.state = state
+        metrics.inc("breaker_transitions_total", service=self.name, state=state)
+        if state == "open":
+            logger.warning(f"🚧 {self.name} 차단기 열림 (연속 실패 {self.consecutive}회, {self.reset:.0f}초 뒤 재확인)")
+        elif state == "closed":
+            logger.info(f"✅ {self.name} 차단기 닫힘 (정상 응답)")
+
+
+class AdaptiveLimit:
+    """AIMD 동시 요청 한도 (asyncio 전용, 대기 순서대로 자리 배정)
+
+    성공 응답마다 한도를 1/한도 씩 늘리고 (한도만큼 성공하면 +1), 429 / 실패 /
+    최근 응답 시간이 평소의 latency_ratio 배를 넘으면 절반으로 줄인다. 줄인 뒤
+    최근 응답 시간만큼은 다시 줄이지 않는다 (같은 순간의 오류가 연달아 줄이지 않도록).
+    """
+
+    def __init__(self, name: str, limit: int, min_limit: int = 1, latency_ratio: float = 2.0):
+        self.name = name
+        self.max_limit = max(1, limit)
+        self.min_limit = min(min_limit, self.max_limit)
+        self.latency_ratio = latency_ratio
+        self.limit = float(self.max_limit)
+        self.inflight = 0
+        self.waiters = deque()
+        self.short = None       # 최근 응답 시간 (빠른 이동 평균)
+        self.baseline = None    # 평소 응답 시간 (느린 이동 평균)
+        self.decreased_at = 0.0
+
+        # 통계
+        self.decreases = 0
+        self.min_seen = self.max_limit
+
+    def __int__(self):
+        return max(self.min_limit, int(self.limit))
+
+    async def acquire(self):
+        if self.inflight < int(self) and not self.waiters:
+            self.inflight += 1
+            return
+        future = asyncio.get_running_loop().create_future()
+        self.waiters.append(future)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # 자리를 받은 직후 취소됨
+                self.release()
+            else:
+                self.waiters.remove(future)
+            raise
+
+    def try_acquire(self) -> bool:
+        """기다리지 않고 자리가 있을 때만 얻기 (hedge 요청용)"""
+        if self.inflight < int(self) and not self.waiters:
+            self.inflight += 1
+            return True
+        return False
+
+    def release(self):
+        self.inflight -= 1
+        self._wake()
+
+    def _wake(self):
+        while self.waiters and self.inflight < int(self):
+            future = self.waiters.popleft()
+            if not future.done():
+                self.inflight += 1
+                future.set_result(None)
+
+    def record(self, latency: float, kind: str = None):
+        """요청 결과 반영 (kind: None 이면 성공, OVERLOAD / FAILURE)"""
+        if kind is None:
+            self.short = latency if self.short is None else self.short * 0.7 + latency * 0.3
+            self.baseline = latency if self.baseline is None else self.baseline * 0.95 + latency * 0.05
+            if self.short > self.baseline * self.latency_ratio:
+                self._decrease("지연")
+            elif self.limit < self.max_limit:
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+                self._wake()
+        else:
+            self._decrease("429" if kind == OVERLOAD else "오류")
+
+    def _decrease(self, reason: str):
+        now = time.monotonic()
+        if now - self.decreased_at < (self.short or 1.0):
+            return
+        self.decreased_at = now
+        before = int(self)
+        self.limit = max(float(self.min_limit), self.limit / 2)
+        # 줄인 한도를 다음 판단의 기준으로 (지연이 계속되면 평소 응답 시간도 따라 올라감)
+        if self.short is not None and self.baseline is not None:
+            self.baseline = max(self.baseline, self.short / self.latency_ratio)
+        self.decreases += 1
+        self.min_seen = min(self.min_seen, int(self))
+        if int(self) < before:
+            logger.warning(f"📉 {self.name} 동시 요청 한도 {before} → {int(self)} ({reason})")
+
+
+class Backend:
+    """외부 API 하나의 차단기 + 동시 요청 한도 + hedge
+
+    concurrency: 동시 요청 상한 (한도는 여기서 시작해 줄었다가 다시 늘어남)
+    failures / reset: 차단기가 열리는 연속 실패 수 / 다시 확인하기까지의 시간 (초)
+    hedge_quantile: 이 분위수의 응답 시간을 넘기면 hedge (0이면 끔)
+    """
+
+    def __init__(self, name: str, concurrency: int, failures: int = 5, reset: float = 30.0,
+                 latency_ratio: float = 2.0, hedge_quantile: float = 0.95, hedge_min_samples: int = 20):
+        self.name = name
+        self.breaker = CircuitBreaker(name, failures, reset)
+        self.limit = AdaptiveLimit(name, concurrency, latency_ratio=latency_ratio)
+        self.hedge_quantile = hedge_quantile
+        self.hedge_min_samples = hedge_min_samples
+        self.latencies = deque(maxlen=200)
+        self.hedged = 0
+        self.hedge_wins = 0
+
+    @asynccontextmanager
+    async def request(self):
+        """차단기 확인 → 동시 요청 자리 → 끝나면 응답 시간과 결과를 차단기/한도에 반영
+
+        스트리밍처럼 응답을 끝까지 받는 동안 자리를 잡아 둬야 하는 요청은 직접 쓴다.
+        """
+        self.breaker.check()
+        try:
+            await self.limit.acquire()
+        except BaseException:
+            self.breaker.release()
+            raise
+
+        started = time.monotonic()
+        try:
+            yield
+        except Exception as e:
+            self._record(time.monotonic() - started, e)
+            raise
+        except BaseException:
+            self.breaker.release()
+            raise
+        else:
+            self._record(time.monotonic() - started, None)
+        finally:
+            self.limit.release()
+
+    def _record(self, latency: float, error: Exception):
+        kind = classify(error) if error is not None else None
+        if error is not None and kind is None:
+            # 잘못된 요청 등은 백엔드 상태와 무관
+            self.breaker.release()
+            return
+        self.limit.record(latency, kind)
+        if kind == FAILURE:
+            self.breaker.failure()
+        else:
+            # 429 도 응답은 온 것이라 차단기에는 정상
+            self.breaker.success()
+            if kind is None:
+                self.latencies.append(latency)
+
+    async def call(self, fn, *args, hedge: bool = False, **kwargs):
+        """fn(*args, **kwargs) 요청 (hedge=True 면 멱등 요청으로 보고 느릴 때 하나 더 보냄)"""
+        async with self.request():
+            if not hedge:
+                return await fn(*args, **kwargs)
+            return await self._hedged(fn, args, kwargs)
+
+    def wrap(self, fn, hedge: bool = False):
+        """call_with_retry_async 에 넘길 함수 (재시도마다 차단기/한도를 거침)"""
+        return partial(self.call, fn, hedge=hedge)
+
+    def hedge_delay(self):
+        """hedge 요청을 보낼 대기 시간 (최근 응답 시간 분위수 + 지터, 표본이 적으면 None)"""
+        if not self.hedge_quantile or len(self.latencies) < self.hedge_min_samples:
+            return None
+        values = sorted(self.latencies)
+        delay = values[min(len(values) - 1, int(len(values) * self.hedge_quantile))]
+        return delay * random.uniform(1.0, 1.2)
+
+    async def _hedged(self, fn, args, kwargs):
+        first = asyncio.ensure_future(fn(*args, **kwargs))
+        delay = self.hedge_delay()
+        if delay is None:
+            return await first
+
+        done, _ = await asyncio.wait({first}, timeout=delay)
+        # 한도가 찼으면 (과부하) hedge 하지 않음
+        if done or not self.limit.try_acquire():
+            return await first
+
+        self.hedged += 1
+        metrics.inc("hedges_total", service=self.name, result="sent")
+        second = asyncio.ensure_future(fn(*args, **kwargs))
+        tasks = {first, second}
+        try:
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if not task.cancelled() and task.exception() is None:
+                        if task is second:
+                            self.hedge_wins += 1
+                            metrics.inc("hedges_total", service=self.name, result="won")
+                        return task.result()
+            return first.result()
+        finally:
+            self.limit.release()
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+                # 진 쪽의 오류는 기록하지 않음
+                task.add_done_callback(lambda t: t.cancelled() or t.exception())
+
+    def stats(self) -> dict:
+        return {
+            "state": self.breaker.state,
+            "opened": self.breaker.opened,
+            "rejected": self.breaker.rejected,
+            "limit": int(self.limit),
+            "limit_min": self.limit.min_seen,
+            "decreases": self.limit.decreases,
+            "hedged": self.hedged,
+            "hedge_wins": self.hedge_wins,
+        }
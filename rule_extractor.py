@@ -0,0 +1,262 @@
+import re
+from datetime import date, timedelta
+
+# 이 값 이상이면 AI 에 다시 묻지 않는다
+CONFIDENCE_THRESHOLD = 0.8
+
+MONTHS = {
+    "jan": 1, "feb": 2, "mar": 3, "apr": 4, "may": 5, "jun": 6,
+    "jul": 7, "aug": 8, "sep": 9, "oct": 10, "nov": 11, "dec": 12,
+}
+
+# 2026-01-15 / 2026.01.15 / 2026/1/15
+ISO_DATE_RE = re.compile(r'(20\d{2})\s*[-./]\s*(\d{1,2})\s*[-./]\s*(\d{1,2})')
+# (2026년) 1월 15일
+KO_DATE_RE = re.compile(r'(?:(20\d{2})\s*년\s*)?(\d{1,2})\s*월\s*(\d{1,2})\s*일')
+# 실제 월 이름만 (Octopus, Decentralized 같은 단어의 앞부분은 월이 아님)
+MONTH = (
+    r'(jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|june?|july?|aug(?:ust)?'
+    r'|sep(?:t(?:ember)?)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?)\b'
+)
+# Jan 15 / January 15th (, 2026)
+EN_DATE_RE = re.compile(
+    r'\b' + MONTH + r'\.?\s+(\d{1,2})(?:st|nd|rd|th)?'
+    r'(?:,?\s*(20\d{2}))?\b',
+    re.IGNORECASE
+)
+# 15 Jan (2026)
+EN_DAY_FIRST_RE = re.compile(
+    r'\b(\d{1,2})(?:st|nd|rd|th)?\s+' + MONTH + r'\.?'
+    r'(?:,?\s*(20\d{2}))?\b',
+    re.IGNORECASE
+)
+# 1/15 ~ 1/30 (연도 없는 짧은 형식은 범위일 때만 인정)
+SLASH_RANGE_RE = re.compile(r'\b(\d{1,2})/(\d{1,2})\s*[~\-–]\s*(\d{1,2})/(\d{1,2})\b')
+
+DURATION_RE = re.compile(r'(\d{1,3})\s*(?:일간|일 동안|days?\b)', re.IGNORECASE)
+# 이벤트 기간을 말하는 기간 표현 (기간: 14일간 / 14일간 진행 / runs for 14 days)
+# "보상은 7일 안에 지급", "3 days left" 같은 다른 기간과 구분하기 위해 이 형태만 종료일 계산에 쓴다
+PERIOD_DURATION_RE = re.compile(
+    r'(?:(?:이벤트|진행|참여)?\s*기간|period|duration)\s*[:：]?\s*(?:약\s*)?(\d{1,3})\s*(?:일간|일 동안|일|days?\b)'
+    r'|(\d{1,3})\s*(?:일간|일 동안)\s*(?:진행|열립|개최)'
+    r'|\b(?:runs?|running|lasts?|lasting|live)\s+(?:for\s+)?(\d{1,3})\s*days?\b',
+    re.IGNORECASE
+)
+# 두 날짜 사이가 이것뿐이면 기간 범위 (1월 10일(토) ~ 1월 20일 / Jan 10 to Jan 20 / 10일 14:00부터)
+RANGE_SEP_RE = re.compile(
+    r'\s*(?:\([^)]{0,10}\)\s*)?(?:\d{1,2}:\d{2}(?:\s*[A-Za-z]{2,4})?\s*)?'
+    r'(?:[~\-–—]|to|until|till|through|부터)\s*$',
+    re.IGNORECASE
+)
+# 날짜가 시작일임을 나타내는 표현 (날짜 뒤 / 앞)
+START_AFTER_RE = re.compile(
+    r'\s*(?:\([^)]{0,10}\)\s*)?(?:\d{1,2}:\d{2}\s*)?(?:부터|(?:에\s*)?(?:시작|오픈|개시))', re.IGNORECASE
+)
+START_BEFORE_RE = re.compile(r'(?:\bstart(?:s|ing)?(?:\s+on)?|\bfrom|\bbegins?|시작일?)\s*[:：]?\s*$', re.IGNORECASE)
+# 이보다 긴 기간은 날짜를 잘못 짝지었을 가능성이 커서 신뢰하지 않음
+MAX_EVENT_DAYS = 180
+
+TOTAL_PRIZE_RE = re.compile(
+    r'(?:총\s*상금|총\s*보상|상금\s*총액|total\s*(?:prize|reward)s?(?:\s*pool)?|prize\s*pool|reward\s*pool)'
+    r'\s*[:：]?\s*([^\n]{1,60})',
+    re.IGNORECASE
+)
+AMOUNT_RE = re.compile(
+    r'(\$\s?[\d,]+(?:\.\d+)?(?:\s*[kKmM])?|[\d,]+(?:\.\d+)?\s*(?:[kKmM]\s*)?(?:\$[A-Za-z][A-Za-z0-9]{1,9}|USDT|USDC|USD|달러|만원|원)'
+    r'|[\d,]+(?:\.\d+)?\s*(?:만|천)?\s*원)'
+)
+RANK_PRIZE_RE = re.compile(
+    r'(\d{1,2})\s*(등|위|st|nd|rd|th)\s*(?:[:：\-–]|\s)\s*'
+    r'(\$?\s?[\d,]+(?:\.\d+)?\s*(?:\$?[A-Za-z][A-Za-z0-9]{1,9}|달러|만원|원)?)',
+    re.IGNORECASE
+)
+
+# 미션 링크 → 행동
+MISSION_LINKS = [
+    (re.compile(r'(?:x|twitter)\.com/', re.IGNORECASE), "트위터 팔로우"),
+    (re.compile(r't\.me/', re.IGNORECASE), "텔레그램 가입"),
+    (re.compile(r'discord\.(?:gg|com)/', re.IGNORECASE), "디스코드 가입"),
+    (re.compile(r'youtube\.com/|youtu\.be/', re.IGNORECASE), "유튜브 구독"),
+    (re.compile(r'galxe\.com/', re.IGNORECASE), "Galxe 퀘스트"),
+    (re.compile(r'zealy\.io/', re.IGNORECASE), "Zealy 퀘스트"),
+]
+MISSION_WORDS = [
+    (re.compile(r'리트윗|retweet|\brt\b', re.IGNORECASE), "리트윗"),
+    (re.compile(r'좋아요|\blike\b', re.IGNORECASE), "좋아요"),
+    (re.compile(r'댓글|comment', re.IGNORECASE), "댓글 작성"),
+    (re.compile(r'친구\s*초대|invite|referral|레퍼럴', re.IGNORECASE), "친구 초대"),
+    (re.compile(r'퀴즈|quiz', re.IGNORECASE), "퀴즈 참여"),
+]
+
+# 주소 (강남구 테헤란로 427 / 종로구 종로 1 / 강남구 역삼동 737)
+# 시/구/군 다음에 로/길/동 + 번지가 와야 주소로 봄 ("친구 5명", "공동 1위" 같은 문구 제외)
+# 번지 뒤에 명/회/위 같은 단위가 붙으면 인원/횟수로 봄 ("친구 초대로 5명")
+ADDRESS = r'[가-힣]+(?:시|구|군)\s+[가-힣\d]+(?:로|길|동|읍|면|리)\s*\d+(?:-\d+)?(?![\d,.]|\s*(?:명|회|위|개|건|일|등|%))'
+
+# 오프라인 행사장/주소 키워드
+OFFLINE_RE = re.compile(
+    r'오프라인|밋업|meetup|컨퍼런스|conference|summit|서밋|해커톤|hackathon|'
+    r'venue|장소\s*[:：]|주소\s*[:：]|코엑스|벡스코|킨텍스|호텔|hotel|컨벤션|convention|'
+    + ADDRESS,
+    re.IGNORECASE
+)
+
+
+def _valid_date(year: int, month: int, day: int):
+    try:
+        return date(year, month, day)
+    except ValueError:
+        return None
+
+
+def _infer_year(month: int, day: int, today: date):
+    """연도 없는 날짜는 가까운 미래/최근 날짜로 (반년 넘게 지났으면 내년)"""
+    found = _valid_date(today.year, month, day)
+    if found and found < today - timedelta(days=180):
+        found = _valid_date(today.year + 1, month, day)
+    return found
+
+
+def find_date_spans(text: str, today: date = None) -> list:
+    """본문에 나온 날짜를 등장 순서대로 (시작 위치, 끝 위치, date)"""
+    today = today or date.today()
+    found = []
+
+    for m in ISO_DATE_RE.finditer(text):
+        found.append((m.start(), m.end(), _valid_date(int(m[1]), int(m[2]), int(m[3]))))
+
+    for m in KO_DATE_RE.finditer(text):
+        if m[1]:
+            found.append((m.start(), m.end(), _valid_date(int(m[1]), int(m[2]), int(m[3]))))
+        else:
+            found.append((m.start(), m.end(), _infer_year(int(m[2]), int(m[3]), today)))
+
+    for m in EN_DATE_RE.finditer(text):
+        month, day = MONTHS[m[1][:3].lower()], int(m[2])
+        found.append((m.start(), m.end(),
+                      _valid_date(int(m[3]), month, day) if m[3] else _infer_year(month, day, today)))
+
+    for m in EN_DAY_FIRST_RE.finditer(text):
+        month, day = MONTHS[m[2][:3].lower()], int(m[1])
+        found.append((m.start(), m.end(),
+                      _valid_date(int(m[3]), month, day) if m[3] else _infer_year(month, day, today)))
+
+    for m in SLASH_RANGE_RE.finditer(text):
+        found.append((m.start(), m.end(2), _infer_year(int(m[1]), int(m[2]), today)))
+        found.append((m.start(3), m.end(), _infer_year(int(m[3]), int(m[4]), today)))
+
+    return [item for item in sorted(found, key=lambda item: item[0]) if item[2]]
+
+
+def find_dates(text: str, today: date = None) -> list:
+    """본문에 나온 날짜를 등장 순서대로"""
+    return [found for _, _, found in find_date_spans(text, today)]
+
+
+def find_range(text: str, spans: list):
+    """범위 구분자(~, -, to, 부터) 로 이어진 첫 (시작일, 종료일), 없으면 None"""
+    for (_, first_end, first), (second_start, _, second) in zip(spans, spans[1:]):
+        if RANGE_SEP_RE.match(text[first_end:second_start]) and second >= first:
+            return first, second
+    return None
+
+
+def find_start(text: str, spans: list):
+    """시작일로 표시된 날짜 (1월 15일 시작 / starts Jan 15), 없으면 None"""
+    for pos, end, found in spans:
+        if START_AFTER_RE.match(text, end) or START_BEFORE_RE.search(text[max(0, pos - 20):pos]):
+            return found
+    return None
+
+
+def extract_fields(text: str, today: date = None):
+    """정형화된 필드를 정규식으로 추출
+
+    (값 dict, 신뢰도 dict) 반환. 신뢰도가 CONFIDENCE_THRESHOLD 미만이거나
+    빠진 필드만 AI 에 묻는다.
+    """
+    text = text or ""
+    values = {}
+    confidence = {}
+
+    # 기간 표현: 이벤트 기간으로 명시된 것만 종료일 계산에 쓰고, 나머지 "N일" 은 참고값
+    period_match = PERIOD_DURATION_RE.search(text)
+    period = int(next(g for g in period_match.groups() if g)) if period_match else None
+    duration_match = DURATION_RE.search(text)
+    duration = period or (int(duration_match[1]) if duration_match else None)
+
+    # 날짜: 범위(1월 10일 ~ 1월 20일) > 시작일 + 명시된 기간 > 처음 두 날짜 순으로 판단.
+    # 공지일/발표일/지급일이 섞여 있을 수 있어서 범위나 기간이 없으면 낮은 신뢰도로 AI 에 다시 묻는다
+    spans = find_date_spans(text, today)
+    found_range = find_range(text, spans)
+    marked_start = find_start(text, spans)
+    sure = False
+
+    if found_range:
+        start, end = found_range
+        sure = True
+    elif period and spans:
+        start = marked_start or spans[0][2]
+        end = start + timedelta(days=period)
+        sure = marked_start is not None
+    else:
+        start = spans[0][2] if spans else None
+        end = next((d for _, _, d in spans[1:] if d >= start), None) if start else None
+
+    # 종료일은 시작일 이후이고 기간이 상식적인 범위일 때만 신뢰
+    sure = sure and 0 <= (end - start).days <= MAX_EVENT_DAYS
+
+    if start:
+        values["start_date"] = start.isoformat()
+        # 범위나 기간 없이 날짜만 있으면 공지일일 수도 있어서 낮은 신뢰도
+        confidence["start_date"] = 0.9 if sure else 0.6
+
+    if end:
+        values["end_date"] = end.isoformat()
+        values["duration_days"] = (end - start).days
+        confidence["end_date"] = 0.9 if sure else 0.5
+        # 기간이 명시돼 있으면 시작일이 불확실해도 일수는 확실
+        confidence["duration_days"] = 0.9 if sure or period == values["duration_days"] else 0.5
+    elif duration:
+        values["duration_days"] = duration
+        confidence["duration_days"] = 0.7 if period else 0.5
+
+    # 상금
+    total_match = TOTAL_PRIZE_RE.search(text)
+    if total_match and AMOUNT_RE.search(total_match[1]):
+        values["total_prize"] = total_match[1].strip(" :：-")
+        confidence["total_prize"] = 0.9
+
+    ranks = [
+        f"{m[1]}{m[2]} {' '.join(m[3].split())}"
+        for m in RANK_PRIZE_RE.finditer(text)
+        if re.search(r'\d{2,}', m[3])
+    ]
+    if ranks:
+        values["prize_per_round"] = ", ".join(dict.fromkeys(ranks))
+        confidence["prize_per_round"] = 0.85
+        if "total_prize" not in values:
+            values["total_prize"] = "총 상금 통일"
+            confidence["total_prize"] = 0.6
+
+    # 미션 (링크/키워드 기반, 문장 요약은 AI 가 더 잘 하므로 낮은 신뢰도)
+    missions = [action for pattern, action in MISSION_LINKS + MISSION_WORDS if pattern.search(text)]
+    if missions:
+        values["mission_content"] = ", ".join(dict.fromkeys(missions))
+        confidence["mission_content"] = 0.6
+
+    # 장소
+    if OFFLINE_RE.search(text):
+        values["location"] = "오프라인"
+        confidence["location"] = 0.9
+    else:
+        # 목록에 없는 행사장일 수 있어서 AI 에 한 번 더 확인
+        values["location"] = "온라인"
+        confidence["location"] = 0.7
+
+    return values, confidence
+
+
+def confident_fields(confidence: dict, threshold: float = CONFIDENCE_THRESHOLD) -> set:
+    """AI 에 다시 묻지 않아도 되는 필드"""
+    return {field for field, score in confidence.items() if score >= threshold}
@@ -0,0 +1,360 @@
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import resilience
+from resilience import FAILURE, OVERLOAD, AdaptiveLimit, Backend, CircuitBreaker, CircuitOpen, classify
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class Clock:
+    """time.monotonic 대신 쓰는 수동 시계"""
+
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class Status(Exception):
+    """status 속성이 있는 HTTP 오류 흉내"""
+
+    def __init__(self, status: int):
+        super().__init__(f"HTTP {status}")
+        self.status = status
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(resilience.time, "monotonic", clock)
+    return clock
+
+
+def hedging_backend(latency: float) -> Backend:
+    """최근 응답 시간이 latency 로 채워져 hedge 가 켜진 백엔드"""
+    backend = Backend("test", 4, hedge_quantile=0.95, hedge_min_samples=5)
+    backend.latencies.extend([latency] * 5)
+    return backend
+
+
+# --- 차단기 ---
+
+def test_breaker_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker("test", failures=3, reset=10.0)
+
+    for _ in range(2):
+        breaker.check()
+        breaker.failure()
+    assert breaker.state == "closed"
+
+    breaker.check()
+    breaker.failure()
+    assert breaker.state == "open"
+    assert breaker.opened == 1
+
+    with pytest.raises(CircuitOpen) as rejected:
+        breaker.check()
+    assert rejected.value.retry_in == pytest.approx(10.0)
+    assert breaker.rejected == 1
+
+
+def test_breaker_success_resets_failure_count(clock):
+    breaker = CircuitBreaker("test", failures=3, reset=10.0)
+
+    for _ in range(2):
+        breaker.failure()
+    breaker.success()
+    for _ in range(2):
+        breaker.failure()
+
+    assert breaker.state == "closed"
+
+
+def test_breaker_half_open_lets_one_probe_through_then_closes(clock):
+    breaker = CircuitBreaker("test", failures=1, reset=10.0)
+    breaker.failure()
+    assert breaker.is_open()
+
+    clock.now += 10.0
+    breaker.check()
+    assert breaker.state == "half_open"
+    # 확인 요청이 끝날 때까지 나머지는 차단
+    with pytest.raises(CircuitOpen):
+        breaker.check()
+
+    breaker.success()
+    assert breaker.state == "closed"
+    assert not breaker.is_open()
+    breaker.check()
+
+
+def test_breaker_failed_probe_reopens(clock):
+    breaker = CircuitBreaker("test", failures=1, reset=10.0)
+    breaker.failure()
+
+    clock.now += 10.0
+    breaker.check()
+    breaker.failure()
+
+    assert breaker.state == "open"
+    assert breaker.opened == 2
+    assert breaker.retry_in() == pytest.approx(10.0)
+
+
+def test_backend_stops_calling_after_breaker_opens():
+    backend = Backend("test", 4, failures=2, reset=60.0)
+    calls = []
+
+    async def timeout():
+        calls.append(1)
+        raise asyncio.TimeoutError()
+
+    async def run():
+        for _ in range(2):
+            with pytest.raises(asyncio.TimeoutError):
+                await backend.call(timeout)
+        with pytest.raises(CircuitOpen):
+            await backend.call(timeout)
+
+    asyncio.run(run())
+    assert len(calls) == 2
+    assert backend.breaker.state == "open"
+
+
+# --- AIMD 동시 요청 한도 ---
+
+def test_classify_overload_and_failure():
+    assert classify(Status(429)) == OVERLOAD
+    assert classify(Status(503)) == FAILURE
+    assert classify(asyncio.TimeoutError()) == FAILURE
+    assert classify(Status(400)) is None
+    assert classify(ValueError()) is None
+
+
+def test_limit_halves_on_429_and_timeout(clock):
+    limit = AdaptiveLimit("test", 8)
+
+    limit.record(0.1, OVERLOAD)
+    assert int(limit) == 4
+
+    # 줄인 직후의 오류는 같은 원인으로 보고 다시 줄이지 않음
+    limit.record(0.1, FAILURE)
+    assert int(limit) == 4
+
+    clock.now += 2.0
+    limit.record(0.1, classify(asyncio.TimeoutError()))
+    assert int(limit) == 2
+    assert limit.decreases == 2
+    assert limit.min_seen == 2
+
+
+def test_limit_does_not_go_below_minimum(clock):
+    limit = AdaptiveLimit("test", 2, min_limit=1)
+    for _ in range(5):
+        clock.now += 2.0
+        limit.record(0.1, FAILURE)
+    assert int(limit) == 1
+
+
+def test_limit_grows_additively_on_success(clock):
+    limit = AdaptiveLimit("test", 8)
+    limit.record(0.1, OVERLOAD)
+    clock.now += 2.0
+    limit.record(0.1, OVERLOAD)
+    assert int(limit) == 2
+
+    # 성공마다 1/한도 씩 (2 → 2.5 → 2.9 → 3.24 → ... → 4.09)
+    for _ in range(3):
+        limit.record(0.1)
+    assert int(limit) == 3
+    for _ in range(3):
+        limit.record(0.1)
+    assert int(limit) == 4
+
+    for _ in range(100):
+        limit.record(0.1)
+    assert int(limit) == 8
+
+
+def test_limit_shrinks_when_latency_rises(clock):
+    limit = AdaptiveLimit("test", 8, latency_ratio=2.0)
+    for _ in range(20):
+        limit.record(0.1)
+
+    clock.now += 2.0
+    for _ in range(3):
+        limit.record(1.0)
+
+    assert int(limit) < 8
+
+
+def test_backend_timeouts_shrink_limit_and_429_keeps_breaker_closed():
+    backend = Backend("test", 8, failures=5)
+
+    async def overloaded():
+        raise Status(429)
+
+    async def run():
+        with pytest.raises(Status):
+            await backend.call(overloaded)
+
+    asyncio.run(run())
+    assert int(backend.limit) == 4
+    assert backend.breaker.state == "closed"
+    assert backend.breaker.consecutive == 0
+
+
+# --- hedge ---
+
+def test_hedge_fires_after_delay_and_cancels_loser():
+    backend = hedging_backend(0.05)
+    started, cancelled = [], []
+
+    async def fetch():
+        attempt = len(started)
+        started.append(time.monotonic())
+        try:
+            await asyncio.sleep(1.0 if attempt == 0 else 0.01)
+        except asyncio.CancelledError:
+            cancelled.append(attempt)
+            raise
+        return attempt
+
+    async def run():
+        result = await backend.call(fetch, hedge=True)
+        # 취소가 전달될 때까지 한 번 양보
+        await asyncio.sleep(0.01)
+        return result
+
+    began = time.monotonic()
+    assert asyncio.run(run()) == 1
+    elapsed = time.monotonic() - began
+
+    assert len(started) == 2
+    assert started[1] - started[0] >= 0.05
+    assert elapsed < 0.5
+    assert cancelled == [0]
+    assert backend.hedged == 1
+    assert backend.hedge_wins == 1
+    assert backend.limit.inflight == 0
+
+
+def test_no_hedge_when_response_arrives_before_delay():
+    backend = hedging_backend(0.2)
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.02)
+        return "ok"
+
+    assert asyncio.run(backend.call(fetch, hedge=True)) == "ok"
+    assert len(calls) == 1
+    assert backend.hedged == 0
+
+
+def test_no_hedge_without_latency_samples():
+    backend = Backend("test", 4, hedge_min_samples=20)
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "ok"
+
+    assert asyncio.run(backend.call(fetch, hedge=True)) == "ok"
+    assert len(calls) == 1
+
+
+def test_streamed_completion_is_not_hedged(monkeypatch, tmp_path):
+    """LLM_STREAM 으로 받는 응답은 느려도 한 번만 요청, 단건 응답은 hedge"""
+    monkeypatch.setenv("EVENT_DB_PATH", str(tmp_path / "events.db"))
+    for name in ("TELEGRAM_BOT_TOKEN", "OPENAI_API_KEY", "NOTION_API_KEY", "NOTION_DATABASE_ID"):
+        monkeypatch.setenv(name, "test")
+    import main
+
+    calls = []
+
+    def chunk(content):
+        return SimpleNamespace(usage=None, choices=[SimpleNamespace(delta=SimpleNamespace(content=content))])
+
+    class Stream:
+        def __init__(self):
+            self.parts = ['{"event_title": ', '"Test"}']
+
+        def __aiter__(self):
+            return self
+
+        async def __anext__(self):
+            await asyncio.sleep(0.1)
+            if not self.parts:
+                raise StopAsyncIteration
+            return chunk(self.parts.pop(0))
+
+        async def close(self):
+            pass
+
+    async def create(**request):
+        calls.append(request.get("stream", False))
+        if request.get("stream"):
+            return Stream()
+        await asyncio.sleep(1.0 if len(calls) == 2 else 0.01)
+        message = SimpleNamespace(content='{"event_title": "Test"}')
+        return SimpleNamespace(usage=None, choices=[SimpleNamespace(message=message)])
+
+    client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    monkeypatch.setattr(main.clients, "openai_async", lambda: client)
+    monkeypatch.setattr(main, "LLM_STREAM", True)
+    monkeypatch.setattr(main, "openai_backend", hedging_backend(0.02))
+
+    fields = []
+
+    async def run():
+        streamed = await main.complete("prompt", 50, on_field=lambda *found: fields.append(found))
+        plain = await main.complete("prompt", 50)
+        return streamed, plain
+
+    streamed, plain = asyncio.run(run())
+
+    assert streamed == '{"event_title": "Test"}'
+    assert fields and fields[0][1:] == ("event_title", "Test")
+    # 스트리밍 1번 + 단건 응답 (느린 첫 요청 + hedge)
+    assert calls == [True, False, False]
+    assert plain == '{"event_title": "Test"}'
+    assert main.openai_backend.hedged == 1
+
+
+# --- 장애 시나리오 (bench 의 가짜 백엔드) ---
+
+def test_outage_defers_jobs_instead_of_dropping_them():
+    """OpenAI 가 503 만 돌려주는 동안 작업은 재시도 횟수를 쓰지 않고 보류됐다가 모두 처리됨"""
+    messages = 12
+    env = dict(os.environ, BATCH_MAX_SIZE="1", BREAKER_FAILURES="3", BREAKER_RESET_SECONDS="2",
+               OPENAI_RETRIES="2")
+    # main 의 asyncio 객체가 이벤트 루프에 묶이므로 별도 프로세스로 실행
+    result = subprocess.run(
+        [sys.executable, "bench.py", "e2e", "--messages", str(messages),
+         "--openai-outage", "0:15", "--outage-latency", "0.2", "--timeout", "120"],
+        cwd=ROOT, env=env, capture_output=True, text=True, timeout=300
+    )
+    assert result.returncode == 0, result.stderr[-2000:]
+    report = json.loads(result.stdout)
+
+    assert report["injected"]["openai_503"] > 0
+    assert report["resilience"]["openai"]["opened"] >= 1
+    assert report["resilience"]["openai"]["state"] == "closed"
+    assert report["results"].get("deferred", 0) >= 1
+    assert report["statuses"] == {"done": messages}
+    assert report["results"].get("saved") == messages
+    assert "dead" not in report["results"]
+    # 차단 중에는 요청하지 않음 (메시지마다 재시도 한도까지 보내지 않음)
+    assert report["injected"]["openai_503"] < messages * 3
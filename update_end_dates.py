@@ -1,120 +1,140 @@
 import os
-from datetime import datetime, timedelta
+import argparse
+from datetime import timedelta
 from dotenv import load_dotenv
-from notion_client import Client
+
+import clients
+import event_model
+from event_store import EventStore
+from notion_bulk import BulkRunner, Checkpoint, TokenBucket, iter_pages
 
 # 환경 변수 로드
 load_dotenv()
 
 NOTION_API_KEY = os.getenv('NOTION_API_KEY')
 NOTION_DB_ID = os.getenv('NOTION_DATABASE_ID')
+EVENT_DB_PATH = os.getenv('EVENT_DB_PATH', 'events.db')
+RECONCILE_SECONDS = int(os.getenv('RECONCILE_SECONDS', '3600'))
+
+# Notion 요청 제한 (초당 요청 수)과 동시 작업자 수
+NOTION_RATE_LIMIT = float(os.getenv('NOTION_RATE_LIMIT', '3'))
+NOTION_WORKERS = int(os.getenv('NOTION_WORKERS', '3'))
+
+# 중단 후 이어서 실행하기 위한 체크포인트 파일
+CHECKPOINT_PATH = '.end_dates.checkpoint.json'
+
+
+def get_title(event) -> str:
+    """이벤트 제목 가져오기"""
+    return event.event_title or "제목 없음"
+
+
+def plan_end_date(page: dict):
+    """페이지 하나의 '이벤트 시작일' 변경 내용 계산 (건너뛸 페이지면 None)"""
+    event = event_model.from_page(page)
+    event_title = get_title(event)
+
+    # 이미 end가 설정되어 있는지 확인
+    if event.end_date:
+        print(f"⏭️  [{event_title[:30]}] - 이미 종료일 통합됨, 건너뜀")
+        return None
 
-notion = Client(auth=NOTION_API_KEY)
+    if not event.start_date:
+        print(f"⚠️  [{event_title[:30]}] - 시작일 없음, 건너뜀")
+        return None
 
+    # 종료일 가져오기 (별도 필드에서, 시각이 있으면 그대로), 없으면 진행 기간으로 계산
+    properties = page.get('properties', {})
+    start = properties['이벤트 시작일']['date']
+    legacy_end = (properties.get('이벤트 종료일') or {}).get('date') or {}
+    end = legacy_end.get('start')
+    if not end and event.duration_days:
+        try:
+            # 시작일에 시각이 있으면 같은 시각/오프셋을 붙임
+            end = (event.start_date + timedelta(days=int(event.duration_days))).isoformat() + start['start'][10:]
+        except (ValueError, OverflowError) as e:
+            print(f"⚠️  [{event_title[:30]}] - 종료일 계산 실패: {e}")
 
-def update_end_dates():
+    if not end:
+        print(f"⏭️  [{event_title[:30]}] - 종료일 없음, 건너뜀")
+        return None
+
+    # 이벤트 시작일에 end 만 추가 (Notion 의 start 문자열과 시각/시간대는 그대로 유지,
+    # Event 의 date 로 다시 쓰면 시각이 사라지고 start 와 같은 end 는 빠짐)
+    date_range = dict(start, end=end)
+    return {'이벤트 시작일': {'date': date_range}}
+
+
+def update_end_dates(dry_run: bool = False, checkpoint_path: str = CHECKPOINT_PATH, fresh: bool = False):
     """기존 Notion 데이터베이스의 이벤트 시작일을 start/end 통합 형식으로 변환"""
 
-    print("🔄 Notion 데이터베이스에서 데이터 가져오는 중...")
-
-    # 모든 페이지 가져오기
-    results = notion.databases.query(database_id=NOTION_DB_ID)
-    pages = results.get('results', [])
-
-    print(f"📊 총 {len(pages)}개의 이벤트를 찾았습니다.\n")
-
-    updated_count = 0
-    skipped_count = 0
-    error_count = 0
-
-    for page in pages:
-        page_id = page['id']
-        properties = page.get('properties', {})
-
-        # 이벤트 제목 가져오기
-        event_title = "제목 없음"
-        if '이벤트 제목' in properties:
-            title_data = properties['이벤트 제목'].get('title', [])
-            if title_data and len(title_data) > 0:
-                event_title = title_data[0].get('text', {}).get('content', '제목 없음')
-
-        # 시작일 가져오기
-        start_date = None
-        has_end_in_start = False
-        if '이벤트 시작일' in properties:
-            date_obj = properties['이벤트 시작일'].get('date')
-            if date_obj:
-                start_date = date_obj.get('start')
-                # 이미 end가 설정되어 있는지 확인
-                if date_obj.get('end'):
-                    has_end_in_start = True
-
-        if has_end_in_start:
-            print(f"⏭️  [{event_title[:30]}] - 이미 종료일 통합됨, 건너뜀")
-            skipped_count += 1
-            continue
-
-        # 종료일 가져오기 (별도 필드에서)
-        end_date = None
-        if '이벤트 종료일' in properties:
-            end_date_obj = properties['이벤트 종료일'].get('date')
-            if end_date_obj:
-                end_date = end_date_obj.get('start')
-
-        # 종료일이 없으면 진행 기간으로 계산
-        if not end_date and start_date:
-            duration_days = None
-            if '이벤트 진행 기간' in properties:
-                duration_days = properties['이벤트 진행 기간'].get('number')
-
-            if duration_days:
-                try:
-                    start_dt = datetime.strptime(start_date, "%Y-%m-%d")
-                    end_dt = start_dt + timedelta(days=int(duration_days))
-                    end_date = end_dt.strftime("%Y-%m-%d")
-                except Exception as e:
-                    print(f"⚠️  [{event_title[:30]}] - 종료일 계산 실패: {e}")
-
-        # 이벤트 시작일에 start/end 통합
-        if start_date:
-            try:
-                date_property = {"start": start_date}
-
-                if end_date and end_date != start_date:
-                    date_property["end"] = end_date
-                    print(f"✅ [{event_title[:30]}] - 날짜 통합: {start_date} → {end_date}")
-                else:
-                    print(f"✅ [{event_title[:30]}] - 단일 날짜: {start_date}")
-
-                # Notion 업데이트
-                notion.pages.update(
-                    page_id=page_id,
-                    properties={
-                        "이벤트 시작일": {
-                            "date": date_property
-                        }
-                    }
-                )
-
-                updated_count += 1
-
-            except Exception as e:
-                print(f"❌ [{event_title[:30]}] - 오류: {e}")
-                error_count += 1
-        else:
-            print(f"⚠️  [{event_title[:30]}] - 시작일 없음, 건너뜀")
-            skipped_count += 1
+    print("🔄 Notion 변경분을 로컬 저장소에 동기화하는 중...")
+
+    # 변경분만 페이지네이션으로 받아오고, 전체 목록은 로컬 저장소에서 읽기
+    notion = clients.notion_sync()
+    bucket = TokenBucket(NOTION_RATE_LIMIT)
+    store = EventStore(EVENT_DB_PATH)
+    changed = store.sync_blocking(
+        iter_pages(notion, NOTION_DB_ID, bucket=bucket, **store.sync_query())
+    )
+    print(f"   동기화: {changed}건 변경")
+    if store.reconcile_due(RECONCILE_SECONDS):
+        # 삭제된 페이지는 변경분 조회에 나오지 않으므로 가끔 전체 ID 와 비교
+        removed = store.reconcile_blocking(
+            iter_pages(notion, NOTION_DB_ID, bucket=bucket, **store.reconcile_query())
+        )
+        print(f"   삭제 확인: {len(removed)}건 삭제")
+    total = len(store)
+
+    print(f"📊 총 {total}개의 이벤트를 찾았습니다.\n")
+
+    # 중단된 작업이면 처리 완료한 페이지는 건너뛰고 이어서 실행
+    checkpoint = Checkpoint(checkpoint_path)
+    if fresh:
+        checkpoint.clear()
+    elif checkpoint.processed:
+        print(f"♻️  체크포인트에서 이어서 실행: {len(checkpoint.processed)}건 처리됨\n")
+
+    if dry_run:
+        print("🔍 dry-run: 변경 내용만 출력하고 Notion 에는 쓰지 않습니다.\n")
+
+    runner = BulkRunner(notion, bucket=bucket, workers=NOTION_WORKERS)
+    counts = runner.run(
+        store.pages(),
+        plan_end_date,
+        on_updated=store.upsert_page,
+        label=lambda page: get_title(event_model.from_page(page))[:30],
+        checkpoint=checkpoint,
+        dry_run=dry_run,
+        total=total
+    )
+
+    store.close()
+    print(f"🔌 API 응답 시간: {clients.latency_stats()}")
+    clients.close()
+
+    # 오류 없이 끝나면 체크포인트 삭제 (오류 페이지는 다음 실행에서 재시도)
+    if not dry_run and counts['error'] == 0:
+        checkpoint.clear()
 
     print(f"\n{'='*60}")
     print(f"📊 작업 완료!")
-    print(f"   ✅ 업데이트됨: {updated_count}개")
-    print(f"   ⏭️  건너뜀: {skipped_count}개")
-    print(f"   ❌ 오류: {error_count}개")
+    print(f"   ✅ {'변경 예정' if dry_run else '업데이트됨'}: {counts['updated']}개")
+    print(f"   🟰 변경 없음: {counts['unchanged']}개")
+    print(f"   ⏭️  건너뜀: {counts['skipped']}개")
+    print(f"   ♻️  이전 실행에서 처리됨: {counts['resumed']}개")
+    print(f"   ❌ 오류: {counts['error']}개")
     print(f"{'='*60}")
     print(f"\n💡 이제 Notion에서 '이벤트 종료일' 열을 삭제해도 됩니다.")
 
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="이벤트 시작일 start/end 통합")
+    parser.add_argument('--dry-run', action='store_true', help="변경 내용만 출력하고 Notion 에 쓰지 않음")
+    parser.add_argument('--fresh', action='store_true', help="체크포인트를 무시하고 처음부터 실행")
+    parser.add_argument('--checkpoint', default=CHECKPOINT_PATH, help="체크포인트 파일 경로")
+    args = parser.parse_args()
+
     print("="*60)
     print("🚀 Notion 이벤트 날짜 통합 스크립트 (v3.2)")
     print("="*60)
@@ -127,9 +147,12 @@ if __name__ == '__main__':
     print("⚠️  실행 후 '이벤트 종료일' 열은 수동으로 삭제하셔야 합니다.")
     print()
 
-    confirm = input("계속 진행하시겠습니까? (y/n): ")
-
-    if confirm.lower() == 'y':
-        update_end_dates()
+    if args.dry_run:
+        update_end_dates(dry_run=True, checkpoint_path=args.checkpoint)
     else:
-        print("❌ 작업이 취소되었습니다.")
+        confirm = input("계속 진행하시겠습니까? (y/n): ")
+
+        if confirm.lower() == 'y':
+            update_end_dates(checkpoint_path=args.checkpoint, fresh=args.fresh)
+        else:
+            print("❌ 작업이 취소되었습니다.")
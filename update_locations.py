@@ -1,17 +1,51 @@
 import os
+import re
+import json
+import argparse
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
-from notion_client import Client
-from openai import OpenAI
+
+import clients
+import event_model
+from event_store import EventStore
+from notion_bulk import BulkRunner, Checkpoint, TokenBucket, iter_pages
+from rule_extractor import ADDRESS
 
 # 환경 변수 로드
 load_dotenv()
 
 NOTION_API_KEY = os.getenv('NOTION_API_KEY')
 NOTION_DB_ID = os.getenv('NOTION_DATABASE_ID')
+EVENT_DB_PATH = os.getenv('EVENT_DB_PATH', 'events.db')
+RECONCILE_SECONDS = int(os.getenv('RECONCILE_SECONDS', '3600'))
 OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
 
-notion = Client(auth=NOTION_API_KEY)
-openai_client = OpenAI(api_key=OPENAI_API_KEY)
+# Notion 요청 제한 (초당 요청 수)과 동시 작업자 수
+NOTION_RATE_LIMIT = float(os.getenv('NOTION_RATE_LIMIT', '3'))
+NOTION_WORKERS = int(os.getenv('NOTION_WORKERS', '3'))
+
+# 장소 분류 묶음 크기와 동시 OpenAI 요청 수
+LOCATION_BATCH_SIZE = int(os.getenv('LOCATION_BATCH_SIZE', '20'))
+OPENAI_CONCURRENCY = int(os.getenv('OPENAI_CONCURRENCY', '4'))
+
+# 규칙 기반 사전 분류 키워드 (오프라인 장소/행사장/주소, 온라인 전용 미션)
+# '서울' 같은 도시명은 '서울 시간 기준' 처럼 온라인 공지에도 흔해서 제외
+# 주소는 rule_extractor.ADDRESS (시/구 + 도로명 + 번지) 만 인정, 애매한 문구는 AI 묶음 분류에 맡김
+OFFLINE_PATTERN = re.compile(
+    r'오프라인|밋업|meetup|컨퍼런스|conference|summit|서밋|해커톤|hackathon|'
+    r'주소|현장|장소\s*:|venue|호텔|hotel|컨벤션|convention|'
+    r'코엑스|벡스코|킨텍스|tokyo|도쿄|singapore|싱가포르|'
+    r'dubai|두바이|hong\s*kong|홍콩|bangkok|방콕|' + ADDRESS,
+    re.IGNORECASE
+)
+ONLINE_PATTERN = re.compile(
+    r'트위터|twitter|\bx\b|리트윗|retweet|팔로우|follow|텔레그램|telegram|디스코드|discord|'
+    r'유튜브|youtube|좋아요|댓글|퀴즈|quiz|\bama\b|갤럭시|galxe|zealy|지갑 연결|wallet',
+    re.IGNORECASE
+)
+
+# 중단 후 이어서 실행하기 위한 체크포인트 파일
+CHECKPOINT_PATH = '.locations.checkpoint.json'
 
 
 def analyze_location(event_title: str, mission_content: str) -> str:
@@ -30,7 +64,7 @@ def analyze_location(event_title: str, mission_content: str) -> str:
 "온라인" 또는 "오프라인" 중 하나만 응답하세요."""
 
     try:
-        response = openai_client.chat.completions.create(
+        response = clients.openai_sync().chat.completions.create(
             model="gpt-4o-mini",
             messages=[{"role": "user", "content": prompt}],
             temperature=0.3,
@@ -50,90 +84,213 @@ def analyze_location(event_title: str, mission_content: str) -> str:
         return "온라인"
 
 
-def update_locations():
-    """기존 Notion 데이터베이스의 모든 항목에 장소 정보 추가"""
+def classify_location_rules(event_title: str, mission_content: str):
+    """키워드로 확실한 경우만 장소 판단 (애매하면 None → AI 분류)"""
+    text = f"{event_title} {mission_content}"
+
+    if OFFLINE_PATTERN.search(text):
+        return "오프라인"
+    if ONLINE_PATTERN.search(text):
+        return "온라인"
+    return None
+
+
+def analyze_locations_batch(items: list) -> list:
+    """여러 이벤트의 장소를 한 번의 요청으로 구분 (번호 목록 → 번호를 붙인 JSON)
 
-    print("🔄 Notion 데이터베이스에서 데이터 가져오는 중...")
+    items: [(이벤트 제목, 미션 내용), ...]
+    결과는 응답의 index 로 짝지어, 모델이 항목을 빠뜨리거나 합쳐도 옆 항목의 값이
+    밀려 들어가지 않는다. 응답에 빠진 항목은 None
+    """
+    numbered = "\n".join(
+        f"{i}. 이벤트 제목: {title} / 미션 내용: {mission}"
+        for i, (title, mission) in enumerate(items, 1)
+    )
 
-    # 모든 페이지 가져오기
-    results = notion.databases.query(database_id=NOTION_DB_ID)
-    pages = results.get('results', [])
+    prompt = f"""다음 {len(items)}개 이벤트 각각이 온라인/오프라인 이벤트인지 판단하세요.
 
-    print(f"📊 총 {len(pages)}개의 이벤트를 찾았습니다.\n")
+{numbered}
+
+규칙:
+- 특정 오프라인 장소나 주소가 명시되어 있으면 "오프라인"
+- 온라인에서만 진행되는 이벤트면 "온라인"
+- 판단이 애매하면 기본값 "온라인"
 
-    updated_count = 0
-    skipped_count = 0
-    error_count = 0
+각 이벤트의 번호를 index 에, "온라인" 또는 "오프라인" 을 location 에 넣어
+{{"events": [{{"index": 1, "location": "온라인"}}, ...]}} 형식의 JSON 으로 응답하세요."""
+
+    response = clients.openai_sync().chat.completions.create(
+        model="gpt-4o-mini",
+        messages=[{"role": "user", "content": prompt}],
+        temperature=0.3,
+        max_tokens=20 * len(items) + 20,
+        response_format=event_model.response_format(["location"], batch=True)
+    )
+
+    result = response.choices[0].message.content.strip()
+    if '```' in result:
+        result = result.split('```')[1].removeprefix('json')
+
+    by_index = {}
+    for item in json.loads(result).get('events') or []:
+        if isinstance(item, dict) and str(item.get('index', '')).isdigit():
+            by_index[int(item['index'])] = "오프라인" if "오프라인" in str(item.get('location')) else "온라인"
+    return [by_index.get(i) for i in range(1, len(items) + 1)]
+
+
+def classify_locations(pages: list) -> dict:
+    """장소가 필요한 페이지 분류 (규칙 → AI 묶음 요청 병렬 실행)
+
+    {page_id: 장소} 반환, AI 분류에 실패한 페이지는 빠진다.
+    """
+    locations = {}
+    remaining = []
 
     for page in pages:
-        page_id = page['id']
-        properties = page.get('properties', {})
-
-        # 이벤트 제목 가져오기
-        event_title = "제목 없음"
-        if '이벤트 제목' in properties:
-            title_data = properties['이벤트 제목'].get('title', [])
-            if title_data and len(title_data) > 0:
-                event_title = title_data[0].get('text', {}).get('content', '제목 없음')
-
-        # 이미 장소가 있는지 확인
-        has_location = False
-        if '장소' in properties:
-            location_data = properties['장소'].get('select')
-            if location_data and location_data.get('name'):
-                has_location = True
-
-        if has_location:
-            print(f"⏭️  [{event_title[:30]}] - 이미 장소 정보 존재, 건너뜀")
-            skipped_count += 1
-            continue
-
-        # 미션 내용 가져오기
-        mission_content = ""
-        if '미션 내용' in properties:
-            mission_data = properties['미션 내용'].get('rich_text', [])
-            if mission_data and len(mission_data) > 0:
-                mission_content = mission_data[0].get('text', {}).get('content', '')
-
-        # AI로 장소 판단
-        try:
-            location = analyze_location(event_title, mission_content)
-
-            # Notion 업데이트
-            notion.pages.update(
-                page_id=page_id,
-                properties={
-                    "장소": {
-                        "select": {"name": location}
-                    }
-                }
-            )
-
-            emoji = "🌐" if location == "온라인" else "📍"
-            print(f"✅ [{event_title[:30]}] - {emoji} {location}")
-            updated_count += 1
+        event = event_model.from_page(page)
+        title, mission = get_title(event), event.mission_content or ""
+        location = classify_location_rules(title, mission)
+        if location:
+            locations[page['id']] = location
+        else:
+            remaining.append((page['id'], (title, mission)))
+
+    print(f"⚡ 규칙 기반 분류: {len(locations)}건, AI 분류 대상: {len(remaining)}건")
+
+    chunks = [remaining[i:i + LOCATION_BATCH_SIZE] for i in range(0, len(remaining), LOCATION_BATCH_SIZE)]
 
+    def run(chunk):
+        try:
+            results = analyze_locations_batch([item for _, item in chunk])
+            # 응답에서 빠진 항목만 단건 요청으로 보충
+            return chunk, [
+                location or analyze_location(*item)
+                for location, (_, item) in zip(results, chunk)
+            ]
         except Exception as e:
-            print(f"❌ [{event_title[:30]}] - 오류: {e}")
-            error_count += 1
+            print(f"❌ AI 묶음 분류 실패 ({len(chunk)}건): {e}")
+            return chunk, [None] * len(chunk)
+
+    with ThreadPoolExecutor(max_workers=OPENAI_CONCURRENCY) as pool:
+        for chunk, results in pool.map(run, chunks):
+            for (page_id, _), location in zip(chunk, results):
+                if location:
+                    locations[page_id] = location
+
+    return locations
+
+
+def get_title(event) -> str:
+    """이벤트 제목 가져오기"""
+    return event.event_title or "제목 없음"
+
+
+def has_location(page: dict) -> bool:
+    """이미 장소가 있는지 확인"""
+    return bool(event_model.from_page(page).location)
+
+
+def plan_location(page: dict, locations: dict):
+    """페이지 하나의 '장소' 변경 내용 계산 (건너뛸 페이지면 None)"""
+    event = event_model.from_page(page)
+    event_title = get_title(event)
+
+    if event.location:
+        print(f"⏭️  [{event_title[:30]}] - 이미 장소 정보 존재, 건너뜀")
+        return None
+
+    # 분류 실패 페이지는 오류로 남겨 다음 실행에서 다시 시도
+    event.location = locations.get(page['id'])
+    if event.location is None:
+        raise RuntimeError("장소 분류 실패")
+
+    return event_model.to_properties(event, names=['장소'])
+
+
+def update_locations(dry_run: bool = False, checkpoint_path: str = CHECKPOINT_PATH, fresh: bool = False):
+    """기존 Notion 데이터베이스의 모든 항목에 장소 정보 추가"""
+
+    print("🔄 Notion 변경분을 로컬 저장소에 동기화하는 중...")
+
+    # 변경분만 페이지네이션으로 받아오고, 전체 목록은 로컬 저장소에서 읽기
+    notion = clients.notion_sync()
+    bucket = TokenBucket(NOTION_RATE_LIMIT)
+    store = EventStore(EVENT_DB_PATH)
+    changed = store.sync_blocking(
+        iter_pages(notion, NOTION_DB_ID, bucket=bucket, **store.sync_query())
+    )
+    print(f"   동기화: {changed}건 변경")
+    if store.reconcile_due(RECONCILE_SECONDS):
+        # 삭제된 페이지는 변경분 조회에 나오지 않으므로 가끔 전체 ID 와 비교
+        removed = store.reconcile_blocking(
+            iter_pages(notion, NOTION_DB_ID, bucket=bucket, **store.reconcile_query())
+        )
+        print(f"   삭제 확인: {len(removed)}건 삭제")
+    total = len(store)
+
+    print(f"📊 총 {total}개의 이벤트를 찾았습니다.\n")
+
+    # 중단된 작업이면 처리 완료한 페이지는 건너뛰고 이어서 실행
+    checkpoint = Checkpoint(checkpoint_path)
+    if fresh:
+        checkpoint.clear()
+    elif checkpoint.processed:
+        print(f"♻️  체크포인트에서 이어서 실행: {len(checkpoint.processed)}건 처리됨\n")
+
+    if dry_run:
+        print("🔍 dry-run: 변경 내용만 출력하고 Notion 에는 쓰지 않습니다.\n")
+
+    # 장소가 필요한 페이지만 미리 분류
+    pending = [page for page in store.pages() if not has_location(page) and page['id'] not in checkpoint]
+    locations = classify_locations(pending)
+
+    runner = BulkRunner(notion, bucket=bucket, workers=NOTION_WORKERS)
+    counts = runner.run(
+        store.pages(),
+        lambda page: plan_location(page, locations),
+        on_updated=store.upsert_page,
+        label=lambda page: get_title(event_model.from_page(page))[:30],
+        checkpoint=checkpoint,
+        dry_run=dry_run,
+        total=total
+    )
+
+    store.close()
+    print(f"🔌 API 응답 시간: {clients.latency_stats()}")
+    clients.close()
+
+    # 오류 없이 끝나면 체크포인트 삭제 (오류 페이지는 다음 실행에서 재시도)
+    if not dry_run and counts['error'] == 0:
+        checkpoint.clear()
 
     print(f"\n{'='*60}")
     print(f"📊 작업 완료!")
-    print(f"   ✅ 업데이트됨: {updated_count}개")
-    print(f"   ⏭️  건너뜀: {skipped_count}개")
-    print(f"   ❌ 오류: {error_count}개")
+    print(f"   ✅ {'변경 예정' if dry_run else '업데이트됨'}: {counts['updated']}개")
+    print(f"   🟰 변경 없음: {counts['unchanged']}개")
+    print(f"   ⏭️  건너뜀: {counts['skipped']}개")
+    print(f"   ♻️  이전 실행에서 처리됨: {counts['resumed']}개")
+    print(f"   ❌ 오류: {counts['error']}개")
     print(f"{'='*60}")
 
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="이벤트 장소(온라인/오프라인) 일괄 적용")
+    parser.add_argument('--dry-run', action='store_true', help="변경 내용만 출력하고 Notion 에 쓰지 않음")
+    parser.add_argument('--fresh', action='store_true', help="체크포인트를 무시하고 처음부터 실행")
+    parser.add_argument('--checkpoint', default=CHECKPOINT_PATH, help="체크포인트 파일 경로")
+    args = parser.parse_args()
+
     print("="*60)
     print("🚀 Notion 이벤트 장소 일괄 업데이트 스크립트")
     print("="*60)
     print()
 
-    confirm = input("⚠️  모든 이벤트에 장소 정보를 추가하시겠습니까? (y/n): ")
-
-    if confirm.lower() == 'y':
-        update_locations()
+    if args.dry_run:
+        update_locations(dry_run=True, checkpoint_path=args.checkpoint)
     else:
-        print("❌ 작업이 취소되었습니다.")
+        confirm = input("⚠️  모든 이벤트에 장소 정보를 추가하시겠습니까? (y/n): ")
+
+        if confirm.lower() == 'y':
+            update_locations(checkpoint_path=args.checkpoint, fresh=args.fresh)
+        else:
+            print("❌ 작업이 취소되었습니다.")